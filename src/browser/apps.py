@@ -1,6 +1,18 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.core import checks
+from django.db.backends.signals import connection_created
 
 
 class BrowserConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "browser"
+
+    def ready(self):
+        from browser.checks import check_vendored_assets
+        checks.register(check_vendored_assets,
+                        checks.Tags.staticfiles,
+                        deploy=True)
+        if settings.INSTRUMENTATION:
+            from browser.instrumentation import install_query_timer
+            connection_created.connect(install_query_timer)
@@ -0,0 +1,81 @@
+"""Defines the access to the application caches and their statistics."""
+from collections import Counter
+from django.conf import settings
+from django.core.cache import caches
+from threading import Lock
+
+SEARCH_CACHE_ALIAS = 'search'
+ENTRIES_CACHE_ALIAS = 'entries'
+PAGES_CACHE_ALIAS = 'pages'
+
+
+def get_cache(alias: str):
+    """Get the cache with the specified alias, if configured.
+
+    Parameters
+    ----------
+    alias: str, required
+        The alias of the cache.
+
+    Returns
+    -------
+    cache: BaseCache
+        The cache, or None if caching is disabled for the alias.
+    """
+    return caches[alias] if alias in settings.CACHES else None
+
+
+class CacheStatistics:
+    """Counts the hits and misses of the application caches.
+
+    The counters are kept by each process of the application, from its
+    start.
+    """
+
+    def __init__(self):
+        """Initialize the statistics."""
+        self.lock = Lock()
+        self.hits = Counter()
+        self.misses = Counter()
+
+    def record(self, alias: str, hits: int = 0, misses: int = 0):
+        """Record the outcome of the lookups into a cache.
+
+        Parameters
+        ----------
+        alias: str, required
+            The alias of the cache.
+        hits: int, optional
+            The number of keys found in the cache.
+            Default is 0.
+        misses: int, optional
+            The number of keys missing from the cache.
+            Default is 0.
+        """
+        with self.lock:
+            self.hits[alias] += hits
+            self.misses[alias] += misses
+
+    def snapshot(self) -> dict[str, dict]:
+        """Get the current values of the counters.
+
+        Returns
+        -------
+        statistics: dict of (str, dict)
+            For each cache alias, the number of hits and misses, and the
+            ratio of hits.
+        """
+        with self.lock:
+            aliases = sorted(set(self.hits) | set(self.misses))
+            statistics = {}
+            for alias in aliases:
+                hits, misses = self.hits[alias], self.misses[alias]
+                statistics[alias] = {
+                    'hits': hits,
+                    'misses': misses,
+                    'hit_ratio': hits / (hits + misses) if hits + misses else 0
+                }
+            return statistics
+
+
+cache_statistics = CacheStatistics()
@@ -0,0 +1,94 @@
+"""Defines the system checks of the application."""
+from django.core import checks
+from pathlib import Path
+import hashlib
+
+VENDOR_DIR = Path(__file__).resolve().parent / 'static' / 'browser' / 'vendor'
+
+# The front-end assets which are served with the static files, by their path
+# relative to VENDOR_DIR; they are downloaded by `make vendor-assets`.
+VENDORED_ASSETS = [
+    'bootstrap/css/bootstrap.min.css',
+    'bootstrap/css/bootstrap.min.css.map',
+    'bootstrap-icons/font/bootstrap-icons.min.css',
+    'bootstrap-icons/font/fonts/bootstrap-icons.woff2',
+    'bootstrap-icons/font/fonts/bootstrap-icons.woff',
+]
+
+
+def read_checksums(vendor_dir: Path) -> dict[str, str]:
+    """Read the SHA-384 checksums of the vendored assets.
+
+    Parameters
+    ----------
+    vendor_dir: Path, required
+        The directory of the vendored assets.
+
+    Returns
+    -------
+    checksums: dict of (str, str)
+        The hexadecimal checksums, by the path of the assets.
+    """
+    checksums = {}
+    sums_file = vendor_dir / 'SHA384SUMS'
+    if not sums_file.exists():
+        return checksums
+    for line in sums_file.read_text().splitlines():
+        if line.strip():
+            checksum, path = line.split(maxsplit=1)
+            checksums[path.lstrip('*')] = checksum
+    return checksums
+
+
+def find_vendoring_errors(vendor_dir: Path) -> list[checks.CheckMessage]:
+    """Check that the vendored assets exist and match their checksums.
+
+    Parameters
+    ----------
+    vendor_dir: Path, required
+        The directory of the vendored assets.
+
+    Returns
+    -------
+    errors: list of CheckMessage
+        The errors of the assets which are missing, which have no checksum
+        or which do not match their checksum.
+    """
+    errors = []
+    checksums = read_checksums(vendor_dir)
+    hint = "Run `make vendor-assets` and commit the files."
+    for path in VENDORED_ASSETS:
+        checksum = checksums.get(path)
+        asset = vendor_dir / path
+        if checksum is None:
+            errors.append(
+                checks.Error(f"The vendored asset {path} has no checksum " +
+                             f"in {vendor_dir / 'SHA384SUMS'}.",
+                             hint="Add its published SHA-384 checksum.",
+                             id='browser.E001'))
+        elif not asset.exists():
+            errors.append(
+                checks.Error(f"The vendored asset {path} is missing.",
+                             hint=hint,
+                             id='browser.E002'))
+        elif hashlib.sha384(asset.read_bytes()).hexdigest() != checksum:
+            errors.append(
+                checks.Error(f"The vendored asset {path} does not match " +
+                             "its checksum.",
+                             hint=hint,
+                             id='browser.E003'))
+    return errors
+
+
+def check_vendored_assets(app_configs, **kwargs) -> list[checks.CheckMessage]:
+    """Check the vendored assets before the static files are deployed.
+
+    The pages link the assets only through the static files, so they are
+    unstyled if an asset is missing.
+
+    Returns
+    -------
+    errors: list of CheckMessage
+        The errors of the vendored assets.
+    """
+    return find_vendoring_errors(VENDOR_DIR)
@@ -0,0 +1,195 @@
+"""Defines the helpers for handling precompressed HTML.
+
+The HTML is compressed as raw deflate data which ends with a full flush,
+so that several compressed parts can be concatenated into the body of a
+single gzip stream without being decompressed.
+"""
+import struct
+import zlib
+
+# The header of a gzip stream: deflate method, no flags, no timestamp,
+# unknown operating system.
+GZIP_HEADER = b'\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff'
+
+
+def compress(text: str,
+             level: int = zlib.Z_BEST_COMPRESSION) -> tuple[bytes, int, int]:
+    """Compress the text so that it can be part of a gzip stream.
+
+    Parameters
+    ----------
+    text: str, required
+        The text to compress.
+    level: int, optional
+        The compression level.
+        Default is the best compression, which suits the stored texts.
+
+    Returns
+    -------
+    (data, crc32, size): tuple of (bytes, int, int)
+        The compressed data, the CRC-32 checksum and the size of the text
+        encoded as UTF-8.
+    """
+    raw = text.encode('utf-8')
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    data = compressor.compress(raw) + compressor.flush(zlib.Z_FULL_FLUSH)
+    return (data, zlib.crc32(raw), len(raw))
+
+
+def decompress(data: bytes) -> str:
+    """Decompress the text compressed with compress().
+
+    Parameters
+    ----------
+    data: bytes, required
+        The compressed data.
+
+    Returns
+    -------
+    text: str
+        The decompressed text.
+    """
+    decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+    return decompressor.decompress(data).decode('utf-8')
+
+
+class GzipStreamWriter:
+    """Writes a gzip stream from plain and precompressed parts."""
+
+    def __init__(self):
+        """Initialize the writer."""
+        self.parts = [GZIP_HEADER]
+        self.crc32 = 0
+        self.size = 0
+
+    def write(self, text: str):
+        """Compress and write the text, which is rendered per request.
+
+        Parameters
+        ----------
+        text: str, required
+            The text to write.
+        """
+        if text:
+            self.write_compressed(*compress(text, zlib.Z_DEFAULT_COMPRESSION))
+
+    def write_compressed(self, data: bytes, crc32: int, size: int):
+        """Write the text compressed with compress().
+
+        Parameters
+        ----------
+        data: bytes, required
+            The compressed data.
+        crc32: int, required
+            The CRC-32 checksum of the text.
+        size: int, required
+            The size of the text, in bytes.
+        """
+        self.parts.append(data)
+        self.crc32 = crc32_combine(self.crc32, crc32, size)
+        self.size = self.size + size
+
+    def close(self) -> bytes:
+        """Finish the stream.
+
+        Returns
+        -------
+        stream: bytes
+            The gzip stream.
+        """
+        # An empty final block, followed by the trailer.
+        self.parts.append(b'\x03\x00')
+        self.parts.append(
+            struct.pack('<II', self.crc32, self.size & 0xffffffff))
+        return b''.join(self.parts)
+
+
+def gf2_matrix_times(matrix: list[int], vector: int) -> int:
+    """Multiply the GF(2) matrix with the vector.
+
+    Parameters
+    ----------
+    matrix: list of int, required
+        The columns of the matrix.
+    vector: int, required
+        The vector.
+
+    Returns
+    -------
+    product: int
+        The product of the matrix and vector.
+    """
+    product, idx = 0, 0
+    while vector:
+        if vector & 1:
+            product ^= matrix[idx]
+        vector >>= 1
+        idx = idx + 1
+    return product
+
+
+def gf2_matrix_square(matrix: list[int]) -> list[int]:
+    """Square the GF(2) matrix.
+
+    Parameters
+    ----------
+    matrix: list of int, required
+        The columns of the matrix.
+
+    Returns
+    -------
+    square: list of int
+        The columns of the squared matrix.
+    """
+    return [gf2_matrix_times(matrix, column) for column in matrix]
+
+
+def crc32_zero_operators() -> list[list[int]]:
+    """Build the operators which append 2^n zero bytes to a CRC-32.
+
+    Returns
+    -------
+    operators: list of list of int
+        The operator for 2^n zero bytes at index n, for n from 0 to 63.
+    """
+    # The operator for a single zero bit.
+    operator = [0xedb88320] + [1 << n for n in range(31)]
+    for _ in range(3):
+        operator = gf2_matrix_square(operator)
+    operators = []
+    for _ in range(64):
+        operators.append(operator)
+        operator = gf2_matrix_square(operator)
+    return operators
+
+
+CRC32_ZERO_OPERATORS = crc32_zero_operators()
+
+
+def crc32_combine(crc1: int, crc2: int, size2: int) -> int:
+    """Combine the CRC-32 checksums of two consecutive blocks of data.
+
+    This is the algorithm of zlib's crc32_combine(), which is not exposed
+    by the zlib module.
+
+    Parameters
+    ----------
+    crc1: int, required
+        The checksum of the first block.
+    crc2: int, required
+        The checksum of the second block.
+    size2: int, required
+        The size of the second block, in bytes.
+
+    Returns
+    -------
+    crc32: int
+        The checksum of the concatenation of the two blocks.
+    """
+    idx = 0
+    while size2:
+        if size2 & 1:
+            crc1 = gf2_matrix_times(CRC32_ZERO_OPERATORS[idx], crc1)
+        size2 >>= 1
+        idx = idx + 1
+    return crc1 ^ crc2
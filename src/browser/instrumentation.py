@@ -0,0 +1,460 @@
+"""Defines the instrumentation of the requests.
+
+The requests are measured by the instrumentation middleware; the views mark
+their phases with phase(), and the database queries are timed by a wrapper
+installed on each database connection. The measurements of each request are
+aggregated into metrics, which are exported in the Prometheus text format.
+"""
+from browser.caching import cache_statistics
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from pathlib import Path
+from threading import Lock
+import bisect
+import json
+import os
+import tempfile
+import time
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+RESULTS_BUCKETS = (0, 1, 5, 10, 25, 50, 100)
+
+# For each metric: the type, the description and, for histograms, the upper
+# bounds of the buckets.
+METRICS = {
+    'edtlr_requests_total': ('counter', "The number of requests.", None),
+    'edtlr_request_duration_seconds':
+    ('histogram', "The duration of the requests.", LATENCY_BUCKETS),
+    'edtlr_phase_duration_seconds':
+    ('histogram', "The duration of the phases of the requests.",
+     LATENCY_BUCKETS),
+    'edtlr_db_queries_total': ('counter', "The number of database queries.",
+                               None),
+    'edtlr_db_query_duration_seconds_total':
+    ('counter', "The time spent in database queries.", None),
+    'edtlr_search_results':
+    ('histogram', "The number of search results per page.", RESULTS_BUCKETS),
+    'edtlr_cache_hits_total':
+    ('counter', "The number of keys found in the caches.", None),
+    'edtlr_cache_misses_total':
+    ('counter', "The number of keys missing from the caches.", None),
+}
+
+
+class RequestTimings:
+    """The measurements of a request."""
+
+    def __init__(self):
+        """Start measuring the request."""
+        self.start = time.perf_counter()
+        self.phases = {}
+        self.queries = 0
+        self.query_time = 0.0
+        self.results = None
+
+    def add_phase(self, name: str, duration: float):
+        """Add the duration of a phase.
+
+        Parameters
+        ----------
+        name: str, required
+            The name of the phase.
+        duration: float, required
+            The duration, in seconds.
+        """
+        self.phases[name] = self.phases.get(name, 0) + duration
+
+    def add_query(self, duration: float):
+        """Add a database query.
+
+        Parameters
+        ----------
+        duration: float, required
+            The duration of the query, in seconds.
+        """
+        self.queries = self.queries + 1
+        self.query_time = self.query_time + duration
+
+    def elapsed(self) -> float:
+        """Get the time elapsed since the start of the request.
+
+        Returns
+        -------
+        elapsed: float
+            The elapsed time, in seconds.
+        """
+        return time.perf_counter() - self.start
+
+    def server_timing(self, total: float) -> str:
+        """Build the value of the Server-Timing header.
+
+        Parameters
+        ----------
+        total: float, required
+            The duration of the request, in seconds.
+
+        Returns
+        -------
+        server_timing: str
+            The durations of the database queries, of the phases and of the
+            request, in milliseconds.
+        """
+        db_time = self.query_time * 1000
+        metrics = [f'db;dur={db_time:.1f};desc="{self.queries} queries"']
+        for name, duration in self.phases.items():
+            metrics.append(f'{name};dur={duration * 1000:.1f}')
+        metrics.append(f'total;dur={total * 1000:.1f}')
+        return ', '.join(metrics)
+
+
+current_timings: ContextVar[RequestTimings | None] = ContextVar(
+    'current_timings', default=None)
+
+
+@contextmanager
+def phase(name: str):
+    """Measure a phase of the current request, if instrumented.
+
+    Parameters
+    ----------
+    name: str, required
+        The name of the phase.
+    """
+    timings = current_timings.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add_phase(name, time.perf_counter() - start)
+
+
+def record_results(count: int):
+    """Record the number of search results of the current request.
+
+    Parameters
+    ----------
+    count: int, required
+        The number of results.
+    """
+    timings = current_timings.get()
+    if timings is not None:
+        timings.results = count
+
+
+def time_query(execute, sql, params, many, context):
+    """Time the database query of the current request, if instrumented.
+
+    The function is installed as an execute wrapper of the connections.
+    """
+    timings = current_timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.add_query(time.perf_counter() - start)
+
+
+def install_query_timer(sender, connection, **kwargs):
+    """Install the query timer on a new database connection.
+
+    Parameters
+    ----------
+    sender: class, required
+        The class of the database wrapper.
+    connection: BaseDatabaseWrapper, required
+        The database wrapper.
+    """
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_query)
+
+
+class MetricsRegistry:
+    """Aggregates the measurements of the requests into metrics.
+
+    The metrics are kept by each process; if the METRICS_DIR setting is set,
+    each process also writes them into that directory, at most once per
+    METRICS_FLUSH_INTERVAL seconds, and the exported metrics are the sums of
+    the metrics of all the processes. The files of the exited processes are
+    kept, so the counters do not decrease, until the directory is cleared
+    when the server starts.
+    """
+
+    def __init__(self):
+        """Initialize the registry."""
+        self.lock = Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.last_flush = 0.0
+
+    def observe(self, view: str, status: int, timings: RequestTimings,
+                total: float):
+        """Record the measurements of a request.
+
+        Parameters
+        ----------
+        view: str, required
+            The name of the view which handled the request.
+        status: int, required
+            The status code of the response.
+        timings: RequestTimings, required
+            The measurements of the request.
+        total: float, required
+            The duration of the request, in seconds.
+        """
+        labels = (('view', view), )
+        with self.lock:
+            self.__count('edtlr_requests_total',
+                         labels + (('status', str(status)), ))
+            self.__observe('edtlr_request_duration_seconds', labels, total)
+            for name, duration in timings.phases.items():
+                self.__observe('edtlr_phase_duration_seconds',
+                               labels + (('phase', name), ), duration)
+            self.__count('edtlr_db_queries_total', labels, timings.queries)
+            self.__count('edtlr_db_query_duration_seconds_total', labels,
+                         timings.query_time)
+            if timings.results is not None:
+                self.__observe('edtlr_search_results', labels, timings.results)
+
+    def snapshot(self) -> list[dict]:
+        """Get the current values of the metrics of this process.
+
+        Returns
+        -------
+        samples: list of dict
+            The metrics, each with its name, labels and value; the values of
+            the histograms are the counts of the buckets, the sum and the
+            count of the observed values.
+        """
+        with self.lock:
+            samples = [{
+                'name': name,
+                'labels': dict(labels),
+                'value': value
+            } for (name, labels), value in self.counters.items()]
+            samples.extend({
+                'name': name,
+                'labels': dict(labels),
+                'buckets': list(buckets),
+                'sum': total,
+                'count': count
+            } for (name, labels), (buckets, total,
+                                   count) in self.histograms.items())
+        for alias, counters in cache_statistics.snapshot().items():
+            for outcome in ['hits', 'misses']:
+                samples.append({
+                    'name': f'edtlr_cache_{outcome}_total',
+                    'labels': {
+                        'cache': alias
+                    },
+                    'value': counters[outcome]
+                })
+        return samples
+
+    def flush(self, force: bool = False):
+        """Write the metrics of this process into the metrics directory.
+
+        Parameters
+        ----------
+        force: bool, optional
+            If true, the metrics are written even if they were written less
+            than METRICS_FLUSH_INTERVAL seconds ago.
+            Default is False.
+        """
+        if not settings.METRICS_DIR:
+            return
+        now = time.monotonic()
+        interval = settings.METRICS_FLUSH_INTERVAL
+        if not force and now - self.last_flush < interval:
+            return
+        self.last_flush = now
+        metrics_dir = Path(settings.METRICS_DIR)
+        metrics_dir.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile('w',
+                                         dir=metrics_dir,
+                                         suffix='.tmp',
+                                         delete=False) as output:
+            json.dump(self.snapshot(), output)
+        os.replace(output.name, metrics_dir / f'{os.getpid()}.json')
+
+    def retire(self, pid: int):
+        """Keep the metrics of an exited process apart from the live ones.
+
+        The file of the process is renamed in a single step, so the exported
+        counters neither drop nor count it twice, and a new process with the
+        same id starts its own file.
+
+        Parameters
+        ----------
+        pid: int, required
+            The id of the exited process.
+        """
+        if not settings.METRICS_DIR:
+            return
+        path = Path(settings.METRICS_DIR) / f'{pid}.json'
+        try:
+            os.replace(path,
+                       path.with_name(f'exited-{pid}-{time.time_ns()}.json'))
+        except FileNotFoundError:
+            pass
+
+    def clear(self):
+        """Remove the metrics written by all the processes."""
+        if not settings.METRICS_DIR:
+            return
+        for path in Path(settings.METRICS_DIR).glob('*'):
+            if path.suffix in ['.json', '.tmp']:
+                path.unlink(missing_ok=True)
+
+    def export(self) -> str:
+        """Export the metrics in the Prometheus text format.
+
+        Returns
+        -------
+        text: str
+            The metrics of this process, or of all the processes which wrote
+            their metrics into the metrics directory.
+        """
+        if settings.METRICS_DIR:
+            self.flush(force=True)
+            samples = []
+            for path in Path(settings.METRICS_DIR).glob('*.json'):
+                try:
+                    samples.extend(json.loads(path.read_text()))
+                except (OSError, ValueError):
+                    continue
+        else:
+            samples = self.snapshot()
+        return self.__format(self.__merge(samples))
+
+    def __count(self, name: str, labels: tuple, value: float = 1):
+        """Increment a counter.
+
+        Parameters
+        ----------
+        name: str, required
+            The name of the counter.
+        labels: tuple of (str, str), required
+            The labels of the counter.
+        value: float, optional
+            The increment.
+            Default is 1.
+        """
+        key = (name, labels)
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def __observe(self, name: str, labels: tuple, value: float):
+        """Observe a value of a histogram.
+
+        Parameters
+        ----------
+        name: str, required
+            The name of the histogram.
+        labels: tuple of (str, str), required
+            The labels of the histogram.
+        value: float, required
+            The observed value.
+        """
+        key = (name, labels)
+        bounds = METRICS[name][2]
+        buckets, total, count = self.histograms.get(
+            key, ([0] * (len(bounds) + 1), 0, 0))
+        buckets[bisect.bisect_left(bounds, value)] += 1
+        self.histograms[key] = (buckets, total + value, count + 1)
+
+    def __merge(self, samples: list[dict]) -> dict:
+        """Sum the samples of the same metrics.
+
+        Parameters
+        ----------
+        samples: list of dict
+            The samples, as returned by snapshot().
+
+        Returns
+        -------
+        metrics: dict
+            The summed samples, by name and labels.
+        """
+        metrics = {}
+        for sample in samples:
+            key = (sample['name'], tuple(sorted(sample['labels'].items())))
+            merged = metrics.get(key)
+            if merged is None:
+                metrics[key] = dict(sample)
+                if 'buckets' in sample:
+                    metrics[key]['buckets'] = list(sample['buckets'])
+            elif 'buckets' in sample:
+                merged['buckets'] = [
+                    a + b for a, b in zip(merged['buckets'], sample['buckets'])
+                ]
+                merged['sum'] += sample['sum']
+                merged['count'] += sample['count']
+            else:
+                merged['value'] += sample['value']
+        return metrics
+
+    def __format(self, metrics: dict) -> str:
+        """Format the metrics in the Prometheus text format.
+
+        Parameters
+        ----------
+        metrics: dict
+            The metrics, by name and labels.
+
+        Returns
+        -------
+        text: str
+            The metrics in the Prometheus text format.
+        """
+        lines = []
+        for name, (kind, description, bounds) in METRICS.items():
+            keys = sorted(key for key in metrics if key[0] == name)
+            if not keys:
+                continue
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} {kind}')
+            for key in keys:
+                sample, labels = metrics[key], key[1]
+                if kind == 'counter':
+                    lines.append(
+                        f"{name}{self.__labels(labels)} {sample['value']}")
+                    continue
+                cumulative = 0
+                for bound, count in zip([*bounds, '+Inf'], sample['buckets']):
+                    cumulative = cumulative + count
+                    bucket_labels = self.__labels(labels + (('le', bound), ))
+                    lines.append(f'{name}_bucket{bucket_labels} {cumulative}')
+                lines.append(
+                    f"{name}_sum{self.__labels(labels)} {sample['sum']}")
+                lines.append(
+                    f"{name}_count{self.__labels(labels)} {sample['count']}")
+        return '\n'.join(lines) + '\n'
+
+    def __labels(self, labels: tuple) -> str:
+        """Format the labels of a sample.
+
+        Parameters
+        ----------
+        labels: tuple of (str, object), required
+            The labels.
+
+        Returns
+        -------
+        text: str
+            The labels in the Prometheus text format.
+        """
+        if not labels:
+            return ''
+        pairs = []
+        for name, value in labels:
+            value = str(value).replace('\\', '\\\\').replace('"', '\\"')
+            pairs.append(f'{name}="{value}"')
+        return '{' + ','.join(pairs) + '}'
+
+
+metrics = MetricsRegistry()
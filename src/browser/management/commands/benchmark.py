@@ -0,0 +1,702 @@
+"""Defines the command for benchmarking the application."""
+from browser.caching import ENTRIES_CACHE_ALIAS
+from browser.caching import PAGES_CACHE_ALIAS
+from browser.caching import SEARCH_CACHE_ALIAS
+from browser.management.commands.importdata import DictMarkdownToHtmlConverter
+from browser.management.commands.importdata import read_entry_file
+from browser.models.data_generation import DataGeneration
+from browser.models.entry import Entry
+from browser.search import DatabaseSearchBackend
+from browser.search import MatchType
+from browser.search import to_normalized_form
+from browser.search import to_search_key
+from browser.views import IndexView
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from datetime import timezone
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.core.signals import request_finished
+from django.core.signals import request_started
+from django.db import connection
+from django.db import connections
+from django.test import RequestFactory
+from django.test import override_settings
+from io import StringIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+import hashlib
+import json
+import math
+import platform
+import random
+import subprocess
+import time
+
+
+class Command(BaseCommand):
+    """Implements the command for benchmarking the application."""
+
+    help = "Benchmark the performance-sensitive parts of the application."
+
+    def add_arguments(self, parser):
+        """Add command-line arguments.
+
+        Parameters
+        ----------
+        parser: argparse.Parser, required
+            The command-line arguments parser.
+        """
+        parser.add_argument(
+            'suite',
+            help="The benchmark to run; 'all' runs the converter, parser, " +
+            "import and search benchmarks, while 'generate' only writes " +
+            "the synthetic entry files into --directory.",
+            choices=[
+                'all', 'converter', 'parser', 'import', 'search', 'database',
+                'generate'
+            ])
+        parser.add_argument(
+            '--sizes',
+            help="The sizes, in characters, of the synthetic entries.",
+            required=False,
+            type=int,
+            nargs='+',
+            default=[1_000, 10_000, 100_000, 250_000])
+        parser.add_argument(
+            '--repeat',
+            help="The number of runs; the fastest run is reported.",
+            required=False,
+            type=int,
+            default=5)
+        parser.add_argument(
+            '--requests',
+            help="The number of simulated requests of the database benchmark.",
+            required=False,
+            type=int,
+            default=2000)
+        parser.add_argument(
+            '--threads',
+            help="The number of threads sending the simulated requests.",
+            required=False,
+            type=int,
+            default=1)
+        parser.add_argument('--seed',
+                            help="The seed of the synthetic data generator.",
+                            required=False,
+                            type=int,
+                            default=0)
+        parser.add_argument(
+            '--entries',
+            help="The number of synthetic entry files of the parser, " +
+            "import and generate benchmarks.",
+            required=False,
+            type=int,
+            default=2000)
+        parser.add_argument(
+            '--bulk',
+            help="If specified the import benchmark imports the entries " +
+            "in chunks, using bulk inserts and updates.",
+            required=False,
+            default=False,
+            action='store_true')
+        parser.add_argument(
+            '--table-sizes',
+            help="The numbers of entries in the table, for which the " +
+            "search benchmark measures the latency of the searches.",
+            required=False,
+            type=int,
+            nargs='+',
+            default=[1_000, 10_000, 100_000])
+        parser.add_argument(
+            '--queries',
+            help="The number of searches of each kind, for each table size.",
+            required=False,
+            type=int,
+            default=50)
+        parser.add_argument(
+            '--directory',
+            help="The directory into which the generate benchmark writes " +
+            "the synthetic entry files.",
+            required=False)
+        parser.add_argument(
+            '--output',
+            help="The path of the JSON file into which to write the results.",
+            required=False)
+
+    def handle(self, *args, **options):
+        """Run the benchmark."""
+        suite = options['suite']
+        if suite == 'generate':
+            self.__generate(options)
+            return
+        if suite == 'database':
+            results = {
+                'database':
+                self.__benchmark_database(options['requests'],
+                                          options['threads'])
+            }
+        else:
+            benchmarks = {
+                'converter': self.__benchmark_converter,
+                'parser': self.__benchmark_parser,
+                'import': self.__benchmark_import,
+                'search': self.__benchmark_search,
+            }
+            if suite != 'all':
+                benchmarks = {suite: benchmarks[suite]}
+            results = {
+                name: benchmark(options)
+                for name, benchmark in benchmarks.items()
+            }
+        if options['output']:
+            report = {'environment': self.__environment(options), **results}
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(report, output, indent=2)
+
+    def __generate(self, options: dict):
+        """Write the synthetic entry files.
+
+        Parameters
+        ----------
+        options: dict, required
+            The command-line options.
+        """
+        if not options['directory']:
+            self.stderr.write("The generate benchmark requires --directory.",
+                              self.style.ERROR)
+            return
+        directory = Path(options['directory'])
+        directory.mkdir(parents=True, exist_ok=True)
+        dictionary = SyntheticDictionary(options['seed'])
+        size = dictionary.write_entries(directory, options['entries'])
+        self.stdout.write(f"generate: {options['entries']} entry files, " +
+                          f'{size / 2**20:.1f} MiB')
+
+    def __benchmark_converter(self, options: dict) -> list[dict]:
+        """Measure the throughput of the dict-markdown converter.
+
+        Parameters
+        ----------
+        options: dict, required
+            The command-line options.
+
+        Returns
+        -------
+        results: list of dict
+            The number of characters per second, for each paragraph size.
+        """
+        dictionary = SyntheticDictionary(options['seed'])
+        results = []
+        for size in options['sizes']:
+            text = dictionary.paragraph(size)
+            elapsed = self.__time(DictMarkdownToHtmlConverter().convert, text,
+                                  options['repeat'])
+            results.append({
+                'chars': len(text),
+                'chars_per_second': len(text) / elapsed
+            })
+            self.stdout.write(f'converter: {len(text)} chars, ' +
+                              f'{len(text) / elapsed:,.0f} chars/sec')
+        return results
+
+    def __benchmark_parser(self, options: dict) -> dict:
+        """Measure the throughput of the entry file parser.
+
+        Parameters
+        ----------
+        options: dict, required
+            The command-line options.
+
+        Returns
+        -------
+        results: dict
+            The number of files and their size, and the number of files per
+            second.
+        """
+        dictionary = SyntheticDictionary(options['seed'])
+        with TemporaryDirectory() as tmp_dir:
+            size = dictionary.write_entries(Path(tmp_dir), options['entries'])
+            entry_files = sorted(Path(tmp_dir).glob('*.xml'))
+            elapsed = self.__time(self.__parse_files, entry_files,
+                                  options['repeat'])
+        files_per_second = len(entry_files) / elapsed
+        self.stdout.write(f'parser: {len(entry_files)} files, ' +
+                          f'{size / 2**20:.1f} MiB, ' +
+                          f'{files_per_second:,.0f} files/sec')
+        return {
+            'files': len(entry_files),
+            'bytes': size,
+            'files_per_second': files_per_second
+        }
+
+    def __parse_files(self, entry_files: list[Path]):
+        """Parse the entry files one after another.
+
+        Parameters
+        ----------
+        entry_files: list of Path, required
+            The paths of the entry files.
+        """
+        for entry_file in entry_files:
+            read_entry_file(entry_file)
+
+    def __benchmark_import(self, options: dict) -> dict:
+        """Measure the throughput of the importdata command.
+
+        The synthetic entries are imported into a test database three times:
+        into the empty table, then again in normal mode, when the files did
+        not change, and then in forced mode.
+
+        Parameters
+        ----------
+        options: dict, required
+            The command-line options.
+
+        Returns
+        -------
+        results: dict
+            The statistics of each import, as written by importdata.
+        """
+        dictionary = SyntheticDictionary(options['seed'])
+        runs = [('insert', False), ('normal', False), ('force', True)]
+        results = {}
+        with TemporaryDirectory() as tmp_dir, self.__test_database():
+            input_dir = Path(tmp_dir) / 'entries'
+            input_dir.mkdir()
+            dictionary.write_entries(input_dir, options['entries'])
+            stats_file = Path(tmp_dir) / 'stats.json'
+            for name, force in runs:
+                call_command('importdata',
+                             input_directory=str(input_dir),
+                             force=force,
+                             bulk=options['bulk'],
+                             stats_json=str(stats_file),
+                             verbosity=0,
+                             stdout=StringIO())
+                results[name] = json.loads(stats_file.read_text())
+                self.stdout.write(
+                    f"import: {name}, {results[name]['files']} files, " +
+                    f"{results[name]['files_per_second']:,.0f} files/sec")
+        return results
+
+    def __benchmark_search(self, options: dict) -> list[dict]:
+        """Measure the latency of the index view, for several table sizes.
+
+        The synthetic entries are inserted into a test database, and the
+        view is requested without the application caches, so that each
+        request searches the configured backend.
+
+        Parameters
+        ----------
+        options: dict, required
+            The command-line options.
+
+        Returns
+        -------
+        results: list of dict
+            For each table size and kind of search, the latency percentiles
+            in milliseconds.
+        """
+        dictionary = SyntheticDictionary(options['seed'])
+        caches = {
+            alias: config
+            for alias, config in settings.CACHES.items() if alias not in
+            [SEARCH_CACHE_ALIAS, ENTRIES_CACHE_ALIAS, PAGES_CACHE_ALIAS]
+        }
+        results, count = [], 0
+        with (self.__test_database(),
+              override_settings(CACHES=caches,
+                                SEARCH_GENERATION_CHECK_INTERVAL=0)):
+            for table_size in sorted(options['table_sizes']):
+                entries = dictionary.entries(count + 1, table_size - count)
+                Entry.objects.bulk_create(entries, batch_size=1000)
+                count = max(count, table_size)
+                DataGeneration.bump()
+                titles = list(
+                    Entry.objects.order_by('?').values_list(
+                        'title_word', flat=True)[:options['queries']])
+                # The first request warms up the backend.
+                self.__search(titles[0], MatchType.PREFIX)
+                for kind, match in [('prefix', MatchType.PREFIX),
+                                    ('infix', MatchType.CONTAINS),
+                                    ('miss', MatchType.CONTAINS)]:
+                    latencies = [
+                        self.__search(self.__term(kind, title), match)
+                        for title in titles
+                    ]
+                    results.append({
+                        'table_size': count,
+                        'kind': kind,
+                        **self.__summarize(latencies)
+                    })
+                    self.stdout.write(f'search: {count} entries, {kind}, ' +
+                                      f"p50 {results[-1]['p50']:.1f} ms, " +
+                                      f"p95 {results[-1]['p95']:.1f} ms")
+        return results
+
+    def __term(self, kind: str, title_word: str) -> str:
+        """Build the search term of a kind from a title word.
+
+        Parameters
+        ----------
+        kind: str, required
+            The kind of search: 'prefix', 'infix' or 'miss'.
+        title_word: str, required
+            The title word of an existing entry.
+
+        Returns
+        -------
+        term: str
+            The search term.
+        """
+        term = to_normalized_form(title_word).lower()
+        if kind == 'prefix':
+            return term[:3]
+        if kind == 'infix':
+            return term[1:5]
+        return f'{term[:3]}qxz'
+
+    def __search(self, term: str, match: str) -> float:
+        """Request the search results page from the index view.
+
+        Parameters
+        ----------
+        term: str, required
+            The search term.
+        match: str, required
+            The match type.
+
+        Returns
+        -------
+        latency: float
+            The duration of the request, in seconds.
+        """
+        request = RequestFactory().get('/', {'t': term, 'm': match})
+        request.user = AnonymousUser()
+        start = time.perf_counter()
+        IndexView.as_view()(request)
+        return time.perf_counter() - start
+
+    def __summarize(self, latencies: list[float]) -> dict:
+        """Summarize the latencies of the requests.
+
+        Parameters
+        ----------
+        latencies: list of float, required
+            The latencies, in seconds.
+
+        Returns
+        -------
+        summary: dict
+            The number of requests, and the mean and the percentiles of the
+            latencies in milliseconds.
+        """
+        latencies = sorted(latencies)
+        summary = {
+            'requests': len(latencies),
+            'mean': sum(latencies) / len(latencies) * 1000
+        }
+        for percentile in [50, 95, 99]:
+            rank = math.ceil(percentile / 100 * len(latencies))
+            summary[f'p{percentile}'] = latencies[max(rank, 1) - 1] * 1000
+        return summary
+
+    @contextmanager
+    def __test_database(self):
+        """Run the benchmark in a test database, as the tests do."""
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0,
+                                           autoclobber=True,
+                                           serialize=False)
+        try:
+            yield
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def __environment(self, options: dict) -> dict:
+        """Describe the environment of the benchmark.
+
+        Parameters
+        ----------
+        options: dict, required
+            The command-line options.
+
+        Returns
+        -------
+        environment: dict
+            The commit, the platform, the database and the options, so that
+            the results of different runs can be compared.
+        """
+        try:
+            commit = subprocess.run(['git', 'rev-parse', 'HEAD'],
+                                    cwd=settings.BASE_DIR,
+                                    capture_output=True,
+                                    text=True,
+                                    check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            commit = None
+        return {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'commit': commit,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'database': connection.vendor,
+            'search_backend': settings.SEARCH_BACKEND,
+            'options': {
+                name: options[name]
+                for name in [
+                    'suite', 'sizes', 'repeat', 'requests', 'threads', 'seed',
+                    'entries', 'bulk', 'table_sizes', 'queries'
+                ]
+            }
+        }
+
+    def __benchmark_database(self, requests: int, threads: int) -> dict:
+        """Measure the number of requests per second which query the database.
+
+        Each simulated request sends the request signals, which open and
+        close the database connections as configured by the settings, and
+        runs a short search query.
+
+        Parameters
+        ----------
+        requests: int, required
+            The number of simulated requests.
+        threads: int, required
+            The number of threads sending the requests.
+
+        Returns
+        -------
+        results: dict
+            The connection mode, the number of threads and the number of
+            requests per second.
+        """
+        settings_dict = connection.settings_dict
+        pool = settings_dict['OPTIONS'].get('pool')
+        if pool:
+            mode = f"pool of {pool['min_size']} to {pool['max_size']}"
+        else:
+            mode = f"CONN_MAX_AGE={settings_dict['CONN_MAX_AGE']}"
+        threads = max(threads, 1)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            counts = [requests // threads] * threads
+            list(executor.map(self.__send_requests, counts))
+        elapsed = time.perf_counter() - start
+        self.stdout.write(f'database: {mode}, {threads} threads, ' +
+                          f'{requests / elapsed:,.0f} requests/sec')
+        return {
+            'mode': mode,
+            'threads': threads,
+            'requests_per_second': requests / elapsed
+        }
+
+    def __send_requests(self, count: int):
+        """Send the simulated requests.
+
+        Parameters
+        ----------
+        count: int, required
+            The number of requests.
+        """
+        backend = DatabaseSearchBackend()
+        for _ in range(count):
+            request_started.send(sender=self.__class__)
+            try:
+                backend.suggest('cas')
+            finally:
+                request_finished.send(sender=self.__class__)
+        connections.close_all()
+
+    def __time(self, func, arg, repeat: int) -> float:
+        """Measure the fastest run of the function.
+
+        Parameters
+        ----------
+        func: callable, required
+            The function to measure.
+        arg: object, required
+            The argument of the function.
+        repeat: int, required
+            The number of runs.
+
+        Returns
+        -------
+        elapsed: float
+            The duration of the fastest run, in seconds.
+        """
+        timings = []
+        for _ in range(max(repeat, 1)):
+            start = time.perf_counter()
+            func(arg)
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+
+
+class SyntheticDictionary:
+    """Generates synthetic dictionary data with dict-markdown marks."""
+
+    WORDS = [
+        'casă', 'lat.', 'și', 'de', 'pe', 'cu', 'vb.', 'pl.', 'cf.', 'mai',
+        'ecleziarhie', 'bisericesc', 'adj.', 'cuvânt', 'țară', 'șir'
+    ]
+    MARKS = ['**', '*', '_', '^', '$', '@']
+    MARKED_WORDS_RATIO = 0.2
+    SYLLABLES = [
+        'ca', 'să', 'ma', 're', 'ță', 'șu', 'bi', 'ne', 'lu', 'mi', 'to', 'în',
+        'ar', 'de', 'vâ', 'ră', 'cli', 'stru', 'ghe', 'pă'
+    ]
+    GRAMMAR = ['s. f.', 's. m.', 's. n.', 'adj.', 'vb. I.', 'adv.']
+
+    def __init__(self, seed: int = 0):
+        """Initialize the generator.
+
+        Parameters
+        ----------
+        seed: int, optional
+            The seed of the random number generator.
+            Default is 0.
+        """
+        self.random = random.Random(seed)
+
+    def paragraph(self, length: int) -> str:
+        """Generate a paragraph of approximately the specified length.
+
+        Parameters
+        ----------
+        length: int, required
+            The number of characters of the paragraph.
+
+        Returns
+        -------
+        paragraph: str
+            The paragraph in dict-markdown format.
+        """
+        words, size = [], 0
+        while size < length:
+            word = self.random.choice(self.WORDS)
+            if self.random.random() < self.MARKED_WORDS_RATIO:
+                mark = self.random.choice(self.MARKS)
+                word = f'{mark}{word}{mark}'
+            words.append(word)
+            size += len(word) + 1
+        return ' '.join(words)
+
+    def title_word(self) -> str:
+        """Generate a title word.
+
+        Returns
+        -------
+        title_word: str
+            The title word, in upper case.
+        """
+        count = self.random.randint(2, 5)
+        return ''.join(self.random.choices(self.SYLLABLES, k=count)).upper()
+
+    def entry_xml(self, id: int) -> str:
+        """Generate an entry in the XML format of the dictionary export.
+
+        The body has between one and eight paragraphs of between 100 and
+        1500 characters; the first paragraph starts with the title word and
+        its grammatical category, like the entries of the dictionary.
+
+        Parameters
+        ----------
+        id: int, required
+            The id of the entry.
+
+        Returns
+        -------
+        xml: str
+            The XML of the entry.
+        """
+        title_word = self.title_word()
+        normalized = to_normalized_form(title_word)
+        paragraphs = [
+            self.paragraph(self.random.randint(100, 1500))
+            for _ in range(self.random.randint(1, 8))
+        ]
+        grammar = self.random.choice(self.GRAMMAR)
+        paragraphs[0] = f'**{title_word}** {grammar} {paragraphs[0]}'
+        body = ''.join(f'<paragraph>{paragraph}</paragraph>'
+                       for paragraph in paragraphs)
+        return ("<?xml version='1.0' encoding='UTF-8'?>\n" +
+                f'<entry id="{id}">' +
+                f'<titleWord md5hash="{self.__md5(title_word)}">{title_word}' +
+                '</titleWord>' +
+                f'<titleWordNormalized md5hash="{self.__md5(normalized)}">' +
+                f'{normalized}</titleWordNormalized>' +
+                f'<body md5hash="{self.__md5(body)}">{body}</body></entry>\n')
+
+    def write_entries(self, directory: Path, count: int) -> int:
+        """Write the entry files into the directory.
+
+        Parameters
+        ----------
+        directory: Path, required
+            The directory.
+        count: int, required
+            The number of entry files, whose ids start from 1.
+
+        Returns
+        -------
+        size: int
+            The total size of the files, in bytes.
+        """
+        size = 0
+        for id in range(1, count + 1):
+            xml = self.entry_xml(id).encode('utf-8')
+            (directory / f'{id}.xml').write_bytes(xml)
+            size = size + len(xml)
+        return size
+
+    def entries(self, start_id: int, count: int) -> list[Entry]:
+        """Generate the entries without their XML.
+
+        Parameters
+        ----------
+        start_id: int, required
+            The id of the first entry.
+        count: int, required
+            The number of entries.
+
+        Returns
+        -------
+        entries: list of Entry
+            The entries, with a short HTML text.
+        """
+        entries = []
+        for id in range(start_id, start_id + count):
+            title_word = self.title_word()
+            normalized = to_normalized_form(title_word)
+            grammar = self.random.choice(self.GRAMMAR)
+            text_html = f'<p><strong>{title_word}</strong> {grammar}</p>'
+            entries.append(
+                Entry(id=id,
+                      title_word=title_word,
+                      title_word_md5=self.__md5(title_word),
+                      title_word_normalized=normalized,
+                      title_word_normalized_md5=self.__md5(normalized),
+                      search_key=to_search_key(title_word),
+                      text_html=text_html,
+                      text_md5=self.__md5(text_html)))
+        return entries
+
+    def __md5(self, text: str) -> str:
+        """Compute the MD5 sum of the text.
+
+        Parameters
+        ----------
+        text: str, required
+            The text.
+
+        Returns
+        -------
+        md5: str
+            The hexadecimal MD5 sum.
+        """
+        return hashlib.md5(text.encode('utf-8')).hexdigest()
@@ -0,0 +1,104 @@
+"""Defines the command for moving the HTML of the entries between storages."""
+from browser.models.entry import Entry
+from browser.models.entry_html import EntryHtml
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+
+class Command(BaseCommand):
+    """Implements the command for compressing the HTML of the entries."""
+
+    help = "Compress the HTML of the existing entries into a separate table."
+    requires_migrations_checks = True
+
+    def add_arguments(self, parser):
+        """Add command-line arguments.
+
+        Parameters
+        ----------
+        parser: argparse.Parser, required
+            The command-line arguments parser.
+        """
+        parser.add_argument(
+            '--decompress',
+            help="Move the compressed HTML back into the entries table.",
+            action='store_true')
+        parser.add_argument('--chunk-size',
+                            help="The number of entries per transaction.",
+                            required=False,
+                            type=int,
+                            default=1000)
+
+    def handle(self, *args, **options):
+        """Compress or decompress the HTML of the entries."""
+        chunk_size = max(options['chunk_size'], 1)
+        if options['decompress']:
+            count = self.__decompress(chunk_size)
+            self.stdout.write(f'Decompressed the HTML of {count} entries.')
+        else:
+            count = self.__compress(chunk_size)
+            self.stdout.write(f'Compressed the HTML of {count} entries.')
+
+    def __compress(self, chunk_size: int) -> int:
+        """Compress the HTML stored as text.
+
+        Parameters
+        ----------
+        chunk_size: int, required
+            The number of entries per transaction.
+
+        Returns
+        -------
+        count: int
+            The number of compressed entries.
+        """
+        count, last_id = 0, 0
+        while True:
+            rows = list(
+                Entry.objects.filter(id__gt=last_id).exclude(
+                    text_html='').order_by('id').values_list(
+                        'id', 'text_html')[:chunk_size])
+            if not rows:
+                return count
+            with transaction.atomic():
+                EntryHtml.objects.bulk_create(
+                    [
+                        EntryHtml.from_text(id, text_html)
+                        for id, text_html in rows
+                    ],
+                    update_conflicts=True,
+                    unique_fields=['entry'],
+                    update_fields=['data', 'crc32', 'size'])
+                ids = [id for id, _ in rows]
+                Entry.objects.filter(id__in=ids).update(text_html='')
+            count, last_id = count + len(rows), rows[-1][0]
+
+    def __decompress(self, chunk_size: int) -> int:
+        """Move the compressed HTML back into the entries table.
+
+        Parameters
+        ----------
+        chunk_size: int, required
+            The number of entries per transaction.
+
+        Returns
+        -------
+        count: int
+            The number of decompressed entries.
+        """
+        count, last_id = 0, 0
+        while True:
+            bodies = list(
+                EntryHtml.objects.filter(
+                    entry_id__gt=last_id).order_by('entry_id')[:chunk_size])
+            if not bodies:
+                return count
+            with transaction.atomic():
+                entries = [
+                    Entry(id=body.entry_id, text_html=body.text())
+                    for body in bodies
+                ]
+                Entry.objects.bulk_update(entries, ['text_html'])
+                EntryHtml.objects.filter(
+                    entry_id__in=[entry.id for entry in entries]).delete()
+            count, last_id = count + len(bodies), bodies[-1].entry_id
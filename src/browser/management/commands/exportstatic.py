@@ -0,0 +1,364 @@
+"""Defines the command for exporting the entries as static pages."""
+from browser.models.entry import Entry
+from browser.search.results import SearchPage
+from browser.views.index import IndexView
+from browser.views.index import templates_version
+from browser.views.letter import index_letter
+from contextlib import contextmanager
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.template.loader import render_to_string
+from django.urls import get_script_prefix
+from django.urls import set_script_prefix
+from pathlib import Path
+import gzip
+import json
+import multiprocessing
+import os
+import time
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class Command(BaseCommand):
+    """Implements the command for exporting the entries as static pages."""
+
+    help = ("Render one HTML page per entry, and optionally one index page " +
+            "per letter, into a directory served by nginx.")
+    requires_migrations_checks = True
+
+    WORKER_CHUNK_SIZE = 100
+
+    def add_arguments(self, parser):
+        """Add command-line arguments.
+
+        Parameters
+        ----------
+        parser: argparse.Parser, required
+            The command-line arguments parser.
+        """
+        parser.add_argument(
+            '--output-directory',
+            help="The path of the directory into which to write the pages.",
+            required=True)
+        parser.add_argument(
+            '--workers',
+            help="The number of processes that render the pages.",
+            required=False,
+            type=int,
+            default=1)
+        parser.add_argument(
+            '--script-prefix',
+            help="The URL prefix under which the application is served, " +
+            "used by the links of the pages.",
+            required=False,
+            default='/browse/')
+        parser.add_argument(
+            '--letter-index',
+            help="If specified also render one index page per letter.",
+            required=False,
+            default=False,
+            action='store_true')
+        parser.add_argument(
+            '--full',
+            help="If specified render all the pages, even if the entries " +
+            "did not change since the last export.",
+            required=False,
+            default=False,
+            action='store_true')
+
+    def handle(self, *args, **options):
+        """Export the entries."""
+        start = time.perf_counter()
+        output_dir = Path(options['output_directory']).resolve()
+        output_dir.mkdir(parents=True, exist_ok=True)
+        manifest = ExportManifest(output_dir, options['script_prefix'])
+        if options['full']:
+            manifest.clear()
+
+        versions = dict(Entry.objects.values_list('id', 'version'))
+        stale = sorted(id for id, version in versions.items()
+                       if manifest.entries.get(id) != version)
+        removed = [id for id in manifest.entries if id not in versions]
+        try:
+            for rendered in self.__render(output_dir, stale, options):
+                manifest.entries.update(rendered)
+        finally:
+            manifest.save()
+
+        writer = StaticPageWriter(output_dir)
+        for id in removed:
+            writer.remove(entry_page_path(id))
+            del manifest.entries[id]
+        if options['letter_index'] and (stale or removed
+                                        or not manifest.has_letters):
+            with script_prefix(options['script_prefix']):
+                count = self.__render_letters(writer)
+            manifest.has_letters = True
+            self.stdout.write(f'Rendered {count} letter index pages.')
+        manifest.save()
+
+        self.stdout.write(f'Exported {len(stale)} entries, ' +
+                          f'{len(versions) - len(stale)} unchanged, ' +
+                          f'{len(removed)} removed, ' +
+                          f'in {time.perf_counter() - start:.1f} seconds.')
+        if brotli is None:
+            self.stdout.write(
+                'The brotli package is not installed; ' +
+                'only the .gz pages were written.', self.style.WARNING)
+
+    def __render(self, output_dir: Path, ids: list[int], options: dict):
+        """Render the pages of the entries, in chunks.
+
+        Parameters
+        ----------
+        output_dir: Path, required
+            The directory into which to write the pages.
+        ids: list of int, required
+            The ids of the entries to render.
+        options: dict, required
+            The command-line options.
+
+        Returns
+        -------
+        rendered: iterator of list of (int, int)
+            For each chunk, the ids and versions of the rendered entries.
+        """
+        tasks = [(output_dir, options['script_prefix'],
+                  ids[idx:idx + self.WORKER_CHUNK_SIZE])
+                 for idx in range(0, len(ids), self.WORKER_CHUNK_SIZE)]
+        if options['workers'] <= 1:
+            yield from map(render_entry_pages, tasks)
+            return
+
+        # The workers are forked so that they inherit the configured Django
+        # application; each opens its own database connection.
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        with context.Pool(options['workers']) as pool:
+            yield from pool.imap_unordered(render_entry_pages, tasks)
+
+    def __render_letters(self, writer: 'StaticPageWriter') -> int:
+        """Render the index pages of the letters.
+
+        Parameters
+        ----------
+        writer: StaticPageWriter, required
+            The writer of the pages.
+
+        Returns
+        -------
+        count: int
+            The number of letter index pages.
+        """
+        groups = {}
+        rows = Entry.objects.order_by('search_key', 'id').values_list(
+            'id', 'title_word', 'search_key')
+        for id, title_word, search_key in rows:
+            groups.setdefault(index_letter(search_key), []).append(
+                (id, title_word))
+        letters = sorted(groups)
+        for letter, entries in groups.items():
+            html = render_to_string('letter.html', {
+                'letter': letter,
+                'letters': letters,
+                'entries': entries
+            })
+            writer.write(f'index/{letter}.html', html)
+        return len(letters)
+
+
+class ExportManifest:
+    """Keeps the versions of the exported entries.
+
+    The manifest is stored in the output directory. All the pages are
+    rendered again if the templates or the script prefix changed since the
+    last export.
+    """
+
+    FILE_NAME = 'manifest.json'
+
+    def __init__(self, output_dir: Path, script_prefix: str):
+        """Load the manifest of the output directory.
+
+        Parameters
+        ----------
+        output_dir: Path, required
+            The output directory.
+        script_prefix: str, required
+            The URL prefix of the pages.
+        """
+        self.path = output_dir / self.FILE_NAME
+        self.key = f'{templates_version()}:{script_prefix}'
+        self.entries, self.has_letters = {}, False
+        try:
+            data = json.loads(self.path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return
+        self.entries = {
+            int(id): version
+            for id, version in data.get('entries', {}).items()
+        }
+        if data.get('key') == self.key:
+            self.has_letters = data.get('has_letters', False)
+        else:
+            self.clear()
+
+    def clear(self):
+        """Forget the versions of the exported entries.
+
+        The entries are kept, so that the pages of the removed entries are
+        still removed.
+        """
+        self.entries = dict.fromkeys(self.entries)
+        self.has_letters = False
+
+    def save(self):
+        """Write the manifest into the output directory."""
+        data = {
+            'key': self.key,
+            'has_letters': self.has_letters,
+            'entries': self.entries
+        }
+        temp_path = self.path.with_suffix('.tmp')
+        temp_path.write_text(json.dumps(data), encoding='utf-8')
+        os.replace(temp_path, self.path)
+
+
+class StaticPageWriter:
+    """Writes the pages, together with their compressed variants.
+
+    Each page is written with a .gz sibling and, if the brotli package is
+    installed, a .br sibling, which nginx sends to the clients that accept
+    them. The files are replaced atomically.
+    """
+
+    def __init__(self, output_dir: Path):
+        """Initialize the writer.
+
+        Parameters
+        ----------
+        output_dir: Path, required
+            The output directory.
+        """
+        self.output_dir = output_dir
+
+    def write(self, relative_path: str, html: str):
+        """Write a page.
+
+        Parameters
+        ----------
+        relative_path: str, required
+            The path of the page, relative to the output directory.
+        html: str, required
+            The content of the page.
+        """
+        path = self.output_dir / relative_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        content = html.encode('utf-8')
+        # The compressed variants are written first, so that a page is never
+        # older than its variants.
+        self.__replace(path.with_name(path.name + '.gz'),
+                       gzip.compress(content, compresslevel=9, mtime=0))
+        if brotli is not None:
+            self.__replace(path.with_name(path.name + '.br'),
+                           brotli.compress(content))
+        self.__replace(path, content)
+
+    def remove(self, relative_path: str):
+        """Remove a page and its compressed variants.
+
+        Parameters
+        ----------
+        relative_path: str, required
+            The path of the page, relative to the output directory.
+        """
+        path = self.output_dir / relative_path
+        for suffix in ['', '.gz', '.br']:
+            path.with_name(path.name + suffix).unlink(missing_ok=True)
+
+    def __replace(self, path: Path, content: bytes):
+        """Replace the content of a file atomically.
+
+        Parameters
+        ----------
+        path: Path, required
+            The path of the file.
+        content: bytes, required
+            The content of the file.
+        """
+        temp_path = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+        temp_path.write_bytes(content)
+        os.replace(temp_path, path)
+
+
+@contextmanager
+def script_prefix(prefix: str):
+    """Set the URL prefix of the rendered links for a block of code.
+
+    Parameters
+    ----------
+    prefix: str, required
+        The URL prefix.
+    """
+    previous = get_script_prefix()
+    set_script_prefix(prefix)
+    try:
+        yield
+    finally:
+        set_script_prefix(previous)
+
+
+def entry_page_path(id: int) -> str:
+    """Get the path of the page of an entry.
+
+    Parameters
+    ----------
+    id: int, required
+        The id of the entry.
+
+    Returns
+    -------
+    path: str
+        The path of the page, relative to the output directory.
+    """
+    return f'entry/{id}.html'
+
+
+def render_entry_pages(task: tuple[Path, str, list[int]]) -> list[tuple]:
+    """Render the pages of a chunk of entries.
+
+    The function is defined at module level so that it can be dispatched
+    to the worker processes of the exporter. The pages are rendered with the
+    template of the index view, as the search results of the title word.
+
+    Parameters
+    ----------
+    task: tuple of (Path, str, list of int), required
+        The output directory, the URL prefix of the pages, and the ids of
+        the entries.
+
+    Returns
+    -------
+    rendered: list of (int, int)
+        The ids and versions of the rendered entries.
+    """
+    output_dir, prefix, ids = task
+    writer, rendered = StaticPageWriter(output_dir), []
+    entries = Entry.objects.select_related('compressed_html').only(
+        *SearchPage.FIELDS).filter(id__in=ids)
+    with script_prefix(prefix):
+        for entry in entries:
+            body = getattr(entry, 'compressed_html', None)
+            if body is not None and not entry.text_html:
+                entry.text_html = body.text()
+            html = render_to_string(IndexView.template_name, {
+                'search_term': entry.title_word,
+                'search_results': [entry]
+            })
+            writer.write(entry_page_path(entry.id), html)
+            rendered.append((entry.id, entry.version))
+    return rendered
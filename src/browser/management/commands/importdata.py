@@ -1,8 +1,33 @@
 """Defines the command for importing data into the database."""
+from browser.models.data_generation import DataGeneration
 from browser.models.entry import Entry
+from browser.models.entry_document import EntryDocument
+from browser.models.entry_html import EntryHtml
+from browser.models.entry_reference import EntryReference
+from browser.models.imported_file import ImportedFile
+from browser.references import CrossReferenceIndex
+from browser.search.snapshot import SnapshotWriter
+from browser.search.terms import to_search_key
+from browser.shadow import ShadowTables
+from django.conf import settings
 from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db import transaction
+from django.utils import timezone
+from itertools import islice
 from pathlib import Path
+import json
+import multiprocessing
+import os
+import re
+import tarfile
+import time
 import xml.etree.ElementTree as XML
+import zipfile
+from typing import BinaryIO
+from typing import Iterable
+from typing import Iterator
 from typing import Tuple
 
 
@@ -12,6 +37,8 @@ class Command(BaseCommand):
     help = "Import the data into the database."
     requires_migrations_checks = True
 
+    WORKER_CHUNK_SIZE = 32
+
     def add_arguments(self, parser):
         """Add command-line arguments.
 
@@ -20,37 +47,404 @@ class Command(BaseCommand):
         parser: argparse.Parser, required
             The command-line arguments parser.
         """
-        parser.add_argument(
+        input_group = parser.add_mutually_exclusive_group(required=True)
+        input_group.add_argument(
             '--input-directory',
-            help="The path of the directory containing dictionary entries.",
-            required=True)
+            help="The path of the directory containing dictionary entries.")
+        input_group.add_argument(
+            '--input-file',
+            help="The path of an XML file containing one or more " +
+            "dictionary entries, or of a .zip, .tar or .tar.gz archive of " +
+            "such files. The entries are read as a stream.")
         parser.add_argument(
             '--force',
             help="If specified update the entries even if MD5 sums match.",
             required=False,
             default=False,
             action='store_true')
+        parser.add_argument(
+            '--bulk',
+            help="If specified import the entries in chunks, using bulk " +
+            "inserts and updates.",
+            required=False,
+            default=False,
+            action='store_true')
+        parser.add_argument(
+            '--chunk-size',
+            help="The number of entries imported in a single transaction " +
+            "when using --bulk.",
+            required=False,
+            type=int,
+            default=1000)
+        parser.add_argument(
+            '--workers',
+            help="The number of processes that parse the entry files of " +
+            "the input directory. The entries are still written to the " +
+            "database by a single process, in the order of the files.",
+            required=False,
+            type=int,
+            default=1)
+        parser.add_argument(
+            '--full-scan',
+            help="If specified parse all the entry files, even if they did " +
+            "not change since the last import.",
+            required=False,
+            default=False,
+            action='store_true')
+        parser.add_argument(
+            '--progress-interval',
+            help="The number of seconds between two progress summaries. " +
+            "The summaries are written if the verbosity is at least 1, " +
+            "while the outcome of each entry is written only if the " +
+            "verbosity is at least 2.",
+            required=False,
+            type=float,
+            default=10)
+        parser.add_argument(
+            '--shadow',
+            help="If specified import into copies of the tables of the " +
+            "dictionary, which replace the live tables once the import " +
+            "finished; the replaced tables are kept until the next shadow " +
+            "import, and can be restored by the rollbackimport command. " +
+            "Requires PostgreSQL.",
+            required=False,
+            default=False,
+            action='store_true')
+        parser.add_argument(
+            '--snapshot',
+            help="If specified write the snapshot of the entries, which is " +
+            "served by the 'snapshot' search backend, to the path of the " +
+            "SNAPSHOT_PATH setting, when the entries changed or the " +
+            "snapshot does not exist.",
+            required=False,
+            default=False,
+            action='store_true')
+        parser.add_argument(
+            '--stats-json',
+            help="The path of the JSON file into which to write the " +
+            "statistics of the import.",
+            required=False)
 
     def handle(self, *args, **options):
         """Import the data into the database."""
-        input_dir = Path(options['input_directory'])
+        if options['snapshot'] and not settings.SNAPSHOT_PATH:
+            raise CommandError('The SNAPSHOT_PATH setting is not set.')
+        if options['shadow'] and connection.vendor != 'postgresql':
+            raise CommandError('The shadow import requires PostgreSQL.')
+        self.verbosity = options['verbosity']
+        self.progress_interval = options['progress_interval']
+        self.last_progress = time.perf_counter()
+        self.statistics = ImportStatistics()
+        self.compress_html = settings.ENTRY_HTML_STORAGE == 'compressed'
+        self.cross_references = CrossReferenceIndex()
+        self.relinked = 0
+        if not options['shadow']:
+            self.__import_input(options)
+        else:
+            self.__import_shadow(options)
+        if self.verbosity >= 1:
+            self.stdout.write(f'Imported {self.statistics.format()}')
+        if self.relinked > 0:
+            self.stdout.write(
+                f'Linked again the citations of {self.relinked} entries.')
+        if options['stats_json']:
+            with open(options['stats_json'], 'w', encoding='utf-8') as output:
+                json.dump(self.statistics.summary(), output, indent=2)
+        # The snapshot is replaced before the generation changes, and the
+        # snapshot backend checks the file again when it sees a new
+        # generation, so the pages cached for the new generation are never
+        # built from the previous snapshot.
+        if options['snapshot'] and (self.statistics.changed() > 0 or
+                                    not Path(settings.SNAPSHOT_PATH).exists()):
+            self.__write_snapshot(Path(settings.SNAPSHOT_PATH))
+        if self.statistics.changed() > 0:
+            generation = DataGeneration.bump()
+            if options['shadow']:
+                # The replaced tables can be restored only at this
+                # generation.
+                ShadowTables().record_previous(generation)
+            self.stdout.write(f'Data generation is now {generation}.')
+
+        self.stdout.write("Finished importing data.")
+
+    def __import_input(self, options: dict):
+        """Import the entries of the input directory or file.
+
+        Parameters
+        ----------
+        options: dict, required
+            The command-line options.
+        """
+        full_scan = options['force'] or options['full_scan']
+        if options['input_directory']:
+            input_dir = Path(options['input_directory']).resolve()
+            manifest = ImportManifest(input_dir)
+            entry_files = list(input_dir.glob("*.xml"))
+            self.statistics.total = len(entry_files)
+            if not full_scan:
+                entry_files = self.__filter_changed(entry_files, manifest)
+            entries = self.__read_entries(entry_files, options['workers'])
+            self.__import(entries, options, manifest)
+        else:
+            input_file = Path(options['input_file']).resolve()
+            manifest = ImportManifest(input_file.parent)
+            if not full_scan and manifest.is_unchanged(input_file):
+                self.stdout.write(f'File {input_file.name} did not change.',
+                                  self.style.NOTICE)
+            else:
+                reader = EntryStreamReader()
+                entries = self.__collect_entries(reader.read(input_file))
+                failed = self.statistics.failed()
+                self.__import(entries, options)
+                # The file is recorded only if all its entries were imported,
+                # so the next import reads the failed entries again.
+                if self.statistics.failed() == failed:
+                    manifest.add_file(input_file)
+                else:
+                    self.stdout.write(
+                        f'File {input_file.name} was not recorded as ' +
+                        'imported, since some of its entries failed.',
+                        self.style.NOTICE)
+        manifest.save()
+
+    def __import_shadow(self, options: dict):
+        """Import the entries into the shadow tables, then make them live.
+
+        The shadow tables start as copies of the live tables, so the import
+        writes only the changed entries, as into the live tables; the live
+        tables are replaced only if entries changed.
+
+        Parameters
+        ----------
+        options: dict, required
+            The command-line options.
+        """
+        shadow = ShadowTables()
+        start = time.perf_counter()
+        shadow.create()
+        self.stdout.write('Copied the tables into the shadow tables in ' +
+                          f'{time.perf_counter() - start:.1f} seconds.')
+        try:
+            with shadow.active():
+                self.__import_input(options)
+        except BaseException:
+            shadow.discard()
+            raise
+        if self.statistics.changed() == 0:
+            shadow.discard()
+            return
+        start = time.perf_counter()
+        shadow.swap()
+        self.stdout.write('Replaced the live tables with the shadow tables ' +
+                          f'in {time.perf_counter() - start:.2f} seconds.')
+
+    def __write_snapshot(self, path: Path):
+        """Write the snapshot of the entries.
+
+        Parameters
+        ----------
+        path: Path, required
+            The path of the snapshot.
+        """
+        start = time.perf_counter()
+        count = SnapshotWriter(path, self.compress_html).write()
+        self.stdout.write(f'Wrote the snapshot of {count} entries to ' +
+                          f'{path} in {time.perf_counter() - start:.1f} ' +
+                          'seconds.')
+
+    def __import(self,
+                 entries: Iterable[Tuple[Path, Entry]],
+                 options: dict,
+                 manifest: 'ImportManifest | None' = None):
+        """Write the entries into the database.
+
+        Parameters
+        ----------
+        entries: iterable of (Path, Entry), required
+            The entries and the files they were read from.
+        options: dict, required
+            The command-line options.
+        manifest: ImportManifest, optional
+            If specified, the entries are reported by file name and their
+            files are recorded into the manifest; otherwise the entries are
+            reported by id.
+            Default is None.
+        """
         force = options['force']
+        if options['bulk']:
+            for chunk in self.__chunks(entries, options['chunk_size']):
+                start = time.perf_counter()
+                outcomes = self.__update_chunk(chunk, force)
+                self.statistics.add_time('write', time.perf_counter() - start)
+                for (entry_file, entry), outcome in zip(chunk, outcomes):
+                    self.__report(entry_file, entry, outcome, manifest)
+        else:
+            for entry_file, entry in entries:
+                start = time.perf_counter()
+                outcome = self.__update_entry(entry, force)
+                self.statistics.add_time('write', time.perf_counter() - start)
+                self.__report(entry_file, entry, outcome, manifest)
 
-        for entry_file in input_dir.glob("*.xml"):
-            entry = self.__read_contents(entry_file)
-            if entry is None:
-                continue
-            if self.__update_entry(entry, force):
-                style = self.style.SUCCESS
-                message = f'Entry {entry_file.stem} updated.'
+    def __filter_changed(self, entry_files: Iterable[Path],
+                         manifest: 'ImportManifest') -> list[Path]:
+        """Filter out the entry files that did not change since last import.
+
+        Parameters
+        ----------
+        entry_files: iterable of Path, required
+            The paths of the entry files.
+        manifest: ImportManifest, required
+            The manifest of the last import.
+
+        Returns
+        -------
+        changed_files: list of Path
+            The paths of the entry files that need to be parsed.
+        """
+        changed_files = []
+        for entry_file in entry_files:
+            if manifest.is_unchanged(entry_file):
+                self.__record_outcome(entry_file.stem, 'unchanged')
             else:
-                style = self.style.NOTICE
-                message = f'Entry {entry_file.stem} did not chage.'
-            self.stdout.write(message, style)
+                changed_files.append(entry_file)
+        return changed_files
 
-        self.stdout.write("Finished importing data.")
+    def __report(self, entry_file: Path, entry: Entry, outcome: str,
+                 manifest: 'ImportManifest | None'):
+        """Report the outcome of importing an entry.
+
+        Parameters
+        ----------
+        entry_file: Path, required
+            The path of the file the entry was read from.
+        entry: Entry, required
+            The imported entry.
+        outcome: str, required
+            The outcome: 'inserted', 'updated' or 'unchanged'.
+        manifest: ImportManifest, required
+            The manifest into which to record the entry file, or None.
+        """
+        if manifest is None:
+            self.__record_outcome(str(entry.id), outcome)
+        else:
+            self.__record_outcome(entry_file.stem, outcome)
+            manifest.add(entry_file, entry)
+
+    def __record_outcome(self, name: str, outcome: str):
+        """Count the outcome of importing an entry, and report the progress.
+
+        Parameters
+        ----------
+        name: str, required
+            The name of the entry.
+        outcome: str, required
+            The outcome: 'inserted', 'updated', 'unchanged' or 'failed'.
+        """
+        self.statistics.add(outcome)
+        if self.verbosity >= 2:
+            self.__write_outcome(name, outcome)
+        if self.verbosity >= 1 and self.progress_interval > 0:
+            now = time.perf_counter()
+            if now - self.last_progress >= self.progress_interval:
+                self.last_progress = now
+                self.stdout.write(f'Processed {self.statistics.format()}')
+
+    def __write_outcome(self, name: str, outcome: str):
+        """Write the outcome of importing an entry.
+
+        Parameters
+        ----------
+        name: str, required
+            The name of the entry.
+        outcome: str, required
+            The outcome: 'inserted', 'updated' or 'unchanged'.
+        """
+        if outcome == 'inserted':
+            style = self.style.SUCCESS
+            message = f'Entry {name} inserted.'
+        elif outcome == 'updated':
+            style = self.style.SUCCESS
+            message = f'Entry {name} updated.'
+        else:
+            style = self.style.NOTICE
+            message = f'Entry {name} did not change.'
+        self.stdout.write(message, style)
+
+    def __update_chunk(self,
+                       chunk: Iterable[Tuple[Path, Entry]],
+                       force: bool = False) -> list[str]:
+        """Update the entries of the chunk in a single transaction.
+
+        The existing entries are loaded with a single query, and the new and
+        changed entries are written with bulk inserts and updates.
+
+        Parameters
+        ----------
+        chunk: iterable of (Path, Entry), required
+            The entry files and the entries read from them.
+        force: bool, optional
+            If true, the entries will be updated anyway.
+            Default is 'False'.
+
+        Returns
+        -------
+        outcomes: list of str
+            For each entry of the chunk, whether it was 'inserted', 'updated'
+            or 'unchanged'.
+        """
+        outcomes, new_entries, changed_entries = [], {}, {}
+        with transaction.atomic():
+            ids = [entry.id for _, entry in chunk]
+            existing = {
+                row[0]:
+                Entry(id=row[0],
+                      title_word_md5=row[1],
+                      title_word_normalized_md5=row[2],
+                      text_md5=row[3],
+                      version=row[4])
+                for row in Entry.objects.filter(id__in=ids).values_list(
+                    'id', 'title_word_md5', 'title_word_normalized_md5',
+                    'text_md5', 'version')
+            }
+            for _, entry in chunk:
+                db_entry = existing.get(entry.id)
+                if db_entry is None:
+                    entry.increment_version()
+                    new_entries[entry.id] = entry
+                    existing[entry.id] = entry
+                    outcomes.append('inserted')
+                    continue
+
+                if db_entry.is_equal_to(entry) and not force:
+                    outcomes.append('unchanged')
+                    continue
+
+                db_entry.copy_values_from(entry)
+                if (db_entry.id not in new_entries
+                        and db_entry.id not in changed_entries):
+                    db_entry.increment_version()
+                    changed_entries[db_entry.id] = db_entry
+                outcomes.append('updated')
+
+            entries = [*new_entries.values(), *changed_entries.values()]
+            references = self.cross_references.link(entries)
+            documents = self.__build_documents(entries)
+            bodies = self.__detach_html(entries)
+            Entry.objects.bulk_create(new_entries.values())
+            now = timezone.now()
+            for entry in changed_entries.values():
+                entry.row_update_timestamp = now
+            Entry.objects.bulk_update(changed_entries.values(), [
+                'title_word', 'title_word_md5', 'title_word_normalized',
+                'title_word_normalized_md5', 'search_key', 'text_html',
+                'text_md5', 'version', 'row_update_timestamp'
+            ])
+            self.__save_html(entries, bodies)
+            self.__save_documents(documents)
+            self.__save_references(entries, references)
+        return outcomes
 
-    def __update_entry(self, entry: Entry, force: bool = False):
+    def __update_entry(self, entry: Entry, force: bool = False) -> str:
         """Update the specified entry if changed.
 
         Parameters
@@ -63,23 +457,383 @@ class Command(BaseCommand):
 
         Returns
         -------
-        entry_updated: bool
-            True if the entry was updated; False if no update required.
+        outcome: str
+            'inserted' if the entry is new, 'updated' if it was updated, and
+            'unchanged' if no update was required.
         """
         if not Entry.objects.filter(id=entry.id).exists():
-            entry.save()
-            return True
+            self.__save_entry(entry)
+            return 'inserted'
 
         db_entry = Entry.objects.get(id=entry.id)
         if db_entry.is_equal_to(entry) and not force:
-            return False
+            return 'unchanged'
 
         db_entry.copy_values_from(entry)
-        db_entry.save()
-        return True
+        self.__save_entry(db_entry)
+        return 'updated'
+
+    def __save_entry(self, entry: Entry):
+        """Save the entry together with its compressed HTML, document and
+        references.
+
+        Parameters
+        ----------
+        entry: Entry, required
+            The entry to save.
+        """
+        with transaction.atomic():
+            references = self.cross_references.link([entry])
+            documents = self.__build_documents([entry])
+            bodies = self.__detach_html([entry])
+            entry.save()
+            self.__save_html([entry], bodies)
+            self.__save_documents(documents)
+            self.__save_references([entry], references)
+
+    def __save_references(self, entries: list[Entry],
+                          references: list[EntryReference]):
+        """Write the references of the written entries, and link again the
+        entries which cite them.
+
+        Parameters
+        ----------
+        entries: list of Entry, required
+            The written entries.
+        references: list of EntryReference, required
+            The references of the entries.
+        """
+        self.cross_references.save(entries, references)
+        self.relinked = self.relinked + self.cross_references.relink(entries)
+
+    def __build_documents(self, entries: list[Entry]) -> list[EntryDocument]:
+        """Build the full-text search documents of the entries.
+
+        The documents are built before the HTML is detached from the entries.
+
+        Parameters
+        ----------
+        entries: list of Entry, required
+            The entries to be written.
+
+        Returns
+        -------
+        documents: list of EntryDocument
+            The documents of the entries.
+        """
+        return [
+            EntryDocument.from_html(entry.id, entry.title_word,
+                                    entry.text_html) for entry in entries
+        ]
+
+    def __save_documents(self, documents: list[EntryDocument]):
+        """Write the full-text search documents of the written entries.
+
+        Parameters
+        ----------
+        documents: list of EntryDocument, required
+            The documents of the entries.
+        """
+        if documents:
+            EntryDocument.objects.bulk_create(documents,
+                                              update_conflicts=True,
+                                              unique_fields=['entry'],
+                                              update_fields=['text', 'vector'])
+
+    def __detach_html(self, entries: list[Entry]) -> list[EntryHtml]:
+        """Move the HTML of the entries into compressed bodies, if enabled.
+
+        Parameters
+        ----------
+        entries: list of Entry, required
+            The entries to be written.
+
+        Returns
+        -------
+        bodies: list of EntryHtml
+            The compressed HTML of the entries, whose text is cleared; empty
+            if the HTML is stored as text.
+        """
+        if not self.compress_html:
+            return []
+        bodies = []
+        for entry in entries:
+            bodies.append(EntryHtml.from_text(entry.id, entry.text_html))
+            entry.text_html = ''
+        return bodies
+
+    def __save_html(self, entries: list[Entry], bodies: list[EntryHtml]):
+        """Write the compressed HTML of the written entries.
+
+        Parameters
+        ----------
+        entries: list of Entry, required
+            The written entries.
+        bodies: list of EntryHtml, required
+            The compressed HTML of the entries; when the HTML is stored as
+            text, the stale compressed HTML of the entries is removed.
+        """
+        if bodies:
+            EntryHtml.objects.bulk_create(
+                bodies,
+                update_conflicts=True,
+                unique_fields=['entry'],
+                update_fields=['data', 'crc32', 'size'])
+        elif entries:
+            EntryHtml.objects.filter(
+                entry_id__in=[entry.id for entry in entries]).delete()
+
+    def __chunks(self, items: Iterable, size: int) -> Iterator[list]:
+        """Split the items into chunks of the specified size.
+
+        Parameters
+        ----------
+        items: iterable, required
+            The items to split.
+        size: int, required
+            The maximum number of items in a chunk.
+
+        Returns
+        -------
+        chunks: iterator of list
+            The chunks of items.
+        """
+        items = iter(items)
+        while chunk := list(islice(items, max(size, 1))):
+            yield chunk
+
+    def __read_entries(self,
+                       entry_files: Iterable[Path],
+                       workers: int = 1) -> Iterator[Tuple[Path, Entry]]:
+        """Read the entries from the entry files, skipping invalid files.
+
+        Parameters
+        ----------
+        entry_files: iterable of Path, required
+            The paths of the entry files.
+        workers: int, optional
+            The number of processes that parse the files.
+            Default is 1, i.e. the files are parsed in the current process.
+
+        Returns
+        -------
+        entries: iterator of (Path, Entry)
+            The entry files and the entries read from them, in the order
+            of the files.
+        """
+        if workers <= 1:
+            results = map(read_entry_file, entry_files)
+            yield from self.__collect_entries(results)
+            return
+
+        # The workers are forked so that they inherit the configured Django
+        # application; they never use the database connection.
+        context = multiprocessing.get_context('fork')
+        with context.Pool(workers) as pool:
+            results = pool.imap(read_entry_file,
+                                entry_files,
+                                chunksize=self.WORKER_CHUNK_SIZE)
+            yield from self.__collect_entries(results)
 
-    def __read_contents(self, entry_file: Path) -> Entry | None:
-        """Read the contents of the entry file.
+    def __collect_entries(
+        self, results: Iterable[Tuple[Path, Entry | None, str | None,
+                                      Tuple[float, float]]]
+    ) -> Iterator[Tuple[Path, Entry]]:
+        """Collect the parsed entries, reporting the parse errors.
+
+        Parameters
+        ----------
+        results: iterable of (Path, Entry, str, (float, float)), required
+            The entry files, the entries, the parse errors, and the time
+            spent parsing the XML and converting the markdown.
+
+        Returns
+        -------
+        entries: iterator of (Path, Entry)
+            The entry files and the entries read from them.
+        """
+        for entry_file, entry, error, (parse_time, convert_time) in results:
+            self.statistics.add_time('parse', parse_time)
+            self.statistics.add_time('convert', convert_time)
+            if entry is not None:
+                yield entry_file, entry
+            else:
+                self.stderr.write(
+                    f'Error parsing entry from {entry_file.resolve()}.\n' +
+                    f'Exception: {error}', self.style.ERROR)
+                self.__record_outcome(entry_file.stem, 'failed')
+
+
+def read_entry_file(
+    entry_file: Path
+) -> Tuple[Path, Entry | None, str | None, Tuple[float, float]]:
+    """Read the entry from the specified file.
+
+    The function is defined at module level so that it can be dispatched
+    to the worker processes of the importer.
+
+    Parameters
+    ----------
+    entry_file: Path, required
+        The path of the entry file.
+
+    Returns
+    -------
+    (entry_file, entry, error, durations): tuple
+        The path of the entry file, the entry read from the file or None,
+        the parse error or None, and the time spent parsing the XML and
+        converting the markdown, in seconds.
+    """
+    start = time.perf_counter()
+    parser = EntryXmlParser()
+    try:
+        entry, error = parser.parse(entry_file), None
+    except (AttributeError, XML.ParseError, ValueError) as ex:
+        entry, error = None, str(ex)
+    parse_time = time.perf_counter() - start - parser.conversion_time
+    return (entry_file, entry, error, (parse_time, parser.conversion_time))
+
+
+class ImportStatistics:
+    """Counts the outcomes of the imported entries, and times the import.
+
+    The time spent parsing the XML and converting the markdown is summed
+    over the processes which parse the entries, while the time spent
+    writing into the database is measured by the importing process.
+    """
+
+    OUTCOMES = ['inserted', 'updated', 'unchanged', 'failed']
+    PHASES = ['parse', 'convert', 'write']
+
+    def __init__(self):
+        """Start timing the import."""
+        self.start = time.perf_counter()
+        self.total = None
+        self.counts = dict.fromkeys(self.OUTCOMES, 0)
+        self.durations = dict.fromkeys(self.PHASES, 0.0)
+
+    def add(self, outcome: str):
+        """Count the outcome of an entry.
+
+        Parameters
+        ----------
+        outcome: str, required
+            The outcome: 'inserted', 'updated', 'unchanged' or 'failed'.
+        """
+        self.counts[outcome] += 1
+
+    def add_time(self, phase: str, duration: float):
+        """Add the time spent in a phase of the import.
+
+        Parameters
+        ----------
+        phase: str, required
+            The phase: 'parse', 'convert' or 'write'.
+        duration: float, required
+            The duration, in seconds.
+        """
+        self.durations[phase] += duration
+
+    def changed(self) -> int:
+        """Get the number of inserted and updated entries.
+
+        Returns
+        -------
+        changed: int
+            The number of entries written into the database.
+        """
+        return self.counts['inserted'] + self.counts['updated']
+
+    def failed(self) -> int:
+        """Get the number of entries which could not be imported.
+
+        Returns
+        -------
+        failed: int
+            The number of entries which could not be read or written.
+        """
+        return self.counts['failed']
+
+    def summary(self) -> dict:
+        """Summarize the import so far.
+
+        Returns
+        -------
+        summary: dict
+            The number of processed files and their total (None if unknown),
+            the elapsed time and the estimated remaining time in seconds, the
+            throughput in files per second, the counts of the outcomes and
+            the durations of the phases in seconds.
+        """
+        elapsed = time.perf_counter() - self.start
+        files = sum(self.counts.values())
+        files_per_second = files / elapsed if elapsed > 0 else 0
+        eta = None
+        if self.total is not None and files_per_second > 0:
+            eta = max(self.total - files, 0) / files_per_second
+        return {
+            'files': files,
+            'total': self.total,
+            'elapsed_seconds': elapsed,
+            'eta_seconds': eta,
+            'files_per_second': files_per_second,
+            **self.counts,
+            'durations_seconds': dict(self.durations),
+        }
+
+    def format(self) -> str:
+        """Format the summary of the import as a line of text.
+
+        Returns
+        -------
+        text: str
+            The summary of the import.
+        """
+        summary = self.summary()
+        files = str(summary['files'])
+        if summary['total'] is not None:
+            files = f"{files}/{summary['total']}"
+        outcomes = ', '.join(f'{summary[outcome]} {outcome}'
+                             for outcome in self.OUTCOMES)
+        durations = ', '.join(f'{phase} {duration:.1f} s'
+                              for phase, duration in self.durations.items())
+        text = (f"{files} files in {summary['elapsed_seconds']:.1f} s " +
+                f"({summary['files_per_second']:.1f} files/sec): " +
+                f'{outcomes}; {durations}')
+        if summary['eta_seconds'] is not None and summary['eta_seconds'] > 0:
+            text = f"{text}; ETA {summary['eta_seconds']:.0f} s"
+        return text
+
+
+class ImportManifest:
+    """Keeps the fingerprints of the files imported from a directory."""
+
+    SAVE_BATCH_SIZE = 1000
+    HEAD_SIZE = 4096
+    MD5_PATTERN = re.compile(
+        rb'<(titleWord|titleWordNormalized|body)\s[^>]*?md5hash="([^"]*)"')
+
+    def __init__(self, input_dir: Path):
+        """Load the fingerprints of the files from the input directory.
+
+        Parameters
+        ----------
+        input_dir: Path, required
+            The resolved path of the directory containing the entry files.
+        """
+        self.records = {
+            record.path: record
+            for record in ImportedFile.objects.filter(
+                path__startswith=f'{input_dir}{os.sep}')
+        }
+        self.pending = {}
+
+    def is_unchanged(self, entry_file: Path) -> bool:
+        """Check if the entry file did not change since the last import.
+
+        The size and modification time of the file are checked first; if
+        they differ, the MD5 sums are read from the head of the file without
+        parsing it.
 
         Parameters
         ----------
@@ -88,22 +842,214 @@ class Command(BaseCommand):
 
         Returns
         -------
-        entry: Entry
+        is_unchanged: bool
+            True if the entry file can be skipped; False otherwise.
+        """
+        record = self.records.get(str(entry_file))
+        if record is None:
+            return False
+
+        stat = entry_file.stat()
+        if (record.size == stat.st_size
+                and record.modification_time == stat.st_mtime_ns):
+            return True
+
+        md5_hashes = self.__read_md5_hashes(entry_file)
+        if not record.has_md5_hashes(md5_hashes):
+            return False
+
+        self.__record(entry_file, md5_hashes)
+        return True
+
+    def add(self, entry_file: Path, entry: Entry):
+        """Record the fingerprint of the imported entry file.
+
+        Parameters
+        ----------
+        entry_file: Path, required
+            The path of the entry file.
+        entry: Entry, required
             The entry read from the file.
         """
+        self.__record(entry_file,
+                      (entry.title_word_md5, entry.title_word_normalized_md5,
+                       entry.text_md5))
+
+    def add_file(self, input_file: Path):
+        """Record the fingerprint of an imported multi-entry file or archive.
+
+        Parameters
+        ----------
+        input_file: Path, required
+            The path of the file.
+        """
+        self.__record(input_file, ('', '', ''))
+
+    def save(self):
+        """Save the pending fingerprints to the database."""
+        ImportedFile.objects.bulk_create(self.pending.values(),
+                                         update_conflicts=True,
+                                         unique_fields=['path'],
+                                         update_fields=[
+                                             'size', 'modification_time',
+                                             'title_word_md5',
+                                             'title_word_normalized_md5',
+                                             'text_md5', 'row_update_timestamp'
+                                         ])
+        self.pending = {}
+
+    def __record(self, entry_file: Path, md5_hashes: Tuple[str, str, str]):
+        """Record the fingerprint of the entry file until it is saved.
+
+        Parameters
+        ----------
+        entry_file: Path, required
+            The path of the entry file.
+        md5_hashes: tuple of (str, str, str), required
+            The MD5 sums of the title word, normalized title word and text.
+        """
+        stat = entry_file.stat()
+        title_word_md5, title_word_normalized_md5, text_md5 = md5_hashes
+        record = ImportedFile(
+            path=str(entry_file),
+            size=stat.st_size,
+            modification_time=stat.st_mtime_ns,
+            title_word_md5=title_word_md5 or '',
+            title_word_normalized_md5=title_word_normalized_md5 or '',
+            text_md5=text_md5 or '')
+        self.records[record.path] = record
+        self.pending[record.path] = record
+        if len(self.pending) >= self.SAVE_BATCH_SIZE:
+            self.save()
+
+    def __read_md5_hashes(self, entry_file: Path) -> Tuple[str, str, str]:
+        """Read the MD5 sums from the head of the entry file.
+
+        Parameters
+        ----------
+        entry_file: Path, required
+            The path of the entry file.
+
+        Returns
+        -------
+        (title_word_md5, title_word_normalized_md5, text_md5): tuple of str
+            The MD5 sums; the missing ones are None.
+        """
+        with entry_file.open('rb') as f:
+            head = f.read(self.HEAD_SIZE)
+        md5_hashes = {
+            tag.decode(): md5.decode()
+            for tag, md5 in self.MD5_PATTERN.findall(head)
+        }
+        return (md5_hashes.get('titleWord'),
+                md5_hashes.get('titleWordNormalized'), md5_hashes.get('body'))
+
+
+class EntryStreamReader:
+    """Reads the entries from multi-entry XML files and archives."""
+
+    def __init__(self):
+        """Initialize the reader."""
+        self.parser = EntryXmlParser()
+
+    def read(
+            self, input_file: Path
+    ) -> Iterator[Tuple[Path, Entry | None, str | None]]:
+        """Read the entries from the input file without extracting it.
+
+        Parameters
+        ----------
+        input_file: Path, required
+            The path of an XML file, or of a .zip or .tar(.gz) archive.
+
+        Returns
+        -------
+        results: iterator of (Path, Entry, str, (float, float))
+            The location of each entry, the entry or None, the parse error
+            or None, and the time spent parsing the XML and converting the
+            markdown. The location of the entries from an archive is the
+            path of the archive joined with the name of the member.
+        """
+        if zipfile.is_zipfile(input_file):
+            with zipfile.ZipFile(input_file) as archive:
+                for member in archive.infolist():
+                    if member.is_dir() or not self.__is_xml(member.filename):
+                        continue
+                    with archive.open(member) as source:
+                        yield from self.__read_stream(
+                            input_file / member.filename, source)
+        elif tarfile.is_tarfile(input_file):
+            with tarfile.open(input_file, 'r|*') as archive:
+                for member in archive:
+                    if not member.isfile() or not self.__is_xml(member.name):
+                        continue
+                    source = archive.extractfile(member)
+                    yield from self.__read_stream(input_file / member.name,
+                                                  source)
+        else:
+            with input_file.open('rb') as source:
+                yield from self.__read_stream(input_file, source)
+
+    def __read_stream(
+            self, location: Path, source: BinaryIO
+    ) -> Iterator[Tuple[Path, Entry | None, str | None]]:
+        """Read the entries from the stream.
+
+        Parameters
+        ----------
+        location: Path, required
+            The location of the stream.
+        source: binary file object, required
+            The stream containing the entries.
+
+        Returns
+        -------
+        results: iterator of (Path, Entry, str, (float, float))
+            The location, the entry or None, the parse error or None, and
+            the time spent parsing the XML and converting the markdown.
+        """
+        start = time.perf_counter()
         try:
-            parser = EntryXmlParser()
-            return parser.parse(entry_file)
-        except (AttributeError, XML.ParseError, ValueError) as ex:
-            self.stderr.write(
-                f'Error parsing entry from {entry_file.resolve()}.\n' +
-                f'Exception: {ex}', self.style.ERROR)
-        return None
+            for element in self.parser.iter_entry_elements(source):
+                conversion_time = self.parser.conversion_time
+                try:
+                    entry, error = self.parser.parse_element(element), None
+                except (AttributeError, ValueError) as ex:
+                    entry, error = None, str(ex)
+                convert_time = self.parser.conversion_time - conversion_time
+                parse_time = time.perf_counter() - start - convert_time
+                yield (location, entry, error, (parse_time, convert_time))
+                start = time.perf_counter()
+        except XML.ParseError as ex:
+            yield (location, None, str(ex), (time.perf_counter() - start, 0))
+
+    def __is_xml(self, name: str) -> bool:
+        """Check if the name of the archive member is an XML file name.
+
+        Parameters
+        ----------
+        name: str, required
+            The name of the archive member.
+
+        Returns
+        -------
+        is_xml: bool
+            True if the name has the .xml extension; False otherwise.
+        """
+        return name.lower().endswith('.xml')
 
 
 class EntryXmlParser:
     """Parse the contents of an XML into an Entry."""
 
+    READ_SIZE = 64 * 1024
+    XML_DECLARATION = re.compile(rb'(?:\xef\xbb\xbf)?<\?xml[^>]*\?>')
+
+    def __init__(self):
+        """Initialize the parser."""
+        # The time spent converting the markdown of the entries, in seconds.
+        self.conversion_time = 0.0
+
     def parse(self, xml_file: Path) -> Entry | None:
         """Parse the contents of the provided file into an Entry.
 
@@ -118,7 +1064,104 @@ class EntryXmlParser:
             The entry or None.
         """
         tree = XML.parse(xml_file)
-        root = tree.getroot()
+        return self.parse_element(tree.getroot())
+
+    def iterparse(self, source: BinaryIO) -> Iterator[Entry]:
+        """Parse the entries from the provided stream one at a time.
+
+        Parameters
+        ----------
+        source: binary file object, required
+            The stream containing one or more entries.
+
+        Returns
+        -------
+        entries: iterator of Entry
+            The entries read from the stream.
+        """
+        for element in self.iter_entry_elements(source):
+            yield self.parse_element(element)
+
+    def iter_entry_elements(self, source: BinaryIO) -> Iterator[XML.Element]:
+        """Iterate through the <entry> elements of the provided stream.
+
+        The stream can contain a single entry, a document whose root contains
+        several entries, or several concatenated documents. Each element is
+        cleared and detached from its parent after being yielded, so the
+        memory used does not depend on the size of the stream.
+
+        Parameters
+        ----------
+        source: binary file object, required
+            The stream containing one or more entries.
+
+        Returns
+        -------
+        elements: iterator of Element
+            The <entry> elements of the stream.
+        """
+        parser = XML.XMLPullParser(events=('start', 'end'))
+        # Wrap the contents into a single root, so that concatenated
+        # documents are well-formed.
+        parser.feed(b'<entries>')
+        open_elements, carry = [], b''
+        while chunk := source.read(self.READ_SIZE):
+            data = carry + chunk
+            # Keep an incomplete tag for the next chunk, so that the XML
+            # declarations can be removed.
+            cut = data.rfind(b'<')
+            if cut != -1 and data.find(b'>', cut) == -1:
+                data, carry = data[:cut], data[cut:]
+            else:
+                carry = b''
+            parser.feed(self.XML_DECLARATION.sub(b'', data))
+            yield from self.__read_entry_elements(parser, open_elements)
+        parser.feed(carry + b'</entries>')
+        parser.close()
+        yield from self.__read_entry_elements(parser, open_elements)
+
+    def __read_entry_elements(
+            self, parser: XML.XMLPullParser,
+            open_elements: list[XML.Element]) -> Iterator[XML.Element]:
+        """Read the complete <entry> elements from the parser.
+
+        Parameters
+        ----------
+        parser: XMLPullParser, required
+            The parser fed with the contents of the stream.
+        open_elements: list of Element, required
+            The stack of elements that were started but not ended.
+
+        Returns
+        -------
+        elements: iterator of Element
+            The complete <entry> elements.
+        """
+        for event, element in parser.read_events():
+            if event == 'start':
+                open_elements.append(element)
+                continue
+            open_elements.pop()
+            if element.tag != 'entry':
+                continue
+            yield element
+            element.clear()
+            if open_elements:
+                open_elements[-1].remove(element)
+
+    def parse_element(self, root: XML.Element) -> Entry:
+        """Parse the <entry> element into an Entry.
+
+        Parameters
+        ----------
+        root: Element, required
+            The element that represents the entry.
+
+        Returns
+        -------
+        entry: Entry
+            The entry.
+        """
         id = self.__parse_id(root)
         title_word, title_word_md5 = self.__parse_title_word(root, 'titleWord')
         twn, twn_md5 = self.__parse_title_word(root, 'titleWordNormalized')
@@ -128,6 +1171,7 @@ class EntryXmlParser:
                      title_word_md5=title_word_md5,
                      title_word_normalized=twn,
                      title_word_normalized_md5=twn_md5,
+                     search_key=to_search_key(title_word),
                      text_html=text_html,
                      text_md5=text_md5)
 
@@ -147,11 +1191,11 @@ class EntryXmlParser:
         converter = DictMarkdownToHtmlConverter()
         for elem in xml_root.iter('body'):
             md5 = elem.get('md5hash')
-            paragraphs = elem.iter('paragraph')
-            html = '\n'.join([
-                f'<p>{converter.convert(p.text)}</p>' for p in paragraphs
-                if p.text
-            ])
+            texts = [p.text for p in elem.iter('paragraph') if p.text]
+            start = time.perf_counter()
+            html = '\n'.join(
+                [f'<p>{converter.convert(text)}</p>' for text in texts])
+            self.conversion_time += time.perf_counter() - start
             return (html, md5)
 
         return ('', '')
@@ -198,12 +1242,36 @@ class EntryXmlParser:
         return int(val)
 
 
+# A bold mark next to an italic mark, which is not part of a longer run.
+BOLD_ITALIC_MARK = re.compile(r'(?<!\*)\*\*\*(?!\*)')
+
+
 class DictMarkdownToHtmlConverter:
     """Converts DictMarkdown to HTML."""
 
+    def __init__(self):
+        """Initialize the converter."""
+        self.tags = {
+            DictMarkdown.ITALIC: DictMarkdownHtmlTags.ITALIC,
+            DictMarkdown.SUBSCRIPT: DictMarkdownHtmlTags.SUBSCRIPT,
+            DictMarkdown.SUPERSCRIPT: DictMarkdownHtmlTags.SUPERSCRIPT,
+            DictMarkdown.SPACED: DictMarkdownHtmlTags.SPACED,
+            DictMarkdown.REF: DictMarkdownHtmlTags.REF,
+        }
+        # The bold mark must come first so that it is not split into two
+        # italic marks; a run of exactly three marks opens or closes both
+        # tags, so it is matched as a single token and the tags are nested.
+        marks = [DictMarkdown.BOLD, *self.tags.keys()]
+        self.pattern = re.compile('(' + BOLD_ITALIC_MARK.pattern + '|' +
+                                  '|'.join(map(re.escape, marks)) + ')')
+
     def convert(self, text: str) -> str:
         """Convert the dict markdown string to HTML.
 
+        The text is split into marks and the runs of text between them in a
+        single pass, and the HTML is collected into a list which is joined at
+        the end.
+
         Parameters
         ----------
         text: str, required
@@ -214,113 +1282,80 @@ class DictMarkdownToHtmlConverter:
         html: str
             The text converted to HTML.
         """
-        text = self.__handle_bold(text)
-        html = ''
+        html = []
         open_marks = []
-        collection = iter(text)
-        c = next(collection, None)
-        while c:
-            match c:
-                case DictMarkdown.SUPERSCRIPT:
-                    html = self.__append_tag(html, DictMarkdown.SUPERSCRIPT,
-                                             open_marks,
-                                             DictMarkdownHtmlTags.SUPERSCRIPT)
-                case DictMarkdown.SUBSCRIPT:
-                    html = self.__append_tag(html, DictMarkdown.SUBSCRIPT,
-                                             open_marks,
-                                             DictMarkdownHtmlTags.SUBSCRIPT)
-                case DictMarkdown.SPACED:
-                    html = self.__append_tag(html, DictMarkdown.SPACED,
-                                             open_marks,
-                                             DictMarkdownHtmlTags.SPACED)
-                case DictMarkdown.ITALIC:
-                    html = self.__append_tag(html, DictMarkdown.ITALIC,
-                                             open_marks,
-                                             DictMarkdownHtmlTags.ITALIC)
-                case DictMarkdown.REF:
-                    html = self.__append_tag(html, DictMarkdown.REF,
-                                             open_marks,
-                                             DictMarkdownHtmlTags.REF)
-                case _:
-                    html += c
-            c = next(collection, None)
-        return html
-
-    def __append_tag(self, text: str, mark: str, open_marks: list[str],
-                     tag_name: str) -> str:
-        """Append the open/closing tag according to mark to the provided text.
+        tokens = self.pattern.split(text)
+        # The bold marks are paired starting from the end of the text.
+        bold_marks = [DictMarkdown.BOLD, DictMarkdown.BOLD_ITALIC]
+        is_closing_bold = sum(mark in bold_marks
+                              for mark in tokens[1::2]) % 2 == 1
+        # The number of marks which were open when the bold tag was opened.
+        bold_depth = 0
+        html.append(tokens[0])
+        for idx in range(1, len(tokens), 2):
+            mark = tokens[idx]
+            if mark in bold_marks and not is_closing_bold:
+                bold_depth = len(open_marks)
+            if mark == DictMarkdown.BOLD:
+                html.append(
+                    self.__tag(DictMarkdownHtmlTags.BOLD, is_closing_bold))
+            elif mark == DictMarkdown.BOLD_ITALIC:
+                is_inner_italic = len(open_marks) > bold_depth
+                bold = self.__tag(DictMarkdownHtmlTags.BOLD, is_closing_bold)
+                italic = self.__append_tag(DictMarkdown.ITALIC, open_marks)
+                # The inner tag is closed first.
+                is_closing_italic = italic.startswith('</')
+                if is_closing_italic and (is_inner_italic
+                                          or not is_closing_bold):
+                    html.append(italic + bold)
+                else:
+                    html.append(bold + italic)
+            else:
+                html.append(self.__append_tag(mark, open_marks))
+            if mark in bold_marks:
+                is_closing_bold = not is_closing_bold
+            html.append(tokens[idx + 1])
+        return ''.join(html)
+
+    def __append_tag(self, mark: str, open_marks: list[str]) -> str:
+        """Get the open/closing tag according to mark.
 
         Parameters
         ----------
-        text: str, required
-            The text to append the tag to.
         mark: str, required
             The dict-markdown mark for which to apend the tag.
         open_marks: list of str, required
             The stack of open marks.
-        tag_name: str, required
-            The name of the tag to append.
 
         Returns
         -------
-        updated_text: str,
-            The text with the proper tag added to it.
+        tag: str,
+            The opening tag if the mark is not the last open mark; the closing
+            tag otherwise.
         """
-        last = open_marks.pop() if len(open_marks) > 0 else None
-        if last == mark:
-            return text + f'</{tag_name}>'
+        if open_marks and open_marks[-1] == mark:
+            open_marks.pop()
+            return self.__tag(self.tags[mark], True)
 
-        if last is not None:
-            open_marks.append(last)
         open_marks.append(mark)
-        return text + f'<{tag_name}>'
-
-    def __handle_bold(self, dict_markdown: str) -> str:
-        """Handle the bold marks in the text.
-
-        Parameters
-        ----------
-        text: str, required
-            The text in dict-markdown format.
-
-        Returns
-        -------
-        partial_html: str
-            The text with the bold marks replaced with proper HTML tag.
-        """
-        pos = self.__find_bold_marks(dict_markdown)
-
-        is_closing = True
-        for idx in reversed(pos):
-            tag_name = DictMarkdownHtmlTags.BOLD
-            tag = f'</{tag_name}>' if is_closing else f'<{tag_name}>'
-            if idx + 2 > len(dict_markdown):
-                dict_markdown = f'{dict_markdown[:idx]}{tag}'
-            else:
-                left, right = dict_markdown[:idx], dict_markdown[idx + 2:]
-                dict_markdown = f'{left}{tag}{right}'
-            is_closing = not is_closing
-        return dict_markdown
+        return self.__tag(self.tags[mark], False)
 
-    def __find_bold_marks(self, text: str) -> list[int]:
-        """Find the bold marks '**' in text, and return positions.
+    def __tag(self, tag_name: str, is_closing: bool) -> str:
+        """Build the HTML tag with the specified name.
 
         Parameters
         ----------
-        text: str, required
-            The text in dict-markdown format.
+        tag_name: str, required
+            The name of the tag.
+        is_closing: bool, required
+            If true, build the closing tag; otherwise build the opening tag.
 
         Returns
         -------
-        pos: list of int
-            The positions of bold marks in text.
+        tag: str
+            The HTML tag.
         """
-        pos = []
-        idx = text.find(DictMarkdown.BOLD, 0)
-        while idx != -1:
-            pos.append(idx)
-            idx = text.find(DictMarkdown.BOLD, idx + 1)
-        return pos
+        return f'</{tag_name}>' if is_closing else f'<{tag_name}>'
 
 
 class DictMarkdownHtmlTags:
@@ -337,6 +1372,7 @@ class DictMarkdownHtmlTags:
 class DictMarkdown:
     """The markup symbols for dict-markdown."""
 
+    BOLD_ITALIC = '***'
     BOLD = '**'
     ITALIC = '*'
     SUBSCRIPT = '_'
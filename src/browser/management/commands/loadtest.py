@@ -0,0 +1,177 @@
+"""Defines the command for load testing a running deployment."""
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+from urllib.error import URLError
+from urllib.request import urlopen
+import json
+import math
+import time
+
+
+class Command(BaseCommand):
+    """Implements the command for load testing a running deployment."""
+
+    help = (
+        "Send concurrent slow and fast requests to a running deployment, " +
+        "and report the throughput and latency of each kind.")
+
+    def add_arguments(self, parser):
+        """Add command-line arguments.
+
+        Parameters
+        ----------
+        parser: argparse.Parser, required
+            The command-line arguments parser.
+        """
+        parser.add_argument('--fast-url',
+                            help="The URL of the fast requests.",
+                            required=True)
+        parser.add_argument('--slow-url',
+                            help="The URL of the slow requests.",
+                            required=False)
+        parser.add_argument(
+            '--slow-clients',
+            help="The number of clients which send slow requests.",
+            required=False,
+            type=int,
+            default=8)
+        parser.add_argument(
+            '--fast-clients',
+            help="The number of clients which send fast requests.",
+            required=False,
+            type=int,
+            default=8)
+        parser.add_argument('--duration',
+                            help="The duration of the test, in seconds.",
+                            required=False,
+                            type=float,
+                            default=20)
+        parser.add_argument('--timeout',
+                            help="The timeout of a request, in seconds.",
+                            required=False,
+                            type=float,
+                            default=30)
+        parser.add_argument('--output',
+                            help="The path of the JSON file with the results.",
+                            required=False)
+
+    def handle(self, *args, **options):
+        """Run the load test."""
+        clients = [('fast', options['fast_url'])] * options['fast_clients']
+        if options['slow_url']:
+            clients += [('slow', options['slow_url'])
+                        ] * options['slow_clients']
+        if not clients:
+            raise CommandError("There are no clients.")
+
+        deadline = time.perf_counter() + options['duration']
+        with ThreadPoolExecutor(max_workers=len(clients)) as executor:
+            futures = [
+                executor.submit(self.__run_client, url, deadline,
+                                options['timeout']) for _, url in clients
+            ]
+            latencies = {kind: [] for kind, _ in clients}
+            errors = dict.fromkeys(latencies, 0)
+            for (kind, _), future in zip(clients, futures):
+                client_latencies, client_errors = future.result()
+                latencies[kind].extend(client_latencies)
+                errors[kind] += client_errors
+
+        report = {
+            kind:
+            self.__summarize(latencies[kind], errors[kind],
+                             options['duration'])
+            for kind in latencies
+        }
+        for kind, summary in report.items():
+            self.stdout.write(
+                f"{kind}: {summary['requests']} requests, " +
+                f"{summary['errors']} errors, " +
+                f"{summary['throughput']:.1f} req/sec, " +
+                f"p50 {summary['p50']:.1f} ms, p95 {summary['p95']:.1f} ms, " +
+                f"p99 {summary['p99']:.1f} ms")
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(report, output, indent=2)
+
+    def __run_client(self, url: str, deadline: float,
+                     timeout: float) -> tuple[list[float], int]:
+        """Send requests one after another until the deadline.
+
+        Parameters
+        ----------
+        url: str, required
+            The URL of the requests.
+        deadline: float, required
+            The time, as returned by time.perf_counter(), when the client
+            stops sending requests.
+        timeout: float, required
+            The timeout of a request, in seconds.
+
+        Returns
+        -------
+        (latencies, errors): tuple of (list of float, int)
+            The latencies of the successful requests, in seconds, and the
+            number of failed requests.
+        """
+        latencies, errors = [], 0
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                with urlopen(url, timeout=timeout) as response:
+                    response.read()
+                latencies.append(time.perf_counter() - start)
+            except (URLError, OSError):
+                errors = errors + 1
+        return latencies, errors
+
+    def __summarize(self, latencies: list[float], errors: int,
+                    duration: float) -> dict:
+        """Summarize the latencies of the requests of a kind.
+
+        Parameters
+        ----------
+        latencies: list of float, required
+            The latencies of the successful requests, in seconds.
+        errors: int, required
+            The number of failed requests.
+        duration: float, required
+            The duration of the test, in seconds.
+
+        Returns
+        -------
+        summary: dict
+            The number of requests and errors, the throughput in requests per
+            second and the latency percentiles in milliseconds.
+        """
+        latencies = sorted(latencies)
+        summary = {
+            'requests': len(latencies),
+            'errors': errors,
+            'throughput': len(latencies) / duration
+        }
+        for percentile in [50, 95, 99]:
+            summary[f'p{percentile}'] = self.__percentile(
+                latencies, percentile) * 1000
+        return summary
+
+    def __percentile(self, values: list[float], percentile: int) -> float:
+        """Get the percentile of the sorted values (nearest rank).
+
+        Parameters
+        ----------
+        values: list of float, required
+            The sorted values.
+        percentile: int, required
+            The percentile.
+
+        Returns
+        -------
+        value: float
+            The value of the percentile, or 0 if there are no values.
+        """
+        if not values:
+            return 0
+        rank = math.ceil(percentile / 100 * len(values))
+        return values[max(rank, 1) - 1]
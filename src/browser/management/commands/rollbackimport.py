@@ -0,0 +1,56 @@
+"""Defines the command for restoring the tables replaced by an import."""
+from browser.models.data_generation import DataGeneration
+from browser.search.snapshot import SnapshotWriter
+from browser.shadow import ShadowTables
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+from django.db import connection
+from pathlib import Path
+
+
+class Command(BaseCommand):
+    """Implements the command for restoring the tables of an import."""
+
+    help = "Restore the tables replaced by the last shadow import."
+
+    def add_arguments(self, parser):
+        """Add command-line arguments.
+
+        Parameters
+        ----------
+        parser: argparse.Parser, required
+            The command-line arguments parser.
+        """
+        parser.add_argument(
+            '--snapshot',
+            help="If specified the snapshot of the entries is written " +
+            "again from the restored tables, at the path of the " +
+            "SNAPSHOT_PATH setting.",
+            required=False,
+            default=False,
+            action='store_true')
+
+    def handle(self, *args, **options):
+        """Restore the tables."""
+        if connection.vendor != 'postgresql':
+            raise CommandError('The shadow import requires PostgreSQL.')
+        if options['snapshot'] and not settings.SNAPSHOT_PATH:
+            raise CommandError('The SNAPSHOT_PATH setting is not set.')
+        shadow = ShadowTables()
+        if not shadow.has_previous():
+            raise CommandError('There are no tables to restore.')
+        try:
+            shadow.check_previous(DataGeneration.current())
+        except ValueError as error:
+            raise CommandError(f'The tables cannot be restored: {error}')
+        shadow.rollback()
+        self.stdout.write('Restored the tables replaced by the last import.')
+        if options['snapshot']:
+            path = Path(settings.SNAPSHOT_PATH)
+            compressed = settings.ENTRY_HTML_STORAGE == 'compressed'
+            count = SnapshotWriter(path, compressed).write()
+            self.stdout.write(f'Wrote the snapshot of {count} entries.')
+        generation = DataGeneration.bump()
+        shadow.record_previous(generation)
+        self.stdout.write(f'Data generation is now {generation}.')
@@ -1,28 +1,52 @@
 """Module for custom middleware."""
+from asgiref.sync import iscoroutinefunction
+from asgiref.sync import markcoroutinefunction
+from browser.instrumentation import RequestTimings
+from browser.instrumentation import current_timings
+from browser.instrumentation import metrics
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
 from django.urls import set_script_prefix
+import json
+import logging
 import re
 
+logger = logging.getLogger(__name__)
+
 
 class RoutePrefixMiddleware:
     """Adds a prefix to routes."""
 
     REQUEST_HEADER = 'HTTP_X_BROWSE_BASE_URL'
 
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         """Initialize the middleware."""
         self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
 
     def __call__(self, request):
         """Call the middleware."""
+        self.__set_prefix(request)
+        return self.get_response(request)
+
+    def __set_prefix(self, request):
+        """Strip the prefix from the path of the request, if valid.
+
+        Parameters
+        ----------
+        request: HttpRequest, required
+            The request object.
+        """
         script_name = request.META.get(self.REQUEST_HEADER, '')
         path_info = request.path_info
         if self.__is_valid(script_name) and path_info.startswith(script_name):
             request.path_info = request.path_info[len(script_name):]
             set_script_prefix(script_name)
 
-        response = self.get_response(request)
-        return response
-
     def __is_valid(self, script_name: str) -> bool:
         """Check whether the provided script name is valid.
 
@@ -44,3 +68,87 @@ class RoutePrefixMiddleware:
 
         return re.fullmatch(r"\/[a-zA-z]([a-zA-Z0-9/\-_]+)?(\/)?",
                             script_name) is not None
+
+
+class InstrumentationMiddleware:
+    """Measures the requests.
+
+    The durations of the database queries and of the phases marked by the
+    views are sent in the Server-Timing header, logged as a JSON record and
+    aggregated into the exported metrics. The middleware is used only if the
+    INSTRUMENTATION setting is true.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        """Initialize the middleware."""
+        if not settings.INSTRUMENTATION:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        """Call the middleware."""
+        if iscoroutinefunction(self):
+            return self.__acall(request)
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_timings.reset(token)
+        return self.__record(request, response, timings)
+
+    async def __acall(self, request):
+        """Call the middleware asynchronously."""
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_timings.reset(token)
+        return self.__record(request, response, timings)
+
+    def __record(self, request, response, timings: RequestTimings):
+        """Record the measurements of the request.
+
+        Parameters
+        ----------
+        request: HttpRequest, required
+            The request object.
+        response: HttpResponse, required
+            The response.
+        timings: RequestTimings, required
+            The measurements of the request.
+
+        Returns
+        -------
+        response: HttpResponse
+            The response, with the Server-Timing header.
+        """
+        total = timings.elapsed()
+        match = request.resolver_match
+        view = match.view_name if match is not None else 'unresolved'
+        metrics.observe(view, response.status_code, timings, total)
+        metrics.flush()
+        response['Server-Timing'] = timings.server_timing(total)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                json.dumps({
+                    'method': request.method,
+                    'path': request.path,
+                    'view': view,
+                    'status': response.status_code,
+                    'duration_ms': round(total * 1000, 3),
+                    'db_queries': timings.queries,
+                    'db_ms': round(timings.query_time * 1000, 3),
+                    'phases_ms': {
+                        name: round(duration * 1000, 3)
+                        for name, duration in timings.phases.items()
+                    },
+                    'results': timings.results,
+                }))
+        return response
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.4 on 2026-10-18 08:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("browser", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ImportedFile",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("path", models.TextField(max_length=4096, unique=True)),
+                ("size", models.PositiveBigIntegerField()),
+                ("modification_time", models.BigIntegerField()),
+                ("title_word_md5", models.TextField(blank=True, max_length=32)),
+                (
+                    "title_word_normalized_md5",
+                    models.TextField(blank=True, max_length=32),
+                ),
+                ("text_md5", models.TextField(blank=True, max_length=32)),
+                ("row_creation_timestamp", models.DateTimeField(auto_now_add=True)),
+                ("row_update_timestamp", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,55 @@
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+# The indexes are built on the same expressions as the ones generated by the
+# case-insensitive lookups, i.e. UPPER(<column>).
+SEARCH_INDEXES = [
+    (
+        "browser_entry_tw_upper_trgm",
+        "USING gin (UPPER(title_word) gin_trgm_ops)",
+    ),
+    (
+        "browser_entry_twn_upper_trgm",
+        "USING gin (UPPER(title_word_normalized) gin_trgm_ops)",
+    ),
+    (
+        "browser_entry_tw_upper_pattern",
+        "(UPPER(title_word) text_pattern_ops)",
+    ),
+    (
+        "browser_entry_twn_upper_pattern",
+        "(UPPER(title_word_normalized) text_pattern_ops)",
+    ),
+]
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name, definition in SEARCH_INDEXES:
+        schema_editor.execute(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} "
+            f"ON browser_entry {definition}"
+        )
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name, _ in SEARCH_INDEXES:
+        schema_editor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+
+    # The indexes are built concurrently, which cannot run in a transaction.
+    atomic = False
+
+    dependencies = [
+        ("browser", "0002_imported_file"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
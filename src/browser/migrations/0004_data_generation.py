@@ -0,0 +1,29 @@
+# Generated by Django 5.2.4 on 2026-10-18 08:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("browser", "0003_entry_search_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DataGeneration",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("value", models.PositiveBigIntegerField(default=0)),
+                ("row_update_timestamp", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-18 08:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("browser", "0004_data_generation"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="entry",
+            index=models.Index(
+                fields=["title_word", "id"], name="browser_entry_tw_id_idx"
+            ),
+        ),
+    ]
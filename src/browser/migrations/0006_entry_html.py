@@ -0,0 +1,32 @@
+# Generated by Django 5.2.4 on 2026-10-18 08:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("browser", "0005_entry_title_word_id_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EntryHtml",
+            fields=[
+                (
+                    "entry",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="compressed_html",
+                        serialize=False,
+                        to="browser.entry",
+                    ),
+                ),
+                ("data", models.BinaryField()),
+                ("crc32", models.BigIntegerField()),
+                ("size", models.PositiveIntegerField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,52 @@
+from browser.compression import compress
+from browser.compression import decompress
+from django.conf import settings
+from django.db import migrations
+
+CHUNK_SIZE = 1000
+
+
+def compress_entry_html(apps, schema_editor):
+    """Compress the HTML of the existing entries, if enabled."""
+    if settings.ENTRY_HTML_STORAGE != "compressed":
+        return
+    Entry = apps.get_model("browser", "Entry")
+    EntryHtml = apps.get_model("browser", "EntryHtml")
+    last_id = 0
+    while True:
+        rows = list(
+            Entry.objects.filter(id__gt=last_id)
+            .exclude(text_html="")
+            .order_by("id")
+            .values_list("id", "text_html")[:CHUNK_SIZE]
+        )
+        if not rows:
+            return
+        bodies = []
+        for id, text_html in rows:
+            data, crc32, size = compress(text_html)
+            bodies.append(EntryHtml(entry_id=id, data=data, crc32=crc32, size=size))
+        EntryHtml.objects.bulk_create(bodies)
+        Entry.objects.filter(id__in=[id for id, _ in rows]).update(text_html="")
+        last_id = rows[-1][0]
+
+
+def decompress_entry_html(apps, schema_editor):
+    """Move the compressed HTML back into the entries table."""
+    Entry = apps.get_model("browser", "Entry")
+    EntryHtml = apps.get_model("browser", "EntryHtml")
+    for body in EntryHtml.objects.iterator(chunk_size=CHUNK_SIZE):
+        Entry.objects.filter(id=body.entry_id).update(
+            text_html=decompress(bytes(body.data))
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("browser", "0006_entry_html"),
+    ]
+
+    operations = [
+        migrations.RunPython(compress_entry_html, decompress_entry_html),
+    ]
@@ -0,0 +1,131 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:17
+
+import unicodedata
+
+from django.db import migrations, models, transaction
+
+CHUNK_SIZE = 1000
+
+# The search keys are folded, so the contains lookups are served by a
+# trigram index on the column itself.
+SEARCH_KEY_INDEX = (
+    "browser_entry_search_key_trgm",
+    "USING gin (search_key gin_trgm_ops)",
+)
+
+# The expression indexes which served the case-insensitive lookups.
+UPPER_INDEXES = [
+    (
+        "browser_entry_tw_upper_trgm",
+        "USING gin (UPPER(title_word) gin_trgm_ops)",
+    ),
+    (
+        "browser_entry_twn_upper_trgm",
+        "USING gin (UPPER(title_word_normalized) gin_trgm_ops)",
+    ),
+    (
+        "browser_entry_tw_upper_pattern",
+        "(UPPER(title_word) text_pattern_ops)",
+    ),
+    (
+        "browser_entry_twn_upper_pattern",
+        "(UPPER(title_word_normalized) text_pattern_ops)",
+    ),
+]
+
+
+# A frozen copy of browser.search.terms.to_search_key(), so that the search
+# keys computed by this migration do not change with the application code.
+def build_search_key_table():
+    table = {}
+    for code in range(0x250):
+        char = chr(code)
+        nfkd_form = unicodedata.normalize("NFKD", char)
+        base = "".join([c for c in nfkd_form if not unicodedata.combining(c)])
+        base = base.casefold()
+        table[code] = base if base.isascii() else char
+    for code in range(0x300, 0x370):
+        table[code] = None
+    return table
+
+
+SEARCH_KEY_TABLE = build_search_key_table()
+
+
+def to_search_key(term):
+    search_key = term.translate(SEARCH_KEY_TABLE)
+    if search_key.isascii():
+        return search_key
+    nfkd_form = unicodedata.normalize("NFKD", term)
+    base = "".join([c for c in nfkd_form if not unicodedata.combining(c)])
+    return base.casefold()
+
+
+def fill_search_keys(apps, schema_editor):
+    """Compute the search keys of the existing entries."""
+    Entry = apps.get_model("browser", "Entry")
+    last_id = 0
+    while True:
+        rows = list(
+            Entry.objects.filter(id__gt=last_id)
+            .order_by("id")
+            .values_list("id", "title_word")[:CHUNK_SIZE]
+        )
+        if not rows:
+            return
+        entries = [
+            Entry(id=id, search_key=to_search_key(title_word))
+            for id, title_word in rows
+        ]
+        with transaction.atomic():
+            Entry.objects.bulk_update(entries, ["search_key"])
+        last_id = rows[-1][0]
+
+
+def create_index(schema_editor, name, definition):
+    schema_editor.execute(
+        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} "
+        f"ON browser_entry {definition}"
+    )
+
+
+def drop_index(schema_editor, name):
+    schema_editor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+
+
+def replace_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    create_index(schema_editor, *SEARCH_KEY_INDEX)
+    for name, _ in UPPER_INDEXES:
+        drop_index(schema_editor, name)
+
+
+def restore_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name, definition in UPPER_INDEXES:
+        create_index(schema_editor, name, definition)
+    drop_index(schema_editor, SEARCH_KEY_INDEX[0])
+
+
+class Migration(migrations.Migration):
+
+    # The indexes are built concurrently, which cannot run in a transaction.
+    atomic = False
+
+    dependencies = [
+        ("browser", "0007_backfill_entry_html"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="entry",
+            name="search_key",
+            field=models.TextField(
+                blank=True, db_index=True, default="", max_length=100
+            ),
+        ),
+        migrations.RunPython(fill_search_keys, migrations.RunPython.noop),
+        migrations.RunPython(replace_search_indexes, restore_search_indexes),
+    ]
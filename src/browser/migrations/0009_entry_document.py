@@ -0,0 +1,124 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:22
+
+import django.contrib.postgres.search
+import django.db.models.deletion
+from browser.compression import decompress
+from browser.models.entry_document import html_to_text
+from django.contrib.postgres.operations import UnaccentExtension
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations, models, transaction
+from django.db.models import Value
+
+CHUNK_SIZE = 1000
+
+# The Romanian configuration, whose words are stemmed after their
+# diacritics are removed, so that the terms match with or without them.
+TEXT_SEARCH_CONFIG = "romanian_unaccent"
+
+VECTOR_INDEX = "browser_entrydocument_vector_gin"
+
+
+def create_text_search_config(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        f"CREATE TEXT SEARCH CONFIGURATION {TEXT_SEARCH_CONFIG} "
+        "(COPY = pg_catalog.romanian)"
+    )
+    schema_editor.execute(
+        f"ALTER TEXT SEARCH CONFIGURATION {TEXT_SEARCH_CONFIG} "
+        "ALTER MAPPING FOR hword, hword_part, word WITH unaccent, romanian_stem"
+    )
+
+
+def drop_text_search_config(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        f"DROP TEXT SEARCH CONFIGURATION IF EXISTS {TEXT_SEARCH_CONFIG}"
+    )
+
+
+def create_entry_documents(apps, schema_editor):
+    """Build the documents of the existing entries."""
+    Entry = apps.get_model("browser", "Entry")
+    EntryHtml = apps.get_model("browser", "EntryHtml")
+    EntryDocument = apps.get_model("browser", "EntryDocument")
+    is_postgresql = schema_editor.connection.vendor == "postgresql"
+    config = TEXT_SEARCH_CONFIG
+    last_id = 0
+    while True:
+        rows = list(
+            Entry.objects.filter(id__gt=last_id)
+            .order_by("id")
+            .values_list("id", "title_word", "text_html")[:CHUNK_SIZE]
+        )
+        if not rows:
+            return
+        compressed = {
+            body.entry_id: decompress(bytes(body.data))
+            for body in EntryHtml.objects.filter(
+                entry_id__in=[id for id, _, text_html in rows if not text_html]
+            )
+        }
+        documents = []
+        for id, title_word, text_html in rows:
+            text = html_to_text(text_html or compressed.get(id, ""))
+            vector = None
+            if is_postgresql:
+                vector = SearchVector(
+                    Value(title_word), config=config, weight="A"
+                ) + SearchVector(Value(text), config=config, weight="B")
+            documents.append(EntryDocument(entry_id=id, text=text, vector=vector))
+        with transaction.atomic():
+            EntryDocument.objects.bulk_create(documents)
+        last_id = rows[-1][0]
+
+
+def create_vector_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {VECTOR_INDEX} "
+        "ON browser_entrydocument USING gin (vector)"
+    )
+
+
+def drop_vector_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {VECTOR_INDEX}")
+
+
+class Migration(migrations.Migration):
+
+    # The index is built concurrently, which cannot run in a transaction.
+    atomic = False
+
+    dependencies = [
+        ("browser", "0008_entry_search_key"),
+    ]
+
+    operations = [
+        UnaccentExtension(),
+        migrations.RunPython(create_text_search_config, drop_text_search_config),
+        migrations.CreateModel(
+            name="EntryDocument",
+            fields=[
+                (
+                    "entry",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="document",
+                        serialize=False,
+                        to="browser.entry",
+                    ),
+                ),
+                ("text", models.TextField()),
+                ("vector", django.contrib.postgres.search.SearchVectorField(null=True)),
+            ],
+        ),
+        migrations.RunPython(create_entry_documents, migrations.RunPython.noop),
+        migrations.RunPython(create_vector_index, drop_vector_index),
+    ]
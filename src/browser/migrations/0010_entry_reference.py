@@ -0,0 +1,59 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("browser", "0009_entry_document"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EntryReference",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("position", models.PositiveIntegerField()),
+                ("cited_word", models.TextField(blank=True, max_length=100)),
+                (
+                    "search_key",
+                    models.TextField(blank=True, db_index=True, max_length=100),
+                ),
+                (
+                    "entry",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="references",
+                        to="browser.entry",
+                    ),
+                ),
+                (
+                    "target",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="citations",
+                        to="browser.entry",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("entry", "position"),
+                        name="browser_entryreference_position",
+                    )
+                ],
+            },
+        ),
+    ]
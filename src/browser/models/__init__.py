@@ -1,2 +1,7 @@
 """Defines the models of the application."""
+from browser.models.data_generation import DataGeneration
 from browser.models.entry import Entry
+from browser.models.entry_document import EntryDocument
+from browser.models.entry_html import EntryHtml
+from browser.models.entry_reference import EntryReference
+from browser.models.imported_file import ImportedFile
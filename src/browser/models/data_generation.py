@@ -0,0 +1,48 @@
+"""Define the DataGeneration model."""
+from django.db import models
+from django.db import transaction
+
+
+class DataGeneration(models.Model):
+    """Represents the generation of the dictionary data.
+
+    The generation is incremented after each import which changed the
+    entries; the caches derived from the entries are valid for a single
+    generation.
+    """
+
+    value = models.PositiveBigIntegerField(null=False, default=0)
+    row_update_timestamp = models.DateTimeField(auto_now=True)
+
+    @classmethod
+    def current(cls) -> int:
+        """Get the current generation of the data.
+
+        Returns
+        -------
+        generation: int
+            The current generation; 0 if the data was never imported.
+        """
+        value = cls.objects.values_list('value', flat=True).first()
+        return value or 0
+
+    @classmethod
+    def bump(cls) -> int:
+        """Increment the generation of the data.
+
+        Returns
+        -------
+        generation: int
+            The new generation.
+        """
+        with transaction.atomic():
+            generation = cls.objects.select_for_update().first()
+            if generation is None:
+                generation = cls(value=0)
+            generation.value = generation.value + 1
+            generation.save()
+        return generation.value
+
+    def __str__(self):
+        """Override the string representation of the model."""
+        return str(self.value)
@@ -22,6 +22,13 @@ class Entry(models.Model):
                                                  null=False,
                                                  blank=False,
                                                  db_index=True)
+    # The title word without diacritics, in lower case, which is compared
+    # with the search terms; see browser.search.terms.to_search_key().
+    search_key = models.TextField(max_length=100,
+                                  null=False,
+                                  blank=True,
+                                  default='',
+                                  db_index=True)
     text_html = models.TextField(max_length=250_000, null=False)
     text_md5 = models.TextField(max_length=32,
                                 null=False,
@@ -34,15 +41,27 @@ class Entry(models.Model):
     row_creation_timestamp = models.DateTimeField(auto_now_add=True)
     row_update_timestamp = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        """Defines the metadata of the model."""
+
+        indexes = [
+            # Serves the keyset pagination of the search results.
+            models.Index(fields=['title_word', 'id'],
+                         name='browser_entry_tw_id_idx'),
+        ]
+
     def save(self, *args, **kwargs):
         """Save the entry to the database."""
+        self.increment_version()
+        return super(Entry, self).save(*args, **kwargs)
+
+    def increment_version(self):
+        """Increment the version of the entry before writing it."""
         if not self.id:
             self.version = 1
         else:
             self.version = self.version + 1
 
-        return super(Entry, self).save(*args, **kwargs)
-
     def is_equal_to(self, other) -> bool:
         """Check if the current entry is equal to the other entry."""
         return (self.title_word_md5 == other.title_word_md5
@@ -56,6 +75,7 @@ class Entry(models.Model):
         self.title_word_md5 = other.title_word_md5
         self.title_word_normalized = other.title_word_normalized
         self.title_word_normalized_md5 = other.title_word_normalized_md5
+        self.search_key = other.search_key
         self.text_html = other.text_html
         self.text_md5 = other.text_md5
 
@@ -0,0 +1,75 @@
+"""Define the EntryDocument model."""
+from browser.models.entry import Entry
+from django.conf import settings
+from django.contrib.postgres.search import SearchVector
+from django.contrib.postgres.search import SearchVectorField
+from django.db import connection
+from django.db import models
+from django.db.models import Value
+import html
+import re
+
+TAG = re.compile(r'<[^>]*>')
+
+
+def html_to_text(text_html: str) -> str:
+    """Strip the tags of the HTML of an entry.
+
+    Parameters
+    ----------
+    text_html: str, required
+        The HTML of the entry.
+
+    Returns
+    -------
+    text: str
+        The text of the entry.
+    """
+    return html.unescape(TAG.sub('', text_html))
+
+
+class EntryDocument(models.Model):
+    """Represents the text of an entry, indexed for the full-text search.
+
+    The search vector is built by the database from the title word and the
+    text, in the text search configuration of the FULL_TEXT_SEARCH_CONFIG
+    setting, when the document is written; it is kept only by PostgreSQL.
+    """
+
+    entry = models.OneToOneField(Entry,
+                                 primary_key=True,
+                                 on_delete=models.CASCADE,
+                                 related_name='document')
+    text = models.TextField(null=False)
+    vector = SearchVectorField(null=True)
+
+    @classmethod
+    def from_html(cls, entry_id: int, title_word: str, text_html: str):
+        """Create the document of an entry.
+
+        Parameters
+        ----------
+        entry_id: int, required
+            The id of the entry.
+        title_word: str, required
+            The title word of the entry, which is ranked above the text.
+        text_html: str, required
+            The HTML of the entry.
+
+        Returns
+        -------
+        document: EntryDocument
+            The document, whose vector is computed when it is written.
+        """
+        text = html_to_text(text_html)
+        vector = None
+        if connection.vendor == 'postgresql':
+            config = settings.FULL_TEXT_SEARCH_CONFIG
+            vector = (
+                SearchVector(Value(title_word), config=config, weight='A') +
+                SearchVector(Value(text), config=config, weight='B'))
+        return cls(entry_id=entry_id, text=text, vector=vector)
+
+    def __str__(self):
+        """Override the string representation of the model."""
+        return str(self.entry_id)
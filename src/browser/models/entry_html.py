@@ -0,0 +1,50 @@
+"""Define the EntryHtml model."""
+from browser.compression import compress
+from browser.compression import decompress
+from browser.models.entry import Entry
+from django.db import models
+
+
+class EntryHtml(models.Model):
+    """Represents the precompressed HTML of an entry."""
+
+    entry = models.OneToOneField(Entry,
+                                 primary_key=True,
+                                 on_delete=models.CASCADE,
+                                 related_name='compressed_html')
+    data = models.BinaryField(null=False)
+    crc32 = models.BigIntegerField(null=False)
+    size = models.PositiveIntegerField(null=False)
+
+    @classmethod
+    def from_text(cls, entry_id: int, text_html: str):
+        """Create the compressed HTML of an entry.
+
+        Parameters
+        ----------
+        entry_id: int, required
+            The id of the entry.
+        text_html: str, required
+            The HTML of the entry.
+
+        Returns
+        -------
+        entry_html: EntryHtml
+            The compressed HTML.
+        """
+        data, crc32, size = compress(text_html)
+        return cls(entry_id=entry_id, data=data, crc32=crc32, size=size)
+
+    def text(self) -> str:
+        """Decompress the HTML.
+
+        Returns
+        -------
+        text_html: str
+            The HTML of the entry.
+        """
+        return decompress(bytes(self.data))
+
+    def __str__(self):
+        """Override the string representation of the model."""
+        return str(self.entry_id)
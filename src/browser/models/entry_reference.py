@@ -0,0 +1,38 @@
+"""Define the EntryReference model."""
+from browser.models.entry import Entry
+from django.db import models
+
+
+class EntryReference(models.Model):
+    """Represents a headword cited by an entry, and the entry it refers to.
+
+    The references are extracted from the <cite> elements of the entries
+    when they are imported, and resolved by the search key of the cited
+    headword; the target is empty while no entry has that search key.
+    """
+
+    entry = models.ForeignKey(Entry,
+                              on_delete=models.CASCADE,
+                              related_name='references')
+    position = models.PositiveIntegerField(null=False)
+    cited_word = models.TextField(max_length=100, null=False, blank=True)
+    search_key = models.TextField(max_length=100,
+                                  null=False,
+                                  blank=True,
+                                  db_index=True)
+    target = models.ForeignKey(Entry,
+                               null=True,
+                               on_delete=models.SET_NULL,
+                               related_name='citations')
+
+    class Meta:
+        """Defines the metadata of the model."""
+
+        constraints = [
+            models.UniqueConstraint(fields=['entry', 'position'],
+                                    name='browser_entryreference_position'),
+        ]
+
+    def __str__(self):
+        """Override the string representation of the model."""
+        return f'{self.entry_id}:{self.position}'
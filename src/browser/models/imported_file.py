@@ -0,0 +1,40 @@
+"""Define the ImportedFile model."""
+from django.db import models
+
+
+class ImportedFile(models.Model):
+    """Represents the fingerprint of a file from the last import."""
+
+    path = models.TextField(max_length=4096,
+                            null=False,
+                            blank=False,
+                            unique=True)
+    size = models.PositiveBigIntegerField(null=False)
+    modification_time = models.BigIntegerField(null=False)
+    title_word_md5 = models.TextField(max_length=32, null=False, blank=True)
+    title_word_normalized_md5 = models.TextField(max_length=32,
+                                                 null=False,
+                                                 blank=True)
+    text_md5 = models.TextField(max_length=32, null=False, blank=True)
+    row_creation_timestamp = models.DateTimeField(auto_now_add=True)
+    row_update_timestamp = models.DateTimeField(auto_now=True)
+
+    def has_md5_hashes(self, md5_hashes: tuple[str, str, str]) -> bool:
+        """Check if the file had the specified MD5 sums when imported.
+
+        Parameters
+        ----------
+        md5_hashes: tuple of (str, str, str), required
+            The MD5 sums of the title word, normalized title word and text.
+
+        Returns
+        -------
+        has_md5_hashes: bool
+            True if the MD5 sums are equal to the recorded ones.
+        """
+        return (self.title_word_md5, self.title_word_normalized_md5,
+                self.text_md5) == md5_hashes
+
+    def __str__(self):
+        """Override the string representation of the model."""
+        return self.path
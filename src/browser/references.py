@@ -0,0 +1,226 @@
+"""Defines the cross-references between the entries.
+
+The headwords cited by an entry, i.e. the <cite> elements of its HTML, are
+resolved to entry ids when the entry is imported, and each citation is
+wrapped into a link to the page of the cited entry. The links are relative
+to the base URL of the pages, so the HTML does not depend on the prefix
+under which the application is served, and no query is needed when the
+entries are displayed.
+"""
+from browser.models.entry import Entry
+from browser.models.entry_document import html_to_text
+from browser.models.entry_html import EntryHtml
+from browser.models.entry_reference import EntryReference
+from browser.search.results import SearchPage
+from browser.search.terms import to_search_key
+from collections import defaultdict
+from django.db.models import Q
+from django.utils import timezone
+import re
+
+CITATION = re.compile(
+    r'(?:<a class="ref" href="entry/\d+">)?<cite>(.*?)</cite>(?:</a>)?',
+    re.DOTALL)
+
+
+def cited_words(text_html: str) -> list[str]:
+    """Get the headwords cited by an entry.
+
+    Parameters
+    ----------
+    text_html: str, required
+        The HTML of the entry.
+
+    Returns
+    -------
+    words: list of str
+        The text of the citations, in order.
+    """
+    return [
+        html_to_text(match).strip() for match in CITATION.findall(text_html)
+    ]
+
+
+def link_citations(text_html: str, targets: list[int | None]) -> str:
+    """Link the citations of an entry to the cited entries.
+
+    Parameters
+    ----------
+    text_html: str, required
+        The HTML of the entry, whose citations may already be linked.
+    targets: list of int, required
+        The ids of the cited entries, in the order of the citations; the
+        citations without a target are not linked.
+
+    Returns
+    -------
+    text_html: str
+        The HTML of the entry, with the citations linked.
+    """
+    targets = iter(targets)
+
+    def link(match: re.Match) -> str:
+        target = next(targets, None)
+        citation = f'<cite>{match[1]}</cite>'
+        if target is None:
+            return citation
+        return f'<a class="ref" href="entry/{target}">{citation}</a>'
+
+    return CITATION.sub(link, text_html)
+
+
+class CrossReferenceIndex:
+    """Maintains the references between the entries during an import."""
+
+    def link(self, entries: list[Entry]) -> list[EntryReference]:
+        """Resolve and link the citations of the entries to be written.
+
+        The citations are resolved by search key, against the entries in the
+        database and the entries to be written; if several entries have the
+        same search key, the one with the smallest id is cited.
+
+        Parameters
+        ----------
+        entries: list of Entry, required
+            The entries to be written, with their HTML.
+
+        Returns
+        -------
+        references: list of EntryReference
+            The references of the entries, to be saved once the entries are
+            written.
+        """
+        cited = {entry.id: cited_words(entry.text_html) for entry in entries}
+        keys = {
+            to_search_key(word)
+            for words in cited.values()
+            for word in words
+        }
+        resolved = self.__resolve(keys, entries)
+        references = []
+        for entry in entries:
+            targets = []
+            for position, word in enumerate(cited[entry.id]):
+                key = to_search_key(word)
+                targets.append(resolved.get(key))
+                references.append(
+                    EntryReference(entry_id=entry.id,
+                                   position=position,
+                                   cited_word=word,
+                                   search_key=key,
+                                   target_id=resolved.get(key)))
+            if targets:
+                entry.text_html = link_citations(entry.text_html, targets)
+        return references
+
+    def save(self, entries: list[Entry], references: list[EntryReference]):
+        """Replace the references of the written entries.
+
+        Parameters
+        ----------
+        entries: list of Entry, required
+            The written entries.
+        references: list of EntryReference, required
+            The references of the entries, as returned by link().
+        """
+        EntryReference.objects.filter(
+            entry_id__in=[entry.id for entry in entries]).delete()
+        EntryReference.objects.bulk_create(references)
+
+    def relink(self, entries: list[Entry]) -> int:
+        """Link again the other entries which cite the written entries.
+
+        The references to the search keys of the written entries, and the
+        references to the written entries, are resolved again; the entries
+        whose references changed are linked again, and their versions are
+        incremented.
+
+        Parameters
+        ----------
+        entries: list of Entry, required
+            The written entries.
+
+        Returns
+        -------
+        count: int
+            The number of entries linked again.
+        """
+        ids = [entry.id for entry in entries]
+        references = list(
+            EntryReference.objects.filter(
+                Q(search_key__in={entry.search_key
+                                  for entry in entries})
+                | Q(target_id__in=ids)).exclude(entry_id__in=ids))
+        resolved = self.__resolve(
+            {reference.search_key
+             for reference in references})
+        changed = []
+        for reference in references:
+            target = resolved.get(reference.search_key)
+            if target != reference.target_id:
+                reference.target_id = target
+                changed.append(reference)
+        if not changed:
+            return 0
+        EntryReference.objects.bulk_update(changed, ['target'])
+
+        targets = defaultdict(list)
+        citing_ids = {reference.entry_id for reference in changed}
+        rows = EntryReference.objects.filter(entry_id__in=citing_ids).order_by(
+            'entry_id', 'position')
+        for entry_id, target in rows.values_list('entry_id', 'target'):
+            targets[entry_id].append(target)
+        citing = list(
+            Entry.objects.select_related('compressed_html').only(
+                *SearchPage.FIELDS).filter(id__in=citing_ids))
+        bodies, now = [], timezone.now()
+        for entry in citing:
+            body = getattr(entry, 'compressed_html', None)
+            if body is not None and not entry.text_html:
+                bodies.append(
+                    EntryHtml.from_text(
+                        entry.id, link_citations(body.text(),
+                                                 targets[entry.id])))
+            else:
+                entry.text_html = link_citations(entry.text_html,
+                                                 targets[entry.id])
+            entry.increment_version()
+            entry.row_update_timestamp = now
+        Entry.objects.bulk_update(
+            citing, ['text_html', 'version', 'row_update_timestamp'])
+        EntryHtml.objects.bulk_create(bodies,
+                                      update_conflicts=True,
+                                      unique_fields=['entry'],
+                                      update_fields=['data', 'crc32', 'size'])
+        return len(citing)
+
+    def __resolve(self,
+                  keys: set[str],
+                  entries: list[Entry] | None = None) -> dict[str, int]:
+        """Resolve the search keys to entry ids.
+
+        Parameters
+        ----------
+        keys: set of str, required
+            The search keys.
+        entries: list of Entry, optional
+            The entries to be written, which replace their rows from the
+            database.
+            Default is None.
+
+        Returns
+        -------
+        resolved: dict of (str, int)
+            The smallest id of the entries with each search key, for the
+            search keys of existing entries.
+        """
+        entries = entries or []
+        rows = Entry.objects.filter(search_key__in=keys).exclude(
+            id__in=[entry.id
+                    for entry in entries]).values_list('search_key', 'id')
+        rows = [*rows, *((entry.search_key, entry.id) for entry in entries)]
+        resolved = {}
+        for key, id in rows:
+            if key in keys:
+                resolved[key] = min(id, resolved.get(key, id))
+        return resolved
@@ -0,0 +1,56 @@
+"""Defines the search backends of the application."""
+from browser.search.cache import CachedSearchBackend
+from browser.search.database import DatabaseSearchBackend
+from browser.search.fulltext import FullTextSearch
+from browser.search.fulltext import TextMatch
+from browser.search.memory import MemorySearchBackend
+from browser.search.results import SearchPage
+from browser.search.snapshot import SnapshotSearchBackend
+from browser.search.terms import MatchType
+from browser.search.terms import to_normalized_form
+from browser.search.terms import to_search_key
+from django.conf import settings
+from functools import cache
+
+SEARCH_BACKENDS = {
+    'database': DatabaseSearchBackend,
+    'memory': MemorySearchBackend,
+    'snapshot': SnapshotSearchBackend,
+}
+
+
+def get_search_backend():
+    """Get the search backend selected by the SEARCH_BACKEND setting.
+
+    Returns
+    -------
+    backend: object
+        The search backend; the same instance is returned for the lifetime
+        of the process.
+    """
+    cached = CachedSearchBackend.CACHE_ALIAS in settings.CACHES
+    return create_search_backend(settings.SEARCH_BACKEND, cached)
+
+
+@cache
+def create_search_backend(name: str, cached: bool = False):
+    """Create the search backend with the specified name.
+
+    Parameters
+    ----------
+    name: str, required
+        The name of the search backend.
+    cached: bool, optional
+        If true, the results of the backend are cached, unless the backend
+        does not need it.
+        Default is False.
+
+    Returns
+    -------
+    backend: object
+        The search backend.
+    """
+    backend = SEARCH_BACKENDS[name]()
+    if cached and getattr(backend, 'CACHE_RESULTS', True):
+        return CachedSearchBackend(backend)
+    return backend
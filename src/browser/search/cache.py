@@ -0,0 +1,132 @@
+"""Defines the search backend which caches the results of another one."""
+from browser.caching import SEARCH_CACHE_ALIAS
+from browser.caching import cache_statistics
+from browser.search.generation import generation_monitor
+from browser.search.results import SearchPage
+from browser.search.terms import MatchType
+from browser.search.terms import to_search_key
+from django.conf import settings
+from django.core.cache import caches
+import hashlib
+
+
+class CachedSearchBackend:
+    """Caches the ids returned by a search backend.
+
+    The cache keys contain the data generation, so the results cached
+    before an import are never served after it; the old keys are evicted
+    by the cache backend when it reaches its maximum size.
+    """
+
+    CACHE_ALIAS = SEARCH_CACHE_ALIAS
+
+    def __init__(self, backend):
+        """Initialize the backend.
+
+        Parameters
+        ----------
+        backend: object, required
+            The search backend whose results are cached.
+        """
+        self.backend = backend
+
+    def search(self,
+               term: str,
+               match: str | None = None,
+               after: int | None = None,
+               limit: int = 50) -> SearchPage:
+        """Search entries matching the specified term.
+
+        Parameters
+        ----------
+        term: str, required
+            The search term.
+        match: str, optional
+            The match type; see MatchType.for_term().
+            Default is None.
+        after: int, optional
+            The id of the last entry on the previous page.
+            Default is None, i.e. the first page.
+        limit: int, optional
+            The maximum number of entries on the page.
+            Default is 50.
+
+        Returns
+        -------
+        page: SearchPage
+            The page of entries matching the search term.
+        """
+        match = MatchType.for_term(term, match)
+        key = self.__key('search', term, match, after, limit)
+        cache = caches[self.CACHE_ALIAS]
+        cached = cache.get(key)
+        self.__record(cached)
+        if cached is not None:
+            return SearchPage(*cached)
+        page = self.backend.search(term, match, after, limit)
+        cache.set(key, (page.ids, page.has_more),
+                  settings.SEARCH_CACHE_TIMEOUT)
+        return page
+
+    def suggest(self, term: str, limit: int = 10) -> list[str]:
+        """Suggest the title words starting with the specified term.
+
+        Parameters
+        ----------
+        term: str, required
+            The beginning of the title word.
+        limit: int, optional
+            The maximum number of suggestions.
+            Default is 10.
+
+        Returns
+        -------
+        title_words: list of str
+            The distinct title words, in alphabetical order.
+        """
+        key = self.__key('suggest', term, limit)
+        cache = caches[self.CACHE_ALIAS]
+        suggestions = cache.get(key)
+        self.__record(suggestions)
+        if suggestions is None:
+            suggestions = self.backend.suggest(term, limit)
+            cache.set(key, suggestions, settings.SEARCH_CACHE_TIMEOUT)
+        return suggestions
+
+    def __record(self, cached):
+        """Record the outcome of a cache lookup.
+
+        Parameters
+        ----------
+        cached: object, required
+            The cached value, or None if it was missing.
+        """
+        if cached is None:
+            cache_statistics.record(self.CACHE_ALIAS, misses=1)
+        else:
+            cache_statistics.record(self.CACHE_ALIAS, hits=1)
+
+    def __key(self, operation: str, term: str, *args) -> str:
+        """Build the cache key of the operation.
+
+        Parameters
+        ----------
+        operation: str, required
+            The name of the operation.
+        term: str, required
+            The search term; it is converted to its search key, since the
+            backends search the title words by the search keys, so the
+            terms with the same search key have the same results.
+        args: tuple, optional
+            The other arguments of the operation.
+
+        Returns
+        -------
+        key: str
+            The cache key.
+        """
+        search_key = to_search_key(term)
+        generation = generation_monitor.current()
+        digest = hashlib.md5(repr(
+            (search_key, *args)).encode('utf-8')).hexdigest()
+        return f'{operation}:{generation}:{digest}'
@@ -0,0 +1,90 @@
+"""Defines the search backend which queries the database."""
+from browser.models.entry import Entry
+from browser.search.results import SearchPage
+from browser.search.terms import MatchType
+from browser.search.terms import to_search_key
+from django.db.models import Q
+
+
+class DatabaseSearchBackend:
+    """Searches the entries in the database.
+
+    The search terms are compared with the search keys of the entries, which
+    are folded when the entries are imported, so the lookups are
+    case-sensitive: the 'exact' and 'prefix' lookups are served by the
+    indexes on the search key with a range scan, while the trigram index
+    serves the 'contains' lookups.
+    """
+
+    LOOKUPS = {
+        MatchType.EXACT: 'exact',
+        MatchType.PREFIX: 'startswith',
+        MatchType.CONTAINS: 'contains',
+    }
+
+    def search(self,
+               term: str,
+               match: str | None = None,
+               after: int | None = None,
+               limit: int = 50) -> SearchPage:
+        """Search entries matching the specified term.
+
+        The results are ordered by (title_word, id), and the pages are
+        selected with a keyset condition on the same columns, so that the
+        cost of a page does not depend on its depth.
+
+        Parameters
+        ----------
+        term: str, required
+            The search term.
+        match: str, optional
+            The match type; see MatchType.for_term().
+            Default is None.
+        after: int, optional
+            The id of the last entry on the previous page.
+            Default is None, i.e. the first page.
+        limit: int, optional
+            The maximum number of entries on the page.
+            Default is 50.
+
+        Returns
+        -------
+        page: SearchPage
+            The page of entries matching the search term.
+        """
+        lookup = self.LOOKUPS[MatchType.for_term(term, match)]
+        results = Entry.objects.filter(
+            **{f'search_key__{lookup}': to_search_key(term)})
+        if after is not None:
+            title_word = Entry.objects.filter(id=after).values_list(
+                'title_word', flat=True).first()
+            if title_word is not None:
+                results = results.filter(
+                    Q(title_word__gt=title_word)
+                    | Q(title_word=title_word, id__gt=after))
+        ids = list(
+            results.order_by('title_word',
+                             'id').values_list('id', flat=True)[:limit + 1])
+        return SearchPage(ids[:limit], len(ids) > limit)
+
+    def suggest(self, term: str, limit: int = 10) -> list[str]:
+        """Suggest the title words starting with the specified term.
+
+        Parameters
+        ----------
+        term: str, required
+            The beginning of the title word.
+        limit: int, optional
+            The maximum number of suggestions.
+            Default is 10.
+
+        Returns
+        -------
+        title_words: list of str
+            The distinct title words, in alphabetical order.
+        """
+        results = Entry.objects.filter(
+            search_key__startswith=to_search_key(term))
+        title_words = results.order_by('title_word').values_list(
+            'title_word', flat=True).distinct()
+        return list(title_words[:limit])
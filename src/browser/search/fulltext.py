@@ -0,0 +1,254 @@
+"""Defines the full-text search of the entry texts."""
+from browser.models.entry_document import EntryDocument
+from browser.search.results import SearchPage
+from django.conf import settings
+from django.contrib.postgres.search import SearchHeadline
+from django.contrib.postgres.search import SearchQuery
+from django.contrib.postgres.search import SearchQueryField
+from django.contrib.postgres.search import SearchRank
+from django.db import connection
+from django.db.models import BooleanField
+from django.db.models import F
+from django.db.models import FloatField
+from django.db.models import Func
+from django.db.models import Q
+from django.db.models import TextField
+from django.db.models import Value
+from django.db.models.functions import Cast
+from django.db.models.functions import Left
+from django.utils.html import escape
+
+
+class TextMatch:
+    """An entry whose text matches the search terms."""
+
+    def __init__(self, id: int, title_word: str, snippet: str):
+        """Initialize the match.
+
+        Parameters
+        ----------
+        id: int, required
+            The id of the entry.
+        title_word: str, required
+            The title word of the entry.
+        snippet: str, required
+            The HTML of the fragment of the text which matches the search
+            terms, with the matching words marked.
+        """
+        self.id = id
+        self.title_word = title_word
+        self.snippet = snippet
+
+
+class FullTextSearch:
+    """Searches the texts of the entries.
+
+    On PostgreSQL, the search terms are matched with the search vectors of
+    the entry documents, which are served by a GIN index; the results are
+    ranked, and each has a snippet built by ts_headline. On the other
+    databases, the texts are scanned, which is only suited for development.
+    """
+
+    # The markers of the matching words, from the private use area, so they
+    # survive the escaping of the snippets.
+    START_SELECTION = '\ue000'
+    STOP_SELECTION = '\ue001'
+
+    # The snippets are built from the beginning of the texts only, since the
+    # cost of ts_headline grows with the length of the text.
+    SNIPPET_SOURCE_LENGTH = 20000
+
+    # The cost of the ranking grows with the number of ranked entries and
+    # with the occurrences of the terms in them. When the terms match more
+    # entries than this, only the entries whose title word matches them,
+    # which are ranked first, are ranked, and the page is marked as
+    # truncated.
+    RANKED_MATCHES = 1000
+
+    # The lexemes of the text form of a query, which are quoted, with the
+    # quotes inside them doubled.
+    LEXEME = "'(?:[^']|'')*'"
+
+    # The number of characters around the match in the snippets built
+    # without ts_headline.
+    SNIPPET_CONTEXT = 80
+
+    def search(self,
+               term: str,
+               after: int | None = None,
+               limit: int = 50) -> SearchPage:
+        """Search the entries whose text matches the specified terms.
+
+        The results are ordered by (rank, id), and the pages are selected
+        with a keyset condition on the same values; the ranks are compared
+        in double precision, in which they are read exactly. On PostgreSQL,
+        the entries are ranked only if the terms match at most
+        RANKED_MATCHES entries; otherwise only the entries whose title word
+        matches the terms are ranked, and the page is truncated.
+
+        Parameters
+        ----------
+        term: str, required
+            The search terms, in the syntax of the web search engines.
+        after: int, optional
+            The id of the last entry on the previous page.
+            Default is None, i.e. the first page.
+        limit: int, optional
+            The maximum number of entries on the page.
+            Default is 50.
+
+        Returns
+        -------
+        page: SearchPage
+            The page of entries matching the search terms.
+        """
+        truncated = False
+        if connection.vendor != 'postgresql':
+            results = EntryDocument.objects.filter(text__icontains=term)
+            if after is not None:
+                results = results.filter(entry_id__gt=after)
+            results = results.order_by('entry_id')
+        else:
+            query = self.__query(term)
+            results = EntryDocument.objects.filter(vector=query)
+            matches = results[:self.RANKED_MATCHES + 1].count()
+            truncated = matches > self.RANKED_MATCHES
+            if truncated:
+                results = results.filter(self.__title_match(query))
+            results = results.annotate(
+                rank=Cast(SearchRank(F('vector'), query, cover_density=True),
+                          FloatField()))
+            if after is not None:
+                rank = results.filter(entry_id=after).values_list(
+                    'rank', flat=True).first()
+                if rank is not None:
+                    results = results.filter(
+                        Q(rank__lt=rank) | Q(rank=rank, entry_id__gt=after))
+            results = results.order_by('-rank', 'entry_id')
+        ids = list(results.values_list('entry_id', flat=True)[:limit + 1])
+        return SearchPage(ids[:limit], len(ids) > limit, truncated)
+
+    def matches(self, term: str, page: SearchPage) -> list[TextMatch]:
+        """Build the matches of the entries on the page.
+
+        Parameters
+        ----------
+        term: str, required
+            The search terms.
+        page: SearchPage, required
+            The page of search results.
+
+        Returns
+        -------
+        matches: list of TextMatch
+            The title words and snippets of the entries, in order.
+        """
+        documents = EntryDocument.objects.filter(entry_id__in=page.ids)
+        if connection.vendor != 'postgresql':
+            rows = {
+                id: (title_word, self.__snippet(text, term))
+                for id, title_word, text in documents.values_list(
+                    'entry_id', 'entry__title_word', 'text')
+            }
+        else:
+            headline = SearchHeadline(Left('text', self.SNIPPET_SOURCE_LENGTH),
+                                      self.__query(term),
+                                      config=settings.FULL_TEXT_SEARCH_CONFIG,
+                                      start_sel=self.START_SELECTION,
+                                      stop_sel=self.STOP_SELECTION,
+                                      max_words=35,
+                                      min_words=15)
+            rows = {
+                id: (title_word, self.__mark(snippet))
+                for id, title_word, snippet in documents.annotate(
+                    snippet=headline).values_list(
+                        'entry_id', 'entry__title_word', 'snippet')
+            }
+        return [TextMatch(id, *rows[id]) for id in page.ids if id in rows]
+
+    def __query(self, term: str) -> SearchQuery:
+        """Build the text search query of the search terms.
+
+        Parameters
+        ----------
+        term: str, required
+            The search terms.
+
+        Returns
+        -------
+        query: SearchQuery
+            The query.
+        """
+        return SearchQuery(term,
+                           config=settings.FULL_TEXT_SEARCH_CONFIG,
+                           search_type='websearch')
+
+    def __title_match(self, query: SearchQuery) -> Func:
+        """Match the title words of the entries with a query.
+
+        The title words are the lexemes of weight A of the search vectors,
+        so the lexemes of the query are restricted to this weight.
+
+        Parameters
+        ----------
+        query: SearchQuery, required
+            The query.
+
+        Returns
+        -------
+        match: Func
+            The condition which is true for the entries whose title word
+            matches the query.
+        """
+        title_query = Cast(
+            Func(Cast(query, TextField()),
+                 Value(self.LEXEME),
+                 Value('\\&:A'),
+                 Value('g'),
+                 function='regexp_replace'), SearchQueryField())
+        return Func(F('vector'),
+                    title_query,
+                    arg_joiner=' @@ ',
+                    template='(%(expressions)s)',
+                    output_field=BooleanField())
+
+    def __mark(self, snippet: str) -> str:
+        """Escape the snippet, and mark its matching words.
+
+        Parameters
+        ----------
+        snippet: str, required
+            The snippet, with the matching words between the selection
+            markers.
+
+        Returns
+        -------
+        snippet: str
+            The HTML of the snippet.
+        """
+        return escape(snippet).replace(self.START_SELECTION, '<mark>').replace(
+            self.STOP_SELECTION, '</mark>')
+
+    def __snippet(self, text: str, term: str) -> str:
+        """Build the snippet of the text around the first match of the term.
+
+        Parameters
+        ----------
+        text: str, required
+            The text of the entry.
+        term: str, required
+            The search term.
+
+        Returns
+        -------
+        snippet: str
+            The HTML of the snippet.
+        """
+        position = text.lower().find(term.lower())
+        if position < 0:
+            return escape(text[:2 * self.SNIPPET_CONTEXT])
+        start = max(position - self.SNIPPET_CONTEXT, 0)
+        end = position + len(term)
+        return self.__mark(text[start:position] + self.START_SELECTION +
+                           text[position:end] + self.STOP_SELECTION +
+                           text[end:end + self.SNIPPET_CONTEXT])
@@ -0,0 +1,39 @@
+"""Defines the monitor of the data generation."""
+from browser.models.data_generation import DataGeneration
+from django.conf import settings
+import threading
+import time
+
+
+class GenerationMonitor:
+    """Keeps the current data generation, checking the database seldom.
+
+    The generation is read from the database at most once every
+    SEARCH_GENERATION_CHECK_INTERVAL seconds, so that the caches derived
+    from the entries can be invalidated without a query per request.
+    """
+
+    def __init__(self):
+        """Initialize the monitor."""
+        self.lock = threading.Lock()
+        self.generation = None
+        self.checked_at = 0.0
+
+    def current(self) -> int:
+        """Get the current data generation.
+
+        Returns
+        -------
+        generation: int
+            The current data generation.
+        """
+        with self.lock:
+            now = time.monotonic()
+            interval = settings.SEARCH_GENERATION_CHECK_INTERVAL
+            if self.generation is None or now - self.checked_at >= interval:
+                self.generation = DataGeneration.current()
+                self.checked_at = now
+            return self.generation
+
+
+generation_monitor = GenerationMonitor()
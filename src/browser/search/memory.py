@@ -0,0 +1,338 @@
+"""Defines the search backend which uses an in-process headword index."""
+from array import array
+from bisect import bisect_left
+from bisect import bisect_right
+from browser.models.entry import Entry
+from browser.search.generation import generation_monitor
+from browser.search.results import SearchPage
+from browser.search.terms import MatchType
+from browser.search.terms import to_search_key
+from typing import Iterable
+from typing import Tuple
+import logging
+import sys
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class KeyIndex:
+    """Indexes a set of keys for exact, prefix and substring lookups.
+
+    The keys are kept in a sorted list for prefix bisection, and in a map
+    from each trigram to the sorted ranks of the keys containing it for
+    substring lookups. The rank of a key is the position of its entry in
+    the ordered list of entries.
+    """
+
+    NGRAM_SIZE = 3
+
+    def __init__(self, keys: list[str]):
+        """Build the index.
+
+        Parameters
+        ----------
+        keys: list of str, required
+            The keys, indexed by rank.
+        """
+        self.keys = keys
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        self.sorted_keys = [keys[rank] for rank in order]
+        self.sorted_ranks = array('I', order)
+        self.ngrams = {}
+        for rank, key in enumerate(keys):
+            for ngram in self.__ngrams(key):
+                ranks = self.ngrams.setdefault(ngram, array('I'))
+                if not ranks or ranks[-1] != rank:
+                    ranks.append(rank)
+
+    def find(self, key: str, match: str) -> Iterable[int]:
+        """Find the ranks of the keys matching the specified key.
+
+        Parameters
+        ----------
+        key: str, required
+            The search key to look up.
+        match: str, required
+            The match type.
+
+        Returns
+        -------
+        ranks: iterable of int
+            The ranks of the matching keys, in no particular order.
+        """
+        if match == MatchType.CONTAINS:
+            return self.__find_substring(key)
+
+        idx = bisect_left(self.sorted_keys, key)
+        ranks = []
+        while idx < len(self.sorted_keys):
+            candidate = self.sorted_keys[idx]
+            if candidate != key and (match == MatchType.EXACT
+                                     or not candidate.startswith(key)):
+                break
+            ranks.append(self.sorted_ranks[idx])
+            idx = idx + 1
+        return ranks
+
+    def memory_usage(self) -> int:
+        """Get the approximate memory used by the index.
+
+        Returns
+        -------
+        size: int
+            The size of the index, in bytes.
+        """
+        size = sys.getsizeof(self.sorted_keys) + sys.getsizeof(self.keys)
+        size += sys.getsizeof(self.sorted_ranks) + sys.getsizeof(self.ngrams)
+        size += sum(sys.getsizeof(key) for key in self.keys)
+        size += sum(
+            sys.getsizeof(ngram) + sys.getsizeof(ranks)
+            for ngram, ranks in self.ngrams.items())
+        return size
+
+    def __find_substring(self, key: str) -> Iterable[int]:
+        """Find the ranks of the keys containing the specified key.
+
+        Parameters
+        ----------
+        key: str, required
+            The search key to look up.
+
+        Returns
+        -------
+        ranks: iterable of int
+            The ranks of the keys containing the key.
+        """
+        if len(key) < self.NGRAM_SIZE:
+            return [rank for rank, k in enumerate(self.keys) if key in k]
+
+        postings = [self.ngrams.get(ngram) for ngram in self.__ngrams(key)]
+        if any(ranks is None for ranks in postings):
+            return []
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for ranks in postings[1:]:
+            candidates.intersection_update(ranks)
+            if not candidates:
+                return []
+        return [rank for rank in candidates if key in self.keys[rank]]
+
+    def __ngrams(self, key: str) -> set[str]:
+        """Get the n-grams of the key.
+
+        Parameters
+        ----------
+        key: str, required
+            The key.
+
+        Returns
+        -------
+        ngrams: set of str
+            The n-grams of the key.
+        """
+        size = self.NGRAM_SIZE
+        return {key[i:i + size] for i in range(len(key) - size + 1)}
+
+
+class HeadwordIndex:
+    """An in-memory index of the title words of the entries."""
+
+    def __init__(self, rows: Iterable[Tuple[int, str, str]], generation: int):
+        """Build the index.
+
+        Parameters
+        ----------
+        rows: iterable of (int, str, str), required
+            The id, title word and search key of the entries, in the order
+            in which the results are returned.
+        generation: int, required
+            The data generation from which the index is built.
+        """
+        self.generation = generation
+        self.ids = array('q')
+        self.ranks = {}
+        self.headwords = []
+        search_keys = []
+        for id, title_word, search_key in rows:
+            self.ranks[id] = len(self.ids)
+            self.ids.append(id)
+            self.headwords.append(title_word)
+            search_keys.append(search_key)
+        self.search_keys = KeyIndex(search_keys)
+
+    def search(self,
+               term: str,
+               match: str | None = None,
+               after: int | None = None,
+               limit: int = 50) -> SearchPage:
+        """Search the ids of the entries matching the specified term.
+
+        Parameters
+        ----------
+        term: str, required
+            The search term.
+        match: str, optional
+            The match type; see MatchType.for_term().
+            Default is None.
+        after: int, optional
+            The id of the last entry on the previous page.
+            Default is None, i.e. the first page.
+        limit: int, optional
+            The maximum number of entries on the page.
+            Default is 50.
+
+        Returns
+        -------
+        page: SearchPage
+            The page of matching entries, in the order of the index.
+        """
+        match = MatchType.for_term(term, match)
+        ranks = sorted(self.search_keys.find(to_search_key(term), match))
+        start = 0
+        if after in self.ranks:
+            start = bisect_right(ranks, self.ranks[after])
+        page = ranks[start:start + limit + 1]
+        return SearchPage([self.ids[rank] for rank in page[:limit]],
+                          len(page) > limit)
+
+    def suggest(self, term: str, limit: int = 10) -> list[str]:
+        """Suggest the title words starting with the specified term.
+
+        Parameters
+        ----------
+        term: str, required
+            The beginning of the title word.
+        limit: int, optional
+            The maximum number of suggestions.
+            Default is 10.
+
+        Returns
+        -------
+        title_words: list of str
+            The distinct title words, in the order of the index.
+        """
+        ranks = self.search_keys.find(to_search_key(term), MatchType.PREFIX)
+        title_words = []
+        for rank in sorted(ranks):
+            title_word = self.headwords[rank]
+            if title_words and title_words[-1] == title_word:
+                continue
+            title_words.append(title_word)
+            if len(title_words) == limit:
+                break
+        return title_words
+
+    def memory_usage(self) -> int:
+        """Get the approximate memory used by the index.
+
+        Returns
+        -------
+        size: int
+            The size of the index, in bytes.
+        """
+        size = sys.getsizeof(self.ids) + sys.getsizeof(self.ranks)
+        size += sys.getsizeof(self.headwords)
+        size += sum(sys.getsizeof(headword) for headword in self.headwords)
+        return size + self.search_keys.memory_usage()
+
+    def __len__(self):
+        """Get the number of entries in the index."""
+        return len(self.ids)
+
+
+class MemorySearchBackend:
+    """Searches the entries using an in-process headword index.
+
+    The index is built on the first search, and rebuilt when the data
+    generation changes; only the bodies of the matching entries are read
+    from the database.
+    """
+
+    def __init__(self):
+        """Initialize the backend."""
+        self.lock = threading.Lock()
+        self.index = None
+
+    def search(self,
+               term: str,
+               match: str | None = None,
+               after: int | None = None,
+               limit: int = 50) -> SearchPage:
+        """Search entries matching the specified term.
+
+        Parameters
+        ----------
+        term: str, required
+            The search term.
+        match: str, optional
+            The match type; see MatchType.for_term().
+            Default is None.
+        after: int, optional
+            The id of the last entry on the previous page.
+            Default is None, i.e. the first page.
+        limit: int, optional
+            The maximum number of entries on the page.
+            Default is 50.
+
+        Returns
+        -------
+        page: SearchPage
+            The page of entries matching the search term, ordered by title
+            word.
+        """
+        return self.get_index().search(term, match, after, limit)
+
+    def suggest(self, term: str, limit: int = 10) -> list[str]:
+        """Suggest the title words starting with the specified term.
+
+        Parameters
+        ----------
+        term: str, required
+            The beginning of the title word.
+        limit: int, optional
+            The maximum number of suggestions.
+            Default is 10.
+
+        Returns
+        -------
+        title_words: list of str
+            The distinct title words, in alphabetical order.
+        """
+        return self.get_index().suggest(term, limit)
+
+    def get_index(self) -> HeadwordIndex:
+        """Get the headword index of the current data generation.
+
+        Returns
+        -------
+        index: HeadwordIndex
+            The headword index.
+        """
+        generation = generation_monitor.current()
+        with self.lock:
+            if self.index is None or self.index.generation != generation:
+                self.index = self.__build_index(generation)
+            return self.index
+
+    def __build_index(self, generation: int) -> HeadwordIndex:
+        """Build the headword index from the database.
+
+        Parameters
+        ----------
+        generation: int, required
+            The current data generation.
+
+        Returns
+        -------
+        index: HeadwordIndex
+            The headword index.
+        """
+        rows = Entry.objects.order_by('title_word', 'id').values_list(
+            'id', 'title_word', 'search_key')
+        index = HeadwordIndex(rows.iterator(chunk_size=10_000), generation)
+        logger.info(
+            'Built the headword index of generation %d: %d entries, '
+            '%.1f MiB.', generation, len(index),
+            index.memory_usage() / 2**20)
+        return index
@@ -0,0 +1,202 @@
+"""Defines the pages of search results."""
+from browser.caching import ENTRIES_CACHE_ALIAS
+from browser.caching import cache_statistics
+from browser.caching import get_cache
+from browser.models.entry import Entry
+from browser.models.entry_html import EntryHtml
+
+
+class SearchPage:
+    """A page of search results.
+
+    The page holds only the ids of the matching entries; the entries are
+    loaded when the page is rendered, with only the fields needed for it.
+    The loaded entries are cached by id and version, so the cached entries
+    are replaced when their version is incremented.
+    """
+
+    FIELDS = [
+        'id', 'title_word', 'text_html', 'version', 'compressed_html__data',
+        'compressed_html__crc32', 'compressed_html__size'
+    ]
+
+    def __init__(self,
+                 ids: list[int],
+                 has_more: bool,
+                 truncated: bool = False):
+        """Initialize the page.
+
+        Parameters
+        ----------
+        ids: list of int, required
+            The ids of the entries on the page, in order.
+        has_more: bool, required
+            True if there are more results after this page.
+        truncated: bool, optional
+            True if only a part of the matching entries was searched.
+            Default is False.
+        """
+        self.ids = ids
+        self.has_more = has_more
+        self.truncated = truncated
+
+    @property
+    def next_cursor(self) -> int | None:
+        """Get the cursor of the next page.
+
+        Returns
+        -------
+        cursor: int
+            The id of the last entry on the page, or None if this is the
+            last page.
+        """
+        return self.ids[-1] if self.has_more and self.ids else None
+
+    def entries(self, decompress: bool = True) -> list[Entry]:
+        """Load the entries on the page.
+
+        Parameters
+        ----------
+        decompress: bool, optional
+            If true, the HTML of the entries stored compressed is
+            decompressed into their text; otherwise it is left to the caller.
+            Default is True.
+
+        Returns
+        -------
+        entries: list of Entry
+            The entries on the page, in order.
+        """
+        cache = get_cache(ENTRIES_CACHE_ALIAS)
+        if cache is None:
+            entries = self.__load(self.ids)
+        else:
+            entries = self.__load_cached(cache)
+        entries = [entries[id] for id in self.ids if id in entries]
+        if decompress:
+            for entry in entries:
+                body = getattr(entry, 'compressed_html', None)
+                if body is not None and not entry.text_html:
+                    entry.text_html = body.text()
+        return entries
+
+    def __load(self, ids: list[int]) -> dict[int, Entry]:
+        """Load the entries from the database.
+
+        Parameters
+        ----------
+        ids: list of int, required
+            The ids of the entries.
+
+        Returns
+        -------
+        entries: dict of (int, Entry)
+            The entries, by id.
+        """
+        return Entry.objects.select_related('compressed_html').only(
+            *self.FIELDS).in_bulk(ids)
+
+    def __load_cached(self, cache) -> dict[int, Entry]:
+        """Load the entries from the cache, and the missing ones from the
+        database.
+
+        Only the versions of the entries are read from the database for the
+        entries which are cached.
+
+        Parameters
+        ----------
+        cache: BaseCache, required
+            The cache of the entries.
+
+        Returns
+        -------
+        entries: dict of (int, Entry)
+            The entries, by id.
+        """
+        versions = Entry.objects.filter(id__in=self.ids).values_list(
+            'id', 'version')
+        keys = {id: self.__key(id, version) for id, version in versions}
+        cached = cache.get_many(keys.values())
+        entries = {
+            id: self.__from_fragment(id, cached[key])
+            for id, key in keys.items() if key in cached
+        }
+        missing = [id for id in keys if id not in entries]
+        cache_statistics.record(ENTRIES_CACHE_ALIAS,
+                                hits=len(entries),
+                                misses=len(missing))
+        if missing:
+            loaded = self.__load(missing)
+            cache.set_many({
+                self.__key(entry.id, entry.version):
+                self.__to_fragment(entry)
+                for entry in loaded.values()
+            })
+            entries.update(loaded)
+        return entries
+
+    def __key(self, id: int, version: int) -> str:
+        """Build the cache key of an entry.
+
+        Parameters
+        ----------
+        id: int, required
+            The id of the entry.
+        version: int, required
+            The version of the entry.
+
+        Returns
+        -------
+        key: str
+            The cache key.
+        """
+        return f'entry:{id}:{version}'
+
+    def __to_fragment(self, entry: Entry) -> tuple:
+        """Convert the entry into the value stored in the cache.
+
+        Parameters
+        ----------
+        entry: Entry, required
+            The entry loaded from the database.
+
+        Returns
+        -------
+        (title_word, text_html, version, body): tuple
+            The fields of the entry; the body is the tuple (data, crc32,
+            size) of the compressed HTML, or None.
+        """
+        body = getattr(entry, 'compressed_html', None)
+        if body is not None:
+            body = (bytes(body.data), body.crc32, body.size)
+        return (entry.title_word, entry.text_html, entry.version, body)
+
+    def __from_fragment(self, id: int, fragment: tuple) -> Entry:
+        """Build the entry from the value stored in the cache.
+
+        Parameters
+        ----------
+        id: int, required
+            The id of the entry.
+        fragment: tuple, required
+            The value stored in the cache; see __to_fragment().
+
+        Returns
+        -------
+        entry: Entry
+            The entry.
+        """
+        title_word, text_html, version, body = fragment
+        entry = Entry(id=id,
+                      title_word=title_word,
+                      text_html=text_html,
+                      version=version)
+        if body is not None:
+            data, crc32, size = body
+            body = EntryHtml(entry_id=id, data=data, crc32=crc32, size=size)
+        Entry.compressed_html.related.set_cached_value(entry, body)
+        return entry
+
+    def __len__(self):
+        """Get the number of entries on the page."""
+        return len(self.ids)
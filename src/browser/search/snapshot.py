@@ -0,0 +1,583 @@
+"""Defines the search backend which serves a snapshot of the dictionary.
+
+The snapshot is a single binary file, written after an import, which holds
+the entries in the order of the search results: their ids, versions, title
+words, search keys and HTML. The processes which serve the application map
+the file into memory, so they share its pages through the page cache of the
+operating system instead of each keeping a copy, and neither the searches
+nor the entries need a query.
+
+The file starts with a header which holds the offsets and lengths of its
+sections; the numbers are in the byte order of the machine, since the
+snapshot is read where it is written. The search keys are concatenated
+into a single section, separated by newlines, so the exact, prefix and
+substring lookups search the mapped bytes directly.
+"""
+from array import array
+from bisect import bisect_left
+from bisect import bisect_right
+from browser.compression import compress
+from browser.models.entry import Entry
+from browser.models.entry_html import EntryHtml
+from browser.search.database import DatabaseSearchBackend
+from browser.search.generation import generation_monitor
+from browser.search.results import SearchPage
+from browser.search.terms import MatchType
+from browser.search.terms import to_search_key
+from django.conf import settings
+from itertools import islice
+from pathlib import Path
+from typing import Iterable
+from typing import Iterator
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'EDTLRSNP'
+FORMAT_VERSION = 1
+
+# The bodies of the entries are stored compressed with compress(), so they
+# can be sent without decompressing them; otherwise they are stored as text.
+COMPRESSED = 0x1
+
+SECTIONS = [
+    'ids', 'versions', 'sorted_ids', 'sorted_ranks', 'key_offsets', 'keys',
+    'title_offsets', 'titles', 'body_offsets', 'body_crc32', 'body_sizes',
+    'bodies'
+]
+
+# The magic bytes, the format version, the flags, the number of entries,
+# then the offset and length of each section.
+HEADER = struct.Struct('=8sIIq' + 'qq' * len(SECTIONS))
+
+
+class SnapshotWriter:
+    """Writes the snapshot of the entries, replacing the file atomically."""
+
+    def __init__(self, path: Path, compressed: bool):
+        """Initialize the writer.
+
+        Parameters
+        ----------
+        path: Path, required
+            The path of the snapshot.
+        compressed: bool, required
+            If true the bodies of the entries are stored compressed.
+        """
+        self.path = path
+        self.compressed = compressed
+
+    def write(self, entries: Iterable[Entry] | None = None) -> int:
+        """Write the snapshot of the entries.
+
+        The snapshot is written into a temporary file of the same directory,
+        which is then renamed, so the processes which map the previous
+        snapshot keep reading it until they map the new one.
+
+        Parameters
+        ----------
+        entries: iterable of Entry, optional
+            The entries, in the order of the search results, with their
+            search keys and HTML.
+            Default is None, i.e. all the entries of the database.
+
+        Returns
+        -------
+        count: int
+            The number of entries in the snapshot.
+        """
+        if entries is None:
+            entries = Entry.objects.select_related('compressed_html').only(
+                'id', 'title_word', 'search_key', 'text_html', 'version',
+                'compressed_html__data',
+                'compressed_html__crc32', 'compressed_html__size').order_by(
+                    'title_word', 'id').iterator(chunk_size=2000)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_name(f'.{self.path.name}.{os.getpid()}.tmp')
+        try:
+            with open(temp_path, 'wb') as output:
+                count = self.__write(output, entries)
+                output.flush()
+                os.fsync(output.fileno())
+            os.replace(temp_path, self.path)
+        except BaseException:
+            temp_path.unlink(missing_ok=True)
+            raise
+        return count
+
+    def __write(self, output, entries: Iterable[Entry]) -> int:
+        """Write the sections of the snapshot, then its header.
+
+        The bodies are written while the entries are read, and the other
+        sections, which are small, are kept in memory until the end.
+
+        Parameters
+        ----------
+        output: BufferedWriter, required
+            The snapshot file.
+        entries: iterable of Entry, required
+            The entries.
+
+        Returns
+        -------
+        count: int
+            The number of entries.
+        """
+        output.write(bytes(HEADER.size))
+        ids, versions = array('q'), array('q')
+        key_offsets, keys = array('q'), bytearray(b'\n')
+        title_offsets, titles = array('q'), bytearray()
+        body_offsets, body_crc32, body_sizes = array(
+            'q', [0]), array('q'), array('q')
+        sections = {'bodies': (output.tell(), 0)}
+        for entry in entries:
+            ids.append(entry.id)
+            versions.append(entry.version)
+            key_offsets.append(len(keys))
+            keys += to_snapshot_key(entry.search_key).encode('utf-8') + b'\n'
+            title_offsets.append(len(titles))
+            titles += entry.title_word.encode('utf-8')
+            data, crc32, size = self.__body(entry)
+            output.write(data)
+            body_offsets.append(body_offsets[-1] + len(data))
+            body_crc32.append(crc32)
+            body_sizes.append(size)
+        key_offsets.append(len(keys))
+        title_offsets.append(len(titles))
+        sections['bodies'] = (sections['bodies'][0], body_offsets[-1])
+
+        order = sorted(range(len(ids)), key=ids.__getitem__)
+        contents = {
+            'ids': ids,
+            'versions': versions,
+            'sorted_ids': array('q', (ids[rank] for rank in order)),
+            'sorted_ranks': array('q', order),
+            'key_offsets': key_offsets,
+            'keys': keys,
+            'title_offsets': title_offsets,
+            'titles': titles,
+            'body_offsets': body_offsets,
+            'body_crc32': body_crc32,
+            'body_sizes': body_sizes,
+        }
+        for name, content in contents.items():
+            # The arrays are aligned, so their items can be read in place.
+            output.write(bytes(-output.tell() % 8))
+            content = bytes(content)
+            sections[name] = (output.tell(), len(content))
+            output.write(content)
+
+        flags = COMPRESSED if self.compressed else 0
+        output.seek(0)
+        output.write(
+            HEADER.pack(
+                MAGIC, FORMAT_VERSION, flags, len(ids),
+                *(value for name in SECTIONS for value in sections[name])))
+        return len(ids)
+
+    def __body(self, entry: Entry) -> tuple[bytes, int, int]:
+        """Get the body of an entry, as it is stored in the snapshot.
+
+        Parameters
+        ----------
+        entry: Entry, required
+            The entry.
+
+        Returns
+        -------
+        (data, crc32, size): tuple of (bytes, int, int)
+            The body, and if it is compressed, the CRC-32 checksum and the
+            size of its text.
+        """
+        body = getattr(entry, 'compressed_html', None)
+        if self.compressed:
+            if body is not None and not entry.text_html:
+                return (bytes(body.data), body.crc32, body.size)
+            return compress(entry.text_html)
+        text_html = entry.text_html
+        if body is not None and not text_html:
+            text_html = body.text()
+        data = text_html.encode('utf-8')
+        return (data, 0, len(data))
+
+
+class Snapshot:
+    """A snapshot of the entries, mapped into memory."""
+
+    def __init__(self, path: Path):
+        """Map the snapshot into memory.
+
+        Parameters
+        ----------
+        path: Path, required
+            The path of the snapshot.
+        """
+        with open(path, 'rb') as snapshot_file:
+            stat = os.fstat(snapshot_file.fileno())
+            self.map = mmap.mmap(snapshot_file.fileno(),
+                                 0,
+                                 access=mmap.ACCESS_READ)
+        # The identity of the file, which changes when it is replaced.
+        self.signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if self.map[:len(MAGIC)] != MAGIC:
+            raise ValueError(f'{path} is not a snapshot.')
+        header = HEADER.unpack_from(self.map)
+        if header[1] != FORMAT_VERSION:
+            raise ValueError(f'{path} has the unknown format {header[1]}.')
+        self.compressed = bool(header[2] & COMPRESSED)
+        self.count = header[3]
+        self.sections = {
+            name: (header[4 + 2 * idx], header[5 + 2 * idx])
+            for idx, name in enumerate(SECTIONS)
+        }
+        view = memoryview(self.map)
+        self.ids = self.__array(view, 'ids')
+        self.versions = self.__array(view, 'versions')
+        self.sorted_ids = self.__array(view, 'sorted_ids')
+        self.sorted_ranks = self.__array(view, 'sorted_ranks')
+        self.key_offsets = self.__array(view, 'key_offsets')
+        self.title_offsets = self.__array(view, 'title_offsets')
+        self.body_offsets = self.__array(view, 'body_offsets')
+        self.body_crc32 = self.__array(view, 'body_crc32')
+        self.body_sizes = self.__array(view, 'body_sizes')
+
+    def find(self, key: str, match: str, start: int = 0) -> Iterator[int]:
+        """Find the ranks of the entries whose search key matches a key.
+
+        The search keys are stored in the order of the ranks, so the ranks
+        are found in order, and a page is found by searching from the rank
+        after the previous page until the page is full.
+
+        Parameters
+        ----------
+        key: str, required
+            The search key to look up.
+        match: str, required
+            The match type: 'exact', 'prefix' or 'contains'.
+        start: int, optional
+            The first rank to search.
+            Default is 0.
+
+        Returns
+        -------
+        ranks: iterator of int
+            The ranks of the matching entries, in ascending order.
+        """
+        pattern = to_snapshot_key(key).encode('utf-8')
+        # The exact and prefix patterns start with the newline which
+        # precedes the search key.
+        lead = 0
+        if match != MatchType.CONTAINS:
+            pattern, lead = b'\n' + pattern, 1
+        if match == MatchType.EXACT:
+            pattern = pattern + b'\n'
+        base, length = self.sections['keys']
+        end = base + length
+        while start < self.count:
+            position = self.map.find(pattern,
+                                     base + self.key_offsets[start] - lead,
+                                     end)
+            if position < 0:
+                return
+            rank = bisect_right(self.key_offsets, position + lead - base) - 1
+            yield rank
+            start = rank + 1
+
+    def rank(self, id: int) -> int | None:
+        """Get the rank of an entry.
+
+        Parameters
+        ----------
+        id: int, required
+            The id of the entry.
+
+        Returns
+        -------
+        rank: int
+            The rank of the entry, or None if it is not in the snapshot.
+        """
+        idx = bisect_left(self.sorted_ids, id)
+        if idx < self.count and self.sorted_ids[idx] == id:
+            return self.sorted_ranks[idx]
+        return None
+
+    def title_word(self, rank: int) -> str:
+        """Get the title word of an entry.
+
+        Parameters
+        ----------
+        rank: int, required
+            The rank of the entry.
+
+        Returns
+        -------
+        title_word: str
+            The title word.
+        """
+        base = self.sections['titles'][0]
+        return self.map[base + self.title_offsets[rank]:base +
+                        self.title_offsets[rank + 1]].decode('utf-8')
+
+    def entry(self, rank: int, decompress: bool = True) -> Entry:
+        """Build an entry from the snapshot.
+
+        Parameters
+        ----------
+        rank: int, required
+            The rank of the entry.
+        decompress: bool, optional
+            If true, the body stored compressed is decompressed into the text
+            of the entry; otherwise the entry has its compressed HTML, as if
+            loaded from the database.
+            Default is True.
+
+        Returns
+        -------
+        entry: Entry
+            The entry, with its id, title word, HTML and version.
+        """
+        base = self.sections['bodies'][0]
+        data = self.map[base + self.body_offsets[rank]:base +
+                        self.body_offsets[rank + 1]]
+        id = self.ids[rank]
+        entry = Entry(id=id,
+                      title_word=self.title_word(rank),
+                      version=self.versions[rank])
+        body = None
+        if not self.compressed:
+            entry.text_html = data.decode('utf-8')
+        else:
+            body = EntryHtml(entry_id=id,
+                             data=data,
+                             crc32=self.body_crc32[rank],
+                             size=self.body_sizes[rank])
+            if decompress:
+                entry.text_html, body = body.text(), None
+        Entry.compressed_html.related.set_cached_value(entry, body)
+        return entry
+
+    def __array(self, view: memoryview, name: str) -> memoryview:
+        """Get a section of numbers, without copying it.
+
+        Parameters
+        ----------
+        view: memoryview, required
+            The view of the mapped file.
+        name: str, required
+            The name of the section.
+
+        Returns
+        -------
+        numbers: memoryview
+            The numbers of the section.
+        """
+        offset, length = self.sections[name]
+        return view[offset:offset + length].cast('q')
+
+    def __len__(self):
+        """Get the number of entries in the snapshot."""
+        return self.count
+
+
+def to_snapshot_key(key: str) -> str:
+    """Convert a search key into the form stored in the snapshot.
+
+    Parameters
+    ----------
+    key: str, required
+        The search key.
+
+    Returns
+    -------
+    key: str
+        The search key, without the newlines which separate the keys.
+    """
+    return key.replace('\n', ' ')
+
+
+class SnapshotPage(SearchPage):
+    """A page of search results whose entries are read from a snapshot."""
+
+    def __init__(self, snapshot: Snapshot, ranks: list[int], has_more: bool):
+        """Initialize the page.
+
+        Parameters
+        ----------
+        snapshot: Snapshot, required
+            The snapshot which was searched; it is kept mapped until the page
+            is rendered, even if it is replaced meanwhile.
+        ranks: list of int, required
+            The ranks of the entries on the page, in order.
+        has_more: bool, required
+            True if there are more results after this page.
+        """
+        super().__init__([snapshot.ids[rank] for rank in ranks], has_more)
+        self.snapshot = snapshot
+        self.ranks = ranks
+
+    def entries(self, decompress: bool = True) -> list:
+        """Build the entries on the page from the snapshot.
+
+        Parameters
+        ----------
+        decompress: bool, optional
+            If true, the HTML of the entries stored compressed is
+            decompressed into their text; otherwise it is left to the caller.
+            Default is True.
+
+        Returns
+        -------
+        entries: list of Entry
+            The entries on the page, in order.
+        """
+        return [self.snapshot.entry(rank, decompress) for rank in self.ranks]
+
+
+class SnapshotSearchBackend:
+    """Searches the entries in the snapshot written by the last import.
+
+    The snapshot is mapped into memory, so the searches and the entries do
+    not need a query, and the processes which serve the application share
+    the pages of the file. The file is checked at most once every
+    SEARCH_GENERATION_CHECK_INTERVAL seconds, and whenever the data
+    generation changes, and mapped again when it was replaced. The database
+    is searched while there is no snapshot.
+    """
+
+    # The searches are cheaper than the lookups of the search cache, and the
+    # cached ids would be loaded from the database.
+    CACHE_RESULTS = False
+
+    def __init__(self, path: Path | None = None):
+        """Initialize the backend.
+
+        Parameters
+        ----------
+        path: Path, optional
+            The path of the snapshot.
+            Default is None, i.e. the SNAPSHOT_PATH setting.
+        """
+        self.path = Path(path or settings.SNAPSHOT_PATH)
+        self.lock = threading.Lock()
+        self.snapshot = None
+        self.checked_at = None
+        self.generation = None
+        self.missing = False
+        self.fallback = DatabaseSearchBackend()
+
+    def search(self,
+               term: str,
+               match: str | None = None,
+               after: int | None = None,
+               limit: int = 50) -> SearchPage:
+        """Search entries matching the specified term.
+
+        Parameters
+        ----------
+        term: str, required
+            The search term.
+        match: str, optional
+            The match type; see MatchType.for_term().
+            Default is None.
+        after: int, optional
+            The id of the last entry on the previous page.
+            Default is None, i.e. the first page.
+        limit: int, optional
+            The maximum number of entries on the page.
+            Default is 50.
+
+        Returns
+        -------
+        page: SearchPage
+            The page of entries matching the search term, ordered by title
+            word.
+        """
+        snapshot = self.get_snapshot()
+        if snapshot is None:
+            return self.fallback.search(term, match, after, limit)
+        match = MatchType.for_term(term, match)
+        start = 0
+        if after is not None:
+            rank = snapshot.rank(after)
+            if rank is not None:
+                start = rank + 1
+        ranks = list(
+            islice(snapshot.find(to_search_key(term), match, start),
+                   limit + 1))
+        return SnapshotPage(snapshot, ranks[:limit], len(ranks) > limit)
+
+    def suggest(self, term: str, limit: int = 10) -> list[str]:
+        """Suggest the title words starting with the specified term.
+
+        Parameters
+        ----------
+        term: str, required
+            The beginning of the title word.
+        limit: int, optional
+            The maximum number of suggestions.
+            Default is 10.
+
+        Returns
+        -------
+        title_words: list of str
+            The distinct title words, in alphabetical order.
+        """
+        snapshot = self.get_snapshot()
+        if snapshot is None:
+            return self.fallback.suggest(term, limit)
+        title_words = []
+        for rank in snapshot.find(to_search_key(term), MatchType.PREFIX):
+            title_word = snapshot.title_word(rank)
+            if title_words and title_words[-1] == title_word:
+                continue
+            title_words.append(title_word)
+            if len(title_words) == limit:
+                break
+        return title_words
+
+    def get_snapshot(self) -> Snapshot | None:
+        """Get the current snapshot, mapping it again if it was replaced.
+
+        The snapshot is replaced before the data generation changes, so it
+        is checked as soon as a new generation is seen; otherwise the pages
+        cached for the new generation could be built from the previous
+        snapshot.
+
+        Returns
+        -------
+        snapshot: Snapshot
+            The snapshot, or None if the file does not exist.
+        """
+        generation = generation_monitor.current()
+        with self.lock:
+            now = time.monotonic()
+            interval = settings.SEARCH_GENERATION_CHECK_INTERVAL
+            checked = (self.checked_at is not None
+                       and self.generation == generation)
+            if checked and now - self.checked_at < interval:
+                return self.snapshot
+            self.checked_at, self.generation = now, generation
+            try:
+                stat = os.stat(self.path)
+            except FileNotFoundError:
+                if not self.missing:
+                    logger.warning(
+                        'The snapshot %s does not exist; '
+                        'searching the database.', self.path)
+                self.snapshot, self.missing = None, True
+                return None
+            self.missing = False
+            signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            if self.snapshot is None or self.snapshot.signature != signature:
+                # The previous snapshot is unmapped once the pages which
+                # were found in it are rendered.
+                self.snapshot = Snapshot(self.path)
+                logger.info('Mapped the snapshot %s: %d entries, %.1f MiB.',
+                            self.path, len(self.snapshot),
+                            self.snapshot.signature[2] / 2**20)
+            return self.snapshot
@@ -0,0 +1,128 @@
+"""Defines the helpers for handling search terms."""
+import unicodedata
+
+
+class MatchType:
+    """The ways in which a search term can match a title word."""
+
+    EXACT = 'exact'
+    PREFIX = 'prefix'
+    CONTAINS = 'contains'
+
+    ALL = [EXACT, PREFIX, CONTAINS]
+
+    # The search terms are matched with the texts of the entries instead of
+    # their title words; see FullTextSearch.
+    TEXT = 'text'
+
+    # The trigram indexes cannot serve the terms shorter than a trigram, so
+    # those terms are matched as prefixes.
+    MIN_CONTAINS_LENGTH = 3
+
+    @classmethod
+    def for_term(cls, term: str, match: str | None = None) -> str:
+        """Get the match type to use for the search term.
+
+        Parameters
+        ----------
+        term: str, required
+            The search term.
+        match: str, optional
+            The requested match type. If missing or invalid, the match type
+            is chosen according to the length of the term.
+            Default is None.
+
+        Returns
+        -------
+        match: str
+            The match type.
+        """
+        if match in cls.ALL:
+            return match
+        if len(term) < cls.MIN_CONTAINS_LENGTH:
+            return cls.PREFIX
+        return cls.CONTAINS
+
+
+def build_normalization_table(lower: bool = False) -> dict[int, str]:
+    """Build the translation table of the characters which have diacritics.
+
+    The table maps the Latin letters with diacritics (including the Romanian
+    ș/ş and ț/ţ variants) to their base letters, and deletes the combining
+    marks, which is what the NFKD normalization followed by the removal of
+    the combining marks does for these characters.
+
+    Parameters
+    ----------
+    lower: bool, optional
+        If true, the letters are also converted to lower case.
+        Default is False.
+
+    Returns
+    -------
+    table: dict of (int, str)
+        The translation table, for str.translate().
+    """
+    # The unchanged characters are mapped as well, since the lookups of the
+    # missing characters are slow.
+    table = {}
+    for code in range(0x250):
+        char = chr(code)
+        nfkd_form = unicodedata.normalize('NFKD', char)
+        base = ''.join([c for c in nfkd_form if not unicodedata.combining(c)])
+        if lower:
+            base = base.casefold()
+        table[code] = base if base.isascii() else char
+    for code in range(0x300, 0x370):
+        table[code] = None
+    return table
+
+
+NORMALIZATION_TABLE = build_normalization_table()
+SEARCH_KEY_TABLE = build_normalization_table(lower=True)
+
+
+def to_normalized_form(term: str) -> str:
+    """Convert the provided term to normalized form.
+
+    The common characters are translated with a table; the terms which
+    contain other characters are normalized with NFKD.
+
+    Parameters
+    ----------
+    term: str, required
+        The term to convert.
+
+    Returns
+    -------
+    normalized_term: str
+        The term in its canonical form.
+    """
+    normalized_term = term.translate(NORMALIZATION_TABLE)
+    if normalized_term.isascii():
+        return normalized_term
+    nfkd_form = unicodedata.normalize('NFKD', term)
+    return ''.join([c for c in nfkd_form if not unicodedata.combining(c)])
+
+
+def to_search_key(term: str) -> str:
+    """Convert the provided term to the key by which it is searched.
+
+    The key is the normalized form of the term, in lower case, so that the
+    title words can be compared with the search terms without folding them
+    when searching.
+
+    Parameters
+    ----------
+    term: str, required
+        The term to convert.
+
+    Returns
+    -------
+    search_key: str
+        The term without diacritics, in lower case.
+    """
+    search_key = term.translate(SEARCH_KEY_TABLE)
+    if search_key.isascii():
+        return search_key
+    return to_normalized_form(term).casefold()
@@ -0,0 +1,363 @@
+"""Defines the shadow tables into which the dictionary is imported.
+
+The tables of the dictionary are copied into a separate schema, and the
+import writes into the copies while the application keeps reading the live
+tables. The copies then replace the live tables in a single short
+transaction, and the replaced tables are moved into another schema, from
+which they can be restored until the next shadow import. The tables are
+moved between schemas with their indexes, constraints and sequences, so
+they keep their names, and the foreign keys between them keep referencing
+the tables of the same import.
+
+The previous tables are not updated by the imports and migrations which
+follow the swap, so the data generation and the applied migrations are
+recorded with them, and the tables are restored only while both are
+unchanged.
+"""
+from browser.models.entry import Entry
+from browser.models.entry_document import EntryDocument
+from browser.models.entry_html import EntryHtml
+from browser.models.entry_reference import EntryReference
+from browser.models.imported_file import ImportedFile
+from contextlib import contextmanager
+from django.db import OperationalError
+from django.db import connection
+from django.db import transaction
+from django.db.migrations.recorder import MigrationRecorder
+import hashlib
+import json
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class ShadowTables:
+    """Manages the shadow, live and previous tables of the dictionary.
+
+    The shadow tables are only supported by PostgreSQL.
+    """
+
+    MODELS = [Entry, EntryHtml, EntryDocument, EntryReference, ImportedFile]
+
+    SHADOW_SCHEMA = 'browser_shadow'
+    PREVIOUS_SCHEMA = 'browser_previous'
+    SWAP_SCHEMA = 'browser_swap'
+
+    # The swap waits at most this long for the queries which read the live
+    # tables, so the queries which arrive meanwhile are not blocked for
+    # long; it is attempted again after a pause.
+    LOCK_TIMEOUT = '2s'
+    SWAP_ATTEMPTS = 10
+    SWAP_RETRY_DELAY = 1.0
+
+    def __init__(self):
+        """Initialize the tables."""
+        self.tables = [model._meta.db_table for model in self.MODELS]
+        self.live_schema = None
+
+    def create(self):
+        """Create the shadow tables, as copies of the live tables.
+
+        The rows are copied before the indexes and constraints are built,
+        so the copy does not maintain them row by row; the indexes and
+        constraints are copied from the live tables, with the same names.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT current_schema()')
+            self.live_schema = cursor.fetchone()[0]
+            self.__check_references(cursor)
+            # The definitions are read before the shadow tables exist, so
+            # the tables they reference are not qualified by schema.
+            constraints = self.__constraints(cursor)
+            names = {name for _, name, _ in constraints}
+            indexes = self.__indexes(cursor, names)
+            cursor.execute(
+                f'DROP SCHEMA IF EXISTS {self.SHADOW_SCHEMA} CASCADE')
+            cursor.execute(f'CREATE SCHEMA {self.SHADOW_SCHEMA}')
+            for table in self.tables:
+                start = time.perf_counter()
+                cursor.execute(
+                    f'CREATE TABLE {self.SHADOW_SCHEMA}.{table} '
+                    f'(LIKE {self.live_schema}.{table} INCLUDING DEFAULTS '
+                    'INCLUDING IDENTITY INCLUDING CONSTRAINTS '
+                    'INCLUDING STORAGE)')
+                cursor.execute(f'INSERT INTO {self.SHADOW_SCHEMA}.{table} '
+                               f'SELECT * FROM {self.live_schema}.{table}')
+                count = cursor.rowcount
+                self.__reset_identity(cursor, table)
+                logger.info('Copied %d rows of %s in %.1f seconds.', count,
+                            table,
+                            time.perf_counter() - start)
+            with self.active():
+                for table, name, definition in constraints:
+                    cursor.execute(f'ALTER TABLE {table} ADD CONSTRAINT '
+                                   f'{name} {definition}')
+                for definition in indexes:
+                    cursor.execute(definition)
+
+    @contextmanager
+    def active(self):
+        """Direct the queries of a block of code to the shadow tables.
+
+        The shadow schema is searched first for the unqualified tables, so
+        the models read and write the shadow tables, while the other tables
+        are still found in the live schema.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute('SHOW search_path')
+            search_path = cursor.fetchone()[0]
+            cursor.execute(
+                f'SET search_path TO {self.SHADOW_SCHEMA}, {search_path}')
+        try:
+            yield
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute(f'SET search_path TO {search_path}')
+
+    def swap(self):
+        """Replace the live tables with the shadow tables.
+
+        The live tables are kept as the previous tables, replacing the
+        tables kept by the previous swap.
+        """
+        with connection.cursor() as cursor:
+            for table in self.tables:
+                cursor.execute(f'ANALYZE {self.SHADOW_SCHEMA}.{table}')
+        self.__exchange(self.SHADOW_SCHEMA)
+
+    def rollback(self):
+        """Replace the live tables with the previous tables.
+
+        The live tables are kept as the previous tables, so the rollback can
+        be undone in the same way.
+        """
+        self.__exchange(self.PREVIOUS_SCHEMA)
+
+    def discard(self):
+        """Drop the shadow tables."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DROP SCHEMA IF EXISTS {self.SHADOW_SCHEMA} CASCADE')
+
+    def has_previous(self) -> bool:
+        """Check if the previous tables exist.
+
+        Returns
+        -------
+        has_previous: bool
+            True if the tables replaced by the last swap can be restored.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT count(*) FROM pg_tables WHERE schemaname = %s '
+                'AND tablename = ANY(%s)', [self.PREVIOUS_SCHEMA, self.tables])
+            return cursor.fetchone()[0] == len(self.tables)
+
+    def record_previous(self, generation: int):
+        """Record the state of the data with the previous tables.
+
+        Parameters
+        ----------
+        generation: int, required
+            The data generation of the live tables, i.e. the generation
+            after the swap or the rollback.
+        """
+        state = json.dumps({
+            'generation': generation,
+            'migrations': migrations_digest()
+        })
+        # The state holds only numbers and hexadecimal digits, so it is a
+        # valid literal; COMMENT does not accept parameters.
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"COMMENT ON SCHEMA {self.PREVIOUS_SCHEMA} IS '{state}'")
+
+    def check_previous(self, generation: int):
+        """Check that the previous tables can replace the live tables.
+
+        Parameters
+        ----------
+        generation: int, required
+            The current data generation.
+
+        Raises
+        ------
+        ValueError
+            If the state of the previous tables was not recorded, or if the
+            data generation or the applied migrations changed since.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT obj_description(oid, 'pg_namespace') "
+                'FROM pg_namespace WHERE nspname = %s', [self.PREVIOUS_SCHEMA])
+            row = cursor.fetchone()
+        if row is None or row[0] is None:
+            raise ValueError('The state of the previous tables was not '
+                             'recorded.')
+        state = json.loads(row[0])
+        if state['generation'] != generation:
+            raise ValueError('The data changed since the previous tables '
+                             f'were replaced, at generation '
+                             f"{state['generation']}; it is now at "
+                             f'generation {generation}.')
+        if state['migrations'] != migrations_digest():
+            raise ValueError('The tables were migrated since the previous '
+                             'tables were replaced.')
+
+    def __exchange(self, source_schema: str):
+        """Move the tables of a schema into the live schema.
+
+        The live tables are locked, moved into a temporary schema which then
+        becomes the schema of the previous tables, and the tables of the
+        source schema are moved into the live schema, in one transaction.
+
+        Parameters
+        ----------
+        source_schema: str, required
+            The schema of the tables which become live.
+        """
+        for attempt in range(1, self.SWAP_ATTEMPTS + 1):
+            try:
+                with transaction.atomic(), connection.cursor() as cursor:
+                    cursor.execute('SELECT current_schema()')
+                    live_schema = cursor.fetchone()[0]
+                    cursor.execute(
+                        f"SET LOCAL lock_timeout = '{self.LOCK_TIMEOUT}'")
+                    live_tables = ', '.join(f'{live_schema}.{table}'
+                                            for table in self.tables)
+                    cursor.execute(
+                        f'LOCK TABLE {live_tables} IN ACCESS EXCLUSIVE MODE')
+                    cursor.execute(f'CREATE SCHEMA {self.SWAP_SCHEMA}')
+                    for table in self.tables:
+                        cursor.execute(f'ALTER TABLE {live_schema}.{table} '
+                                       f'SET SCHEMA {self.SWAP_SCHEMA}')
+                    for table in self.tables:
+                        cursor.execute(f'ALTER TABLE {source_schema}.{table} '
+                                       f'SET SCHEMA {live_schema}')
+                    cursor.execute(f'DROP SCHEMA {source_schema}')
+                    cursor.execute('DROP SCHEMA IF EXISTS '
+                                   f'{self.PREVIOUS_SCHEMA} CASCADE')
+                    cursor.execute(f'ALTER SCHEMA {self.SWAP_SCHEMA} '
+                                   f'RENAME TO {self.PREVIOUS_SCHEMA}')
+                return
+            except OperationalError as error:
+                if attempt == self.SWAP_ATTEMPTS:
+                    raise
+                logger.warning(
+                    'The live tables could not be locked (%s); '
+                    'retrying.', error)
+                time.sleep(self.SWAP_RETRY_DELAY)
+
+    def __check_references(self, cursor):
+        """Check that no other table references the tables to be copied.
+
+        The foreign keys of the other tables would keep referencing the
+        previous tables after a swap.
+
+        Parameters
+        ----------
+        cursor: CursorWrapper, required
+            The database cursor.
+        """
+        cursor.execute(
+            'SELECT conrelid::regclass::text, conname FROM pg_constraint '
+            'WHERE contype = %s AND confrelid = ANY(%s::regclass[]) '
+            'AND NOT conrelid = ANY(%s::regclass[])',
+            ['f', self.tables, self.tables])
+        references = cursor.fetchall()
+        if references:
+            raise ValueError('The tables are referenced by other tables: ' +
+                             ', '.join(f'{table}.{name}'
+                                       for table, name in references))
+
+    def __constraints(self, cursor) -> list[tuple[str, str, str]]:
+        """Read the definitions of the key constraints of the live tables.
+
+        The check constraints are copied with the tables.
+
+        Parameters
+        ----------
+        cursor: CursorWrapper, required
+            The database cursor.
+
+        Returns
+        -------
+        constraints: list of (str, str, str)
+            The table, name and definition of each primary key, unique and
+            foreign key constraint; the foreign keys are last, so the keys
+            they reference exist when they are created.
+        """
+        cursor.execute(
+            'SELECT conrelid::regclass::text, conname, '
+            'pg_get_constraintdef(oid) FROM pg_constraint '
+            "WHERE contype IN ('p', 'u', 'f') "
+            'AND conrelid = ANY(%s::regclass[]) '
+            "ORDER BY contype = 'f', conrelid::regclass::text, conname",
+            [self.tables])
+        return cursor.fetchall()
+
+    def __indexes(self, cursor, constraint_names: set[str]) -> list[str]:
+        """Read the definitions of the indexes of the live tables.
+
+        Parameters
+        ----------
+        cursor: CursorWrapper, required
+            The database cursor.
+        constraint_names: set of str, required
+            The names of the constraints, whose indexes are built with them.
+
+        Returns
+        -------
+        definitions: list of str
+            The statements which build the indexes on the shadow tables.
+        """
+        cursor.execute(
+            'SELECT tablename, indexname, indexdef FROM pg_indexes '
+            'WHERE schemaname = %s AND tablename = ANY(%s) '
+            'ORDER BY tablename, indexname', [self.live_schema, self.tables])
+        definitions = []
+        for table, name, definition in cursor.fetchall():
+            if name in constraint_names:
+                continue
+            live_table = f' ON {self.live_schema}.{table} '
+            if live_table not in definition:
+                raise ValueError(f'Unexpected definition of {name}.')
+            definitions.append(
+                definition.replace(live_table,
+                                   f' ON {self.SHADOW_SCHEMA}.{table} ', 1))
+        return definitions
+
+    def __reset_identity(self, cursor, table: str):
+        """Continue the identity sequences of a shadow table after its rows.
+
+        Parameters
+        ----------
+        cursor: CursorWrapper, required
+            The database cursor.
+        table: str, required
+            The name of the table.
+        """
+        shadow_table = f'{self.SHADOW_SCHEMA}.{table}'
+        cursor.execute(
+            'SELECT attname FROM pg_attribute WHERE attrelid = %s::regclass '
+            "AND attidentity <> ''", [shadow_table])
+        for (column, ) in cursor.fetchall():
+            cursor.execute(
+                'SELECT setval(pg_get_serial_sequence(%s, %s), '
+                f'COALESCE(MAX({column}), 0) + 1, false) '
+                f'FROM {shadow_table}', [shadow_table, column])
+
+
+def migrations_digest() -> str:
+    """Compute the digest of the migrations applied to the application.
+
+    Returns
+    -------
+    digest: str
+        The MD5 digest of the names of the applied migrations.
+    """
+    recorder = MigrationRecorder(connection)
+    names = sorted(name for app, name in recorder.applied_migrations()
+                   if app == 'browser')
+    return hashlib.md5(repr(names).encode('utf-8')).hexdigest()
@@ -0,0 +1,83 @@
+"""Defines the storage of the collected static files."""
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from pathlib import Path
+import gzip
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Stores the static files under content-hashed names, precompressed.
+
+    The names of the files contain the hash of their content, so they can be
+    cached by the clients for as long as they exist. When the files are
+    collected, a .gz sibling and, if the brotli package is installed, a .br
+    sibling are written for each text file, which nginx sends to the clients
+    that accept them, without compressing the files for each request.
+    """
+
+    COMPRESSIBLE_EXTENSIONS = {
+        '.css', '.js', '.json', '.map', '.svg', '.txt', '.xml', '.ttf', '.eot',
+        '.ico'
+    }
+
+    # The compressed variants which would not save at least this fraction of
+    # the size of a file are not written.
+    MIN_COMPRESSION_RATIO = 0.95
+
+    def post_process(self, paths: dict, dry_run: bool = False, **options):
+        """Hash the collected files, then compress the hashed files.
+
+        Parameters
+        ----------
+        paths: dict, required
+            The collected files, by their path.
+        dry_run: bool, optional
+            If True nothing is written.
+            Default is False.
+
+        Returns
+        -------
+        processed: iterator of (str, str, bool)
+            The original name, the processed name and whether the file was
+            processed, for the hashed and for the compressed files.
+        """
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for name in sorted(set(self.hashed_files.values())):
+            if Path(name).suffix.lower() not in self.COMPRESSIBLE_EXTENSIONS:
+                continue
+            for compressed_name in self.__compress(name):
+                yield name, compressed_name, True
+
+    def __compress(self, name: str) -> list[str]:
+        """Write the compressed variants of a file.
+
+        Parameters
+        ----------
+        name: str, required
+            The name of the file.
+
+        Returns
+        -------
+        names: list of str
+            The names of the written variants.
+        """
+        path = Path(self.path(name))
+        content = path.read_bytes()
+        variants = [('.gz', gzip.compress(content, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            variants.append(('.br', brotli.compress(content)))
+        names = []
+        for suffix, data in variants:
+            variant = path.with_name(path.name + suffix)
+            if len(data) > len(content) * self.MIN_COMPRESSION_RATIO:
+                variant.unlink(missing_ok=True)
+                continue
+            variant.write_bytes(data)
+            names.append(name + suffix)
+        return names
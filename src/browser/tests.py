@@ -1,8 +1,68 @@
+from django.conf import settings
+from django.templatetags.static import static
+from django.test import AsyncRequestFactory
 from django.test import TestCase
+from django.test import TransactionTestCase
+from django.test import override_settings
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.urls import resolve
+from django.urls import set_script_prefix
+from browser.management.commands.benchmark import SyntheticDictionary
 from browser.management.commands.importdata import EntryXmlParser
 from browser.management.commands.importdata import DictMarkdownToHtmlConverter
+from browser.models.entry import Entry
+from browser.models.entry_document import EntryDocument
+from browser.models.entry_html import EntryHtml
+from browser.models.entry_reference import EntryReference
+from browser.models.imported_file import ImportedFile
+from browser.models.data_generation import DataGeneration
+from browser.caching import cache_statistics
+from browser.checks import find_vendoring_errors
+from browser.instrumentation import MetricsRegistry
+from browser.instrumentation import time_query
+from browser.search import CachedSearchBackend
+from browser.search import DatabaseSearchBackend
+from browser.search import FullTextSearch
+from browser.search import MemorySearchBackend
+from browser.search import SnapshotSearchBackend
+from browser.search import to_normalized_form
+from browser.search import to_search_key
+from browser.search.generation import generation_monitor
+from browser.search.snapshot import Snapshot
+from browser.search.snapshot import SnapshotWriter
+from browser.views import AsyncIndexView
+from io import BytesIO
+from io import StringIO
 from tempfile import NamedTemporaryFile
+from tempfile import TemporaryDirectory
 from pathlib import Path
+from urllib.parse import urljoin
+from urllib.parse import urlsplit
+import gzip
+import hashlib
+import json
+import re
+import tarfile
+import xml.etree.ElementTree as XML
+import zipfile
+
+
+def make_entry_xml(id: int, title_word: str, body: str, md5: str) -> str:
+    """Build the XML of an entry in the export format."""
+    return f"""<?xml version='1.0' encoding='UTF-8'?>
+<entry id="{id}" xmlns:edtlr="https://edtlr.iit.academiaromana-is.ro">
+  <titleWord md5hash="{md5}">{title_word}</titleWord>
+  <titleWordNormalized md5hash="{md5}">{title_word}</titleWordNormalized>
+  <body md5hash="{md5}">
+    <paragraph>{body}</paragraph>
+  </body>
+</entry>
+"""
 
 
 class EntryXmlParserTestCase(TestCase):
@@ -39,6 +99,31 @@ class EntryXmlParserTestCase(TestCase):
                          "0da5e09d295d842d3878a995f0b0228a")
         self.assertEqual(entry.text_md5, "9721086245e27c0ce40701a887440209")
 
+    def test_iterparse(self):
+        """Test that the entries of concatenated documents are parsed."""
+        contents = self.xml_file.read_bytes()
+        xml = contents + make_entry_xml(1, 'CASĂ', 'casă', 'h').encode()
+        parser = EntryXmlParser()
+        parser.READ_SIZE = 7
+        entries = list(parser.iterparse(BytesIO(xml)))
+        self.assertEqual([entry.id for entry in entries], [3917, 1])
+        self.assertEqual(entries[1].text_html, '<p>casă</p>')
+
+        xml = ('<entries>' + make_entry_xml(2, 'MASĂ', 'masă', 'h').replace(
+            "<?xml version='1.0' encoding='UTF-8'?>", '') + '</entries>')
+        entries = list(parser.iterparse(BytesIO(xml.encode())))
+        self.assertEqual([entry.title_word for entry in entries], ['MASĂ'])
+
+    def test_synthetic_entries(self):
+        """Test that the synthetic entries of the benchmarks are valid."""
+        xml = SyntheticDictionary(seed=1).entry_xml(7)
+        entry = EntryXmlParser().parse_element(XML.fromstring(xml.encode()))
+        self.assertEqual(entry.id, 7)
+        self.assertTrue(
+            entry.text_html.startswith(
+                f'<p><strong>{entry.title_word}</strong>'))
+        self.assertEqual(xml, SyntheticDictionary(seed=1).entry_xml(7))
+
 
 class DictMarkdownToHtmlConverterTestCase(TestCase):
     """Defines test cases for the dictmarkdown to HTML converter."""
@@ -53,7 +138,10 @@ class DictMarkdownToHtmlConverterTestCase(TestCase):
          '<strong>ECLISIARHÍE<superscript>1</superscript></strong>  s. f.  v. <strong>ecleziarhie<subscript>i</subscript></strong>.'
          ),
         ('*ECLISIARHÍE*  s. f.  v. **ecleziarhie**.',
-         '<em>ECLISIARHÍE</em>  s. f.  v. <strong>ecleziarhie</strong>.')
+         '<em>ECLISIARHÍE</em>  s. f.  v. <strong>ecleziarhie</strong>.'),
+        ('**ECLISIARHÍE**  $s. f.$  v. @**ecleziarhie**@ **',
+         '</strong>ECLISIARHÍE<strong>  <code>s. f.</code>  v. <cite></strong>ecleziarhie<strong></cite> </strong>'
+         )
     ]
 
     def setUp(self):
@@ -64,3 +152,786 @@ class DictMarkdownToHtmlConverterTestCase(TestCase):
         """Test that the conversion works."""
         for input_str, expected in self.TEST_DATA:
             self.assertEqual(self.converter.convert(input_str), expected)
+
+    def test_bold_italic(self):
+        """Test that the bold and italic marks next to each other nest."""
+        for input_str, expected in [
+            ('***text***', '<strong><em>text</em></strong>'),
+            ('**a *b***', '<strong>a <em>b</em></strong>'),
+            ('*a **b***', '<em>a <strong>b</strong></em>'),
+            ('***a* b**', '<strong><em>a</em> b</strong>'),
+        ]:
+            self.assertEqual(self.converter.convert(input_str), expected)
+
+
+class ImportDataCommandTestCase(TestCase):
+    """Defines test cases for the importdata command."""
+
+    def setUp(self):
+        """Set up the test case."""
+        self.tmp_dir = TemporaryDirectory()
+        self.input_dir = Path(self.tmp_dir.name)
+        self.write_entry(1, 'CASĂ', 'hash-1')
+        self.write_entry(2, 'MASĂ', 'hash-2')
+
+    def tearDown(self):
+        """Clean up the test case."""
+        self.tmp_dir.cleanup()
+
+    def write_entry(self, id: int, title_word: str, md5: str):
+        """Write the entry file into the input directory."""
+        xml = make_entry_xml(id, title_word, f'**{title_word}** s. f.', md5)
+        (self.input_dir / f'{id}.xml').write_text(xml, encoding='utf-8')
+
+    def import_data(self, **options) -> str:
+        """Run the importdata command on the input directory."""
+        stderr = StringIO()
+        call_command('importdata',
+                     input_directory=str(self.input_dir),
+                     stdout=StringIO(),
+                     stderr=stderr,
+                     **options)
+        return stderr.getvalue()
+
+    def test_import(self):
+        """Test that the entries are imported one by one."""
+        self.import_data()
+        self.assertEqual(Entry.objects.count(), 2)
+        self.write_entry(2, 'MASĂ', 'hash-2-changed')
+        self.import_data()
+        self.assertEqual(Entry.objects.get(id=1).version, 2)
+        self.assertEqual(Entry.objects.get(id=2).version, 3)
+
+    def test_bulk_import(self):
+        """Test that the bulk import versions entries like save() does."""
+        self.import_data(bulk=True, chunk_size=1)
+        entry = Entry.objects.get(id=1)
+        self.assertEqual(entry.title_word, 'CASĂ')
+        self.assertEqual(entry.text_html, '<p><strong>CASĂ</strong> s. f.</p>')
+        self.assertEqual(entry.search_key, 'casa')
+        self.assertEqual(entry.version, 2)
+
+        self.write_entry(2, 'MASĂ', 'hash-2-changed')
+        self.import_data(bulk=True)
+        self.assertEqual(Entry.objects.get(id=1).version, 2)
+        self.assertEqual(Entry.objects.get(id=2).version, 3)
+        self.assertEqual(
+            Entry.objects.get(id=2).title_word_md5, 'hash-2-changed')
+
+        self.import_data(bulk=True, force=True)
+        self.assertEqual(Entry.objects.get(id=1).version, 3)
+        self.assertEqual(Entry.objects.get(id=2).version, 4)
+
+    @override_settings(ENTRY_HTML_STORAGE='compressed')
+    def test_compressed_html(self):
+        """Test that the HTML of the entries is stored compressed."""
+        for bulk in [False, True]:
+            self.import_data(bulk=bulk, force=True)
+            entry = Entry.objects.get(id=1)
+            self.assertEqual(entry.text_html, '')
+            self.assertEqual(entry.compressed_html.text(),
+                             '<p><strong>CASĂ</strong> s. f.</p>')
+        with override_settings(ENTRY_HTML_STORAGE='text'):
+            self.import_data(force=True)
+        self.assertFalse(EntryHtml.objects.exists())
+        self.assertEqual(
+            Entry.objects.get(id=1).text_html,
+            '<p><strong>CASĂ</strong> s. f.</p>')
+
+    @override_settings(ENTRY_HTML_STORAGE='compressed')
+    def test_entry_documents(self):
+        """Test that the import writes the full-text search documents."""
+        self.import_data(bulk=True)
+        self.assertEqual(
+            EntryDocument.objects.get(entry_id=1).text, 'CASĂ s. f.')
+        self.write_entry(2, 'MASĂ', 'hash-2-changed')
+        self.import_data()
+        self.assertEqual(EntryDocument.objects.count(), 2)
+
+    def test_cross_references(self):
+        """Test that the citations are linked to the cited entries."""
+        xml = make_entry_xml(3, 'CĂSUȚĂ', 'v. @casă@, @masă@, @lalea@',
+                             'hash-3')
+        (self.input_dir / '3.xml').write_text(xml, encoding='utf-8')
+        self.import_data(bulk=True)
+        html = Entry.objects.get(id=3).text_html
+        self.assertIn('<a class="ref" href="entry/1"><cite>casă</cite></a>',
+                      html)
+        self.assertIn('<a class="ref" href="entry/2"><cite>masă</cite></a>',
+                      html)
+        self.assertIn(' <cite>lalea</cite>', html)
+        self.assertEqual(
+            EntryReference.objects.get(entry_id=3, position=2).search_key,
+            'lalea')
+
+        self.write_entry(4, 'LALEA', 'hash-4')
+        self.import_data()
+        entry = Entry.objects.get(id=3)
+        self.assertIn('<a class="ref" href="entry/4"><cite>lalea</cite></a>',
+                      entry.text_html)
+        self.assertEqual(entry.version, 3)
+        self.assertEqual(
+            EntryReference.objects.get(entry_id=3, position=2).target_id, 4)
+
+        response = self.client.get('/entry/3')
+        self.assertContains(response, 'href="entry/4"')
+        self.assertContains(response, '<base href="/">')
+        self.assertEqual(self.client.get('/entry/99').status_code, 404)
+
+        etag = response['ETag']
+        response = self.client.get('/entry/3', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        Entry.objects.filter(id=3).update(version=4)
+        response = self.client.get('/entry/3', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(ENTRY_HTML_STORAGE='compressed')
+    def test_snapshot(self):
+        """Test that the import writes the snapshot of the entries."""
+        with TemporaryDirectory() as snapshot_dir:
+            path = Path(snapshot_dir) / 'entries.snapshot'
+            with override_settings(SNAPSHOT_PATH=str(path)):
+                stdout = StringIO()
+                call_command('importdata',
+                             input_directory=str(self.input_dir),
+                             snapshot=True,
+                             stdout=stdout)
+                self.assertIn('Wrote the snapshot of 2 entries',
+                              stdout.getvalue())
+                snapshot = Snapshot(path)
+                self.assertTrue(snapshot.compressed)
+                self.assertEqual(
+                    snapshot.entry(snapshot.rank(2)).text_html,
+                    '<p><strong>MASĂ</strong> s. f.</p>')
+
+                stdout = StringIO()
+                call_command('importdata',
+                             input_directory=str(self.input_dir),
+                             snapshot=True,
+                             stdout=stdout)
+                self.assertNotIn('Wrote the snapshot', stdout.getvalue())
+
+    def test_shadow_import(self):
+        """Test that the shadow import replaces the tables, until rollback."""
+        if connection.vendor != 'postgresql':
+            with self.assertRaises(CommandError):
+                self.import_data(shadow=True)
+            with self.assertRaises(CommandError):
+                call_command('rollbackimport', stdout=StringIO())
+            return
+        self.import_data(shadow=True)
+        self.assertEqual(Entry.objects.count(), 2)
+        self.write_entry(2, 'MASĂ', 'hash-2-changed')
+        self.import_data(shadow=True)
+        self.assertEqual(
+            Entry.objects.get(id=2).title_word_md5, 'hash-2-changed')
+        call_command('rollbackimport', stdout=StringIO())
+        self.assertEqual(Entry.objects.get(id=2).title_word_md5, 'hash-2')
+        self.assertEqual(ImportedFile.objects.count(), 2)
+        # The tables replaced by the rollback are stale once the live
+        # tables change.
+        self.write_entry(2, 'MASĂ', 'hash-2-again')
+        self.import_data()
+        with self.assertRaises(CommandError):
+            call_command('rollbackimport', stdout=StringIO())
+        self.assertEqual(
+            Entry.objects.get(id=2).title_word_md5, 'hash-2-again')
+
+    def test_data_generation(self):
+        """Test that the imports which change entries bump the generation."""
+        self.import_data()
+        self.assertEqual(DataGeneration.current(), 1)
+        self.import_data()
+        self.assertEqual(DataGeneration.current(), 1)
+        self.import_data(force=True)
+        self.assertEqual(DataGeneration.current(), 2)
+
+    def test_parallel_import(self):
+        """Test that the entries parsed by workers are all imported."""
+        for id in range(3, 40):
+            self.write_entry(id, f'CUVÂNT{id}', f'hash-{id}')
+        (self.input_dir / 'broken.xml').write_text('<entry id="x">')
+
+        errors = self.import_data(workers=2, bulk=True, chunk_size=8)
+        self.assertEqual(Entry.objects.count(), 39)
+        self.assertIn(str((self.input_dir / 'broken.xml').resolve()), errors)
+        self.assertEqual(Entry.objects.get(id=17).title_word, 'CUVÂNT17')
+
+    def test_manifest(self):
+        """Test that the files that did not change are not parsed again."""
+        self.import_data()
+        self.assertEqual(ImportedFile.objects.count(), 2)
+
+        # Same MD5 sums in the head of the file, but a body that cannot be
+        # parsed: the file must be skipped before parsing.
+        entry_file = self.input_dir / '1.xml'
+        xml = entry_file.read_text(encoding='utf-8')
+        entry_file.write_text(xml.replace('</entry>', ''), encoding='utf-8')
+        self.assertEqual(self.import_data(), '')
+        self.assertIn(str(entry_file.resolve()),
+                      self.import_data(full_scan=True))
+
+        self.write_entry(2, 'MASĂ', 'hash-2-changed')
+        self.import_data()
+        self.assertEqual(Entry.objects.get(id=2).version, 3)
+        record = ImportedFile.objects.get(path=str((self.input_dir /
+                                                    '2.xml').resolve()))
+        self.assertEqual(record.text_md5, 'hash-2-changed')
+
+    def test_statistics(self):
+        """Test that the import is summarized, and the entries opt-in."""
+        (self.input_dir / 'broken.xml').write_text('<entry id="x">')
+        stats_file = self.input_dir / 'stats.json'
+        stdout = StringIO()
+        call_command('importdata',
+                     input_directory=str(self.input_dir),
+                     stats_json=str(stats_file),
+                     stdout=stdout,
+                     stderr=StringIO())
+        self.assertNotIn('Entry 1 inserted.', stdout.getvalue())
+        self.assertIn('3/3 files', stdout.getvalue())
+        statistics = json.loads(stats_file.read_text())
+        self.assertEqual(statistics['inserted'], 2)
+        self.assertEqual(statistics['failed'], 1)
+        self.assertGreater(statistics['durations_seconds']['parse'], 0)
+
+        self.write_entry(2, 'MASĂ', 'hash-2-changed')
+        stdout = StringIO()
+        call_command('importdata',
+                     input_directory=str(self.input_dir),
+                     verbosity=2,
+                     stdout=stdout,
+                     stderr=StringIO())
+        self.assertIn('Entry 1 did not change.', stdout.getvalue())
+        self.assertIn('Entry 2 updated.', stdout.getvalue())
+        self.assertIn('1 updated, 1 unchanged, 1 failed', stdout.getvalue())
+
+    def test_import_archives(self):
+        """Test that the entries are imported from archives as streams."""
+        xml = ''.join(
+            make_entry_xml(id, f'CUVÂNT{id}', 'text', f'hash-{id}')
+            for id in range(1, 4)).encode()
+        tar_file = self.input_dir / 'entries.tar.gz'
+        with tarfile.open(tar_file, 'w:gz') as archive:
+            info = tarfile.TarInfo('entries.xml')
+            info.size = len(xml)
+            archive.addfile(info, BytesIO(xml))
+        zip_file = self.input_dir / 'entries.zip'
+        with zipfile.ZipFile(zip_file, 'w') as archive:
+            archive.writestr('entries/4.xml', make_entry_xml(4, 'A', 'a', 'h'))
+            archive.writestr('entries/5.xml', '<entry id="5">')
+
+        call_command('importdata',
+                     input_file=str(tar_file),
+                     stdout=StringIO(),
+                     stderr=StringIO())
+        self.assertEqual(Entry.objects.count(), 3)
+        self.assertEqual(Entry.objects.get(id=3).title_word, 'CUVÂNT3')
+
+        stderr = StringIO()
+        call_command('importdata',
+                     input_file=str(zip_file),
+                     bulk=True,
+                     stdout=StringIO(),
+                     stderr=stderr)
+        self.assertEqual(Entry.objects.get(id=4).title_word, 'A')
+        self.assertIn('entries/5.xml', stderr.getvalue())
+
+    def test_import_file_with_failed_entries(self):
+        """Test that a file whose entries failed is read again."""
+        zip_file = self.input_dir / 'entries.zip'
+        with zipfile.ZipFile(zip_file, 'w') as archive:
+            archive.writestr('entries/4.xml', make_entry_xml(4, 'A', 'a', 'h'))
+            archive.writestr('entries/5.xml', '<entry id="5">')
+        for _ in range(2):
+            stderr = StringIO()
+            call_command('importdata',
+                         input_file=str(zip_file),
+                         stdout=StringIO(),
+                         stderr=stderr)
+            self.assertIn('entries/5.xml', stderr.getvalue())
+        self.assertFalse(ImportedFile.objects.exists())
+
+
+def create_entry(id: int, title_word: str) -> Entry:
+    """Create the entry with the specified title word."""
+    return Entry.objects.create(
+        id=id,
+        title_word=title_word,
+        title_word_md5=f'md5-{id}',
+        title_word_normalized=to_normalized_form(title_word),
+        title_word_normalized_md5=f'md5-{id}',
+        search_key=to_search_key(title_word),
+        text_html=f'<p><strong>{title_word}</strong> s. f.</p>',
+        text_md5=f'md5-{id}')
+
+
+class SearchTestCase(TestCase):
+    """Defines test cases for searching the entries."""
+
+    def setUp(self):
+        """Set up the test case."""
+        for id, title_word in enumerate(['CASĂ', 'ACASĂ', 'CASETĂ', 'MASĂ']):
+            create_entry(id + 1, title_word)
+        for alias in ['search', 'entries', 'pages']:
+            caches[alias].clear()
+
+    def search(self,
+               term: str,
+               match: str | None = None,
+               backend=None) -> list[str]:
+        """Search the term using the database backend."""
+        backend = backend or DatabaseSearchBackend()
+        results = backend.search(term, match, limit=100).entries()
+        return [entry.title_word for entry in results]
+
+    def test_match_types(self):
+        """Test that the terms are matched according to the match type."""
+        self.assertCountEqual(self.search('cas'), ['ACASĂ', 'CASETĂ', 'CASĂ'])
+        self.assertCountEqual(self.search('ca'), ['CASETĂ', 'CASĂ'])
+        self.assertEqual(self.search('casa', 'exact'), ['CASĂ'])
+        self.assertEqual(self.search('casa', 'prefix'), ['CASĂ'])
+        self.assertEqual(self.search('xyz'), [])
+
+    def test_search_keys(self):
+        """Test that the terms are compared with the folded title words."""
+        self.assertEqual(to_search_key('ȘUȚĂ şuţă ECLISIARHÍE'),
+                         'suta suta eclisiarhie')
+        self.assertEqual(to_search_key('ﬁȘ'), 'fis')
+        create_entry(5, 'ȚARĂ')
+        self.assertEqual(self.search('ţară', 'exact'), ['ȚARĂ'])
+        self.assertEqual(self.search('TA', 'prefix'), ['ȚARĂ'])
+        self.assertEqual(Entry.objects.get(id=5).search_key, 'tara')
+
+    def test_index_view(self):
+        """Test that the index view renders the search results."""
+        response = self.client.get('/', {'t': 'asa'})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '<strong>ACASĂ</strong>')
+        self.assertContains(response, '<strong>MASĂ</strong>')
+        self.assertNotContains(response, '<strong>CASETĂ</strong>')
+
+    def test_text_search(self):
+        """Test that the texts of the entries are searched."""
+        for entry in Entry.objects.all():
+            EntryDocument.from_html(entry.id, entry.title_word,
+                                    entry.text_html).save()
+        page = FullTextSearch().search('s. f.', limit=3)
+        self.assertEqual(len(page), 3)
+        self.assertTrue(page.has_more)
+        response = self.client.get('/', {'t': 'MASĂ', 'm': 'text'})
+        matches = response.context['text_matches']
+        self.assertEqual([match.title_word for match in matches], ['MASĂ'])
+        self.assertFalse(response.context['search_truncated'])
+        self.assertContains(response, '<mark>MASĂ</mark> s. f.')
+        self.assertContains(response, 'href="/entry/4"')
+
+    def test_static_export(self):
+        """Test that only the changed entries are exported again."""
+        with TemporaryDirectory() as output_dir:
+            output = StringIO()
+            call_command('exportstatic',
+                         output_directory=output_dir,
+                         letter_index=True,
+                         stdout=output)
+            self.assertIn('Exported 4 entries', output.getvalue())
+            page = Path(output_dir) / 'entry' / '4.html'
+            self.assertIn('<strong>MASĂ</strong>', page.read_text())
+            self.assertEqual(
+                gzip.decompress(
+                    (Path(output_dir) / 'entry' / '4.html.gz').read_bytes()),
+                page.read_bytes())
+            self.assertIn('/browse/entry/2',
+                          (Path(output_dir) / 'index' / 'A.html').read_text())
+
+            entry = Entry.objects.get(id=4)
+            entry.increment_version()
+            entry.save()
+            Entry.objects.filter(id=3).delete()
+            output = StringIO()
+            call_command('exportstatic',
+                         output_directory=output_dir,
+                         stdout=output)
+            self.assertIn('Exported 1 entries, 2 unchanged, 1 removed',
+                          output.getvalue())
+            self.assertFalse((Path(output_dir) / 'entry' / '3.html').exists())
+
+    def test_letter_view(self):
+        """Test that the letter index pages are served by the application."""
+        response = self.client.get('/index/C')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [title_word for _, title_word in response.context['entries']],
+            ['CASĂ', 'CASETĂ'])
+        self.assertEqual(response.context['letters'], ['A', 'C', 'M'])
+        self.assertContains(response, 'href="/index/M"')
+        etag = response['ETag']
+        response = self.client.get('/index/C', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.client.get('/index/B').status_code, 404)
+
+    def test_page_links(self):
+        """Test that the links of the pages resolve under the base URL."""
+        Entry.objects.filter(id=1).update(
+            text_html='<p>v. <a class="ref" href="entry/2">acasă</a></p>')
+        # The test client does not reset the prefix set by the middleware.
+        self.addCleanup(set_script_prefix, '/')
+        headers = {'X-Browse-Base-Url': '/browse'}
+        for path in ['/browse/', '/browse/entry/1', '/browse/index/A']:
+            response = self.client.get(path, {'t': 'asa'}, headers=headers)
+            self.assertEqual(response.status_code, 200)
+            html = response.content.decode('utf-8')
+            base = re.search(r'<base href="([^"]*)">', html).group(1)
+            self.assertEqual(base, '/browse/')
+            for href in re.findall(r'<a [^>]*href="([^"]*)"', html):
+                url = urljoin(urljoin('http://testserver' + path, base), href)
+                link_path = urlsplit(url).path
+                self.assertTrue(link_path.startswith('/browse/'), href)
+                resolve(link_path.removeprefix('/browse'))
+
+    def test_static_files_storage(self):
+        """Test that the static files are hashed and precompressed."""
+        with TemporaryDirectory() as static_root:
+            storages = {
+                **settings.STORAGES, "staticfiles": {
+                    "BACKEND": settings.STATIC_FILES_STORAGES['manifest']
+                }
+            }
+            with override_settings(STORAGES=storages, STATIC_ROOT=static_root):
+                call_command('collectstatic', interactive=False, verbosity=0)
+                url = static('browser/assets/style.css')
+                self.assertRegex(url, r'/style\.[0-9a-f]{12}\.css$')
+                path = Path(static_root) / 'browser' / 'assets' / url.split(
+                    '/')[-1]
+                self.assertEqual(
+                    gzip.decompress(
+                        path.with_name(path.name + '.gz').read_bytes()),
+                    path.read_bytes())
+                self.assertFalse((Path(static_root) / 'browser' / 'assets' /
+                                  'png' / 'edtlr.png.gz').exists())
+
+    def test_vendored_assets(self):
+        """Test that the missing or changed vendored assets are reported."""
+        with TemporaryDirectory() as vendor_dir:
+            vendor_dir = Path(vendor_dir)
+            css = vendor_dir / 'bootstrap' / 'css' / 'bootstrap.min.css'
+            css.parent.mkdir(parents=True)
+            css.write_text('body {}')
+            checksum = hashlib.sha384(b'body {}').hexdigest()
+            sums = (f'{checksum}  bootstrap/css/bootstrap.min.css\n' +
+                    f'{checksum}  bootstrap/css/bootstrap.min.css.map\n')
+            (vendor_dir / 'SHA384SUMS').write_text(sums)
+            errors = {
+                error.msg.split()[3]: error.id
+                for error in find_vendoring_errors(vendor_dir)
+            }
+            self.assertNotIn('bootstrap/css/bootstrap.min.css', errors)
+            self.assertEqual(errors['bootstrap/css/bootstrap.min.css.map'],
+                             'browser.E002')
+            self.assertEqual(
+                errors['bootstrap-icons/font/bootstrap-icons.min.css'],
+                'browser.E001')
+            css.write_text('body {color: red}')
+            self.assertIn(
+                'browser.E003',
+                {error.id
+                 for error in find_vendoring_errors(vendor_dir)})
+        response = self.client.get('/')
+        path = 'browser/vendor/bootstrap/css/bootstrap.min.css'
+        self.assertContains(response, f'href="{static(path)}"')
+        self.assertNotContains(response, 'cdn.jsdelivr.net')
+
+    def test_pagination(self):
+        """Test that the pages follow each other without gaps."""
+        for id in range(5, 25):
+            create_entry(id, 'CASĂ')
+        for backend in [DatabaseSearchBackend(), MemorySearchBackend()]:
+            ids, after, has_more = [], None, True
+            while has_more:
+                page = backend.search('cas', after=after, limit=3)
+                self.assertLessEqual(len(page), 3)
+                ids.extend(page.ids)
+                after, has_more = page.next_cursor, page.has_more
+            self.assertEqual(len(ids), 23)
+            self.assertEqual(len(set(ids)), 23)
+
+    @override_settings(SEARCH_PAGE_SIZE=2)
+    def test_index_view_pages(self):
+        """Test that the index view links to the next page."""
+        response = self.client.get('/', {'t': 'asa'})
+        self.assertEqual(len(response.context['search_results']), 2)
+        next_page_url = response.context['next_page_url']
+        self.assertIsNotNone(next_page_url)
+        response = self.client.get(next_page_url)
+        self.assertEqual(len(response.context['search_results']), 1)
+        self.assertIsNone(response.context['next_page_url'])
+
+    @override_settings(SEARCH_GENERATION_CHECK_INTERVAL=0)
+    def test_index_view_etag(self):
+        """Test that the unchanged pages are not rendered again."""
+        response = self.client.get('/', {'t': 'asa'})
+        etag = response['ETag']
+        self.assertIn('no-cache', response['Cache-Control'])
+        response = self.client.get('/', {'t': 'asa'},
+                                   headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get('/', {'t': 'cas'},
+                                   headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        DataGeneration.bump()
+        response = self.client.get('/', {'t': 'asa'},
+                                   headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        etag = response['ETag']
+        # The test client does not reset the prefix set by the middleware.
+        self.addCleanup(set_script_prefix, '/')
+        response = self.client.get('/browse/', {'t': 'asa'},
+                                   headers={
+                                       'If-None-Match': etag,
+                                       'X-Browse-Base-Url': '/browse'
+                                   })
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '<base href="/browse/">')
+
+    @override_settings(ENTRY_HTML_STORAGE='compressed')
+    def test_index_view_compressed(self):
+        """Test that the compressed HTML is sent without recompressing it."""
+        call_command('compresshtml', stdout=StringIO())
+        self.assertEqual(EntryHtml.objects.count(), 4)
+        self.assertFalse(Entry.objects.exclude(text_html='').exists())
+        response = self.client.get('/', {'t': 'asa'})
+        self.assertContains(response, '<strong>ACASĂ</strong>')
+        plain = response.content
+        response = self.client.get('/', {'t': 'asa'},
+                                   headers={'Accept-Encoding': 'gzip, br'})
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(response.content), plain)
+
+        call_command('compresshtml', decompress=True, stdout=StringIO())
+        self.assertFalse(EntryHtml.objects.exists())
+        self.assertEqual(self.search('casa', 'exact'), ['CASĂ'])
+        self.assertEqual(
+            Entry.objects.get(id=1).text_html,
+            '<p><strong>CASĂ</strong> s. f.</p>')
+
+    def test_cached_entries(self):
+        """Test that the cached entries are replaced when they change."""
+        self.assertEqual(self.search('casa', 'exact'), ['CASĂ'])
+        hits = cache_statistics.snapshot()['entries']['hits']
+        # The search and the versions of the entries.
+        with self.assertNumQueries(2):
+            self.assertEqual(self.search('casa', 'exact'), ['CASĂ'])
+        self.assertEqual(cache_statistics.snapshot()['entries']['hits'],
+                         hits + 1)
+        entry = Entry.objects.get(id=1)
+        entry.text_html = '<p>changed</p>'
+        entry.save()
+        page = DatabaseSearchBackend().search('casa', 'exact')
+        self.assertEqual(page.entries()[0].text_html, '<p>changed</p>')
+
+    @override_settings(SEARCH_GENERATION_CHECK_INTERVAL=0)
+    def test_cached_pages(self):
+        """Test that the search pages are cached until the data changes."""
+        response = self.client.get('/', {'t': 'asa'})
+        self.assertIsNotNone(response.context)
+        response = self.client.get('/', {'t': 'asa'})
+        self.assertIsNone(response.context)
+        self.assertContains(response, '<strong>MASĂ</strong>')
+        self.assertGreaterEqual(cache_statistics.snapshot()['pages']['hits'],
+                                1)
+        DataGeneration.bump()
+        response = self.client.get('/', {'t': 'asa'})
+        self.assertIsNotNone(response.context)
+
+    def test_cache_stats_view(self):
+        """Test that the cache statistics are reported to the staff."""
+        response = self.client.get('/cache-stats/')
+        self.assertEqual(response.status_code, 302)
+        User.objects.create_user('admin', password='secret', is_staff=True)
+        self.client.login(username='admin', password='secret')
+        self.client.get('/', {'t': 'asa'})
+        response = self.client.get('/cache-stats/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('entries', response.json()['caches'])
+
+    @override_settings(INSTRUMENTATION=True)
+    def test_instrumentation(self):
+        """Test that the requests are measured and the metrics exported."""
+        with (connection.execute_wrapper(time_query),
+              self.assertLogs('browser.middleware') as logs):
+            response = self.client.get('/', {'t': 'asa'})
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['view'], 'browser:index')
+        self.assertEqual(record['results'], 3)
+        server_timing = response['Server-Timing']
+        self.assertRegex(server_timing,
+                         r'^db;dur=[\d.]+;desc="[1-9]\d* queries"')
+        for name in ['search', 'entries', 'render', 'total']:
+            self.assertIn(f'{name};dur=', server_timing)
+        with self.assertLogs('browser.middleware'):
+            response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        metrics = response.content.decode()
+        self.assertRegex(
+            metrics,
+            r'edtlr_requests_total\{status="200",view="browser:index"\} \d+')
+        self.assertIn(
+            'edtlr_search_results_bucket{view="browser:index",le="5"} 1',
+            metrics)
+        self.assertIn('edtlr_cache_misses_total{cache="pages"}', metrics)
+
+    def test_metrics_of_exited_processes(self):
+        """Test that the counters of the exited processes are kept."""
+        sample = {
+            'name': 'edtlr_requests_total',
+            'labels': {
+                'status': '200',
+                'view': 'browser:index'
+            },
+            'value': 2
+        }
+        with TemporaryDirectory() as metrics_dir:
+            with override_settings(METRICS_DIR=metrics_dir):
+                registry = MetricsRegistry()
+                path = Path(metrics_dir) / '123.json'
+                path.write_text(json.dumps([sample]))
+                registry.retire(123)
+                path.write_text(json.dumps([{**sample, 'value': 1}]))
+                self.assertIn(
+                    'edtlr_requests_total{status="200",' +
+                    'view="browser:index"} 3', registry.export())
+                registry.clear()
+                self.assertEqual(list(Path(metrics_dir).iterdir()), [])
+
+    def test_index_view_post(self):
+        """Test that the posted term redirects to the search results."""
+        response = self.client.post('/', {'term': 'casă'})
+        self.assertRedirects(response, '/?t=cas%C4%83')
+
+    def test_suggest_view(self):
+        """Test that the suggestions are title words starting with term."""
+        create_entry(5, 'CASĂ')
+        response = self.client.get('/suggest/', {'t': 'casa'})
+        self.assertEqual(response.json(), {
+            'term': 'casa',
+            'suggestions': ['CASĂ']
+        })
+        self.assertIn('max-age=', response['Cache-Control'])
+        response = self.client.get('/suggest/', {'t': 'cas', 'n': 1})
+        self.assertEqual(len(response.json()['suggestions']), 1)
+        self.assertEqual(
+            self.client.get('/suggest/').json()['suggestions'], [])
+
+    @override_settings(SEARCH_GENERATION_CHECK_INTERVAL=0)
+    def test_cached_backend(self):
+        """Test that the cached results are invalidated by imports."""
+        backend = CachedSearchBackend(DatabaseSearchBackend())
+        self.assertEqual(self.search('cast', backend=backend), [])
+        self.assertEqual(backend.suggest('cast'), [])
+        create_entry(5, 'CASTEL')
+        self.assertEqual(self.search('cast', backend=backend), [])
+        self.assertEqual(backend.suggest('cast'), [])
+        DataGeneration.bump()
+        self.assertEqual(self.search('cast', backend=backend), ['CASTEL'])
+        self.assertEqual(backend.suggest('cast'), ['CASTEL'])
+
+    @override_settings(SEARCH_GENERATION_CHECK_INTERVAL=0)
+    def test_memory_backend(self):
+        """Test that the in-memory index matches like the database."""
+        backend = MemorySearchBackend()
+        for term, match in [('cas', None), ('ca', None), ('casa', 'exact'),
+                            ('asă', None), ('ă', 'contains'), ('xyz', None),
+                            ('', None)]:
+            self.assertEqual(self.search(term, match, backend),
+                             self.search(term, match))
+
+        for term in ['ca', 'casa', 'm', 'x']:
+            self.assertEqual(backend.suggest(term),
+                             DatabaseSearchBackend().suggest(term))
+
+        create_entry(5, 'CASTEL')
+        self.assertNotIn('CASTEL', self.search('cast', backend=backend))
+        DataGeneration.bump()
+        self.assertEqual(self.search('cast', backend=backend), ['CASTEL'])
+        self.assertGreater(backend.get_index().memory_usage(), 0)
+
+    @override_settings(SEARCH_GENERATION_CHECK_INTERVAL=0)
+    def test_snapshot_backend(self):
+        """Test that the snapshot matches like the database, and is swapped."""
+        with TemporaryDirectory() as snapshot_dir:
+            path = Path(snapshot_dir) / 'entries.snapshot'
+            backend = SnapshotSearchBackend(path)
+            self.assertEqual(self.search('cas', backend=backend),
+                             self.search('cas'))
+            for compressed in [False, True]:
+                SnapshotWriter(path, compressed).write()
+                for term, match in [('cas', None), ('ca', None),
+                                    ('casa', 'exact'), ('asă', None),
+                                    ('ă', 'contains'), ('xyz', None),
+                                    ('', None)]:
+                    self.assertEqual(self.search(term, match, backend),
+                                     self.search(term, match))
+                for term in ['ca', 'casa', 'm', 'x']:
+                    self.assertEqual(backend.suggest(term),
+                                     DatabaseSearchBackend().suggest(term))
+                entry = backend.search('masa', 'exact').entries()[0]
+                self.assertEqual(entry.text_html,
+                                 '<p><strong>MASĂ</strong> s. f.</p>')
+
+            page = backend.search('cas', 'contains', limit=2)
+            self.assertEqual(len(page), 2)
+            self.assertTrue(page.has_more)
+            page = backend.search('cas', 'contains', page.next_cursor, 2)
+            self.assertEqual(len(page), 1)
+            self.assertFalse(page.has_more)
+
+            create_entry(5, 'CASTEL')
+            SnapshotWriter(path, False).write()
+            self.assertEqual([entry.title_word for entry in page.entries()],
+                             ['CASĂ'])
+            self.assertEqual(self.search('cast', backend=backend), ['CASTEL'])
+
+    def test_snapshot_generation(self):
+        """Test that the snapshot is checked when the generation changes."""
+        with TemporaryDirectory() as snapshot_dir:
+            path = Path(snapshot_dir) / 'entries.snapshot'
+            SnapshotWriter(path, False).write()
+            backend = SnapshotSearchBackend(path)
+            self.assertEqual(self.search('cast', backend=backend), [])
+            create_entry(5, 'CASTEL')
+            SnapshotWriter(path, False).write()
+            DataGeneration.bump()
+            # The generation is seen before the snapshot is checked again.
+            generation_monitor.generation = None
+            self.assertEqual(self.search('cast', backend=backend), ['CASTEL'])
+
+
+class AsyncIndexViewTestCase(TransactionTestCase):
+    """Defines test cases for the asynchronous index view."""
+
+    def setUp(self):
+        """Set up the test case."""
+        for id, title_word in enumerate(['CASĂ', 'ACASĂ', 'MASĂ']):
+            create_entry(id + 1, title_word)
+        for alias in ['search', 'entries', 'pages']:
+            caches[alias].clear()
+
+    async def get(self, headers: dict | None = None):
+        """Search a term with the asynchronous view."""
+        request = AsyncRequestFactory().get('/', {'t': 'asa'},
+                                            headers=headers)
+        request.user = AnonymousUser()
+        return await AsyncIndexView.as_view()(request)
+
+    async def test_search(self):
+        """Test that the view renders the results and answers with 304."""
+        response = await self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '<strong>ACASĂ</strong>')
+        self.assertContains(response, '<strong>MASĂ</strong>')
+        self.assertIn('no-cache', response['Cache-Control'])
+        response = await self.get({'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
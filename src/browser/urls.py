@@ -1,6 +1,19 @@
 """Defines the routing table of the application."""
 from browser import views
+from django.conf import settings
 from django.urls import path
 
+if settings.ASYNC_VIEWS:
+    IndexView = views.AsyncIndexView
+else:
+    IndexView = views.IndexView
+
 app_name = "browser"
-urlpatterns = [path("", views.IndexView.as_view(), name="index")]
+urlpatterns = [
+    path("", IndexView.as_view(), name="index"),
+    path("entry/<int:id>", views.EntryView.as_view(), name="entry"),
+    path("index/<str:letter>", views.LetterView.as_view(), name="letter"),
+    path("suggest/", views.SuggestView.as_view(), name="suggest"),
+    path("cache-stats/", views.CacheStatsView.as_view(), name="cache-stats"),
+    path("metrics", views.MetricsView.as_view(), name="metrics"),
+]
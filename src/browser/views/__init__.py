@@ -1,2 +1,8 @@
 """Defines the views of the application."""
+from browser.views.async_index import AsyncIndexView
+from browser.views.cache_stats import CacheStatsView
+from browser.views.entry import EntryView
 from browser.views.index import IndexView
+from browser.views.letter import LetterView
+from browser.views.metrics import MetricsView
+from browser.views.suggest import SuggestView
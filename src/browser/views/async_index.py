@@ -0,0 +1,118 @@
+"""The asynchronous index view, served by the ASGI application."""
+from asgiref.sync import sync_to_async
+from browser.views.index import IndexView
+from browser.views.index import index_etag
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils.cache import get_conditional_response
+from django.utils.cache import quote_etag
+from functools import cache
+
+
+@cache
+def search_executor() -> ThreadPoolExecutor:
+    """Get the thread pool which renders the search results.
+
+    The pool bounds the number of searches which run at the same time, and
+    thus the number of database connections they use.
+
+    Returns
+    -------
+    executor: ThreadPoolExecutor
+        The thread pool; the same instance is returned for the lifetime of
+        the process.
+    """
+    return ThreadPoolExecutor(max_workers=settings.ASYNC_SEARCH_THREADS,
+                              thread_name_prefix='search')
+
+
+def run_in_thread(func, *args):
+    """Run the function in a worker thread, as a request would.
+
+    The threads are reused, so their database connections are closed the
+    same way they are at the start and at the end of a request.
+
+    Parameters
+    ----------
+    func: callable, required
+        The function to run.
+    args: tuple, optional
+        The arguments of the function.
+
+    Returns
+    -------
+    result: object
+        The result of the function.
+    """
+    close_old_connections()
+    try:
+        return func(*args)
+    finally:
+        close_old_connections()
+
+
+class AsyncIndexView(IndexView):
+    """Implements the index view without blocking the event loop.
+
+    The ETag and the cached pages are handled by the default thread pool,
+    while the searches are rendered by a bounded thread pool, so that slow
+    searches do not delay the requests which are answered from the caches.
+    """
+
+    async def get(self, request):
+        """Handle the GET request.
+
+        Parameters
+        ----------
+        request: HttpRequest, required
+            The request object.
+        """
+        etag = quote_etag(await self.__run(index_etag, request))
+        response = get_conditional_response(request, etag=etag)
+        if response is not None:
+            response.headers.setdefault('ETag', etag)
+            return response
+
+        response = await self.__run(self.get_cached_page, request)
+        if response is None:
+            response = await self.__run(self.render_page, request,
+                                        search_executor())
+        response.headers.setdefault('ETag', etag)
+        return self.add_cache_headers(response)
+
+    async def post(self, request):
+        """Handle the POST request.
+
+        Parameters
+        ----------
+        request: HttpRequest, required
+            The request object.
+        """
+        return super().post(request)
+
+    async def __run(self,
+                    func,
+                    request,
+                    executor: ThreadPoolExecutor | None = None):
+        """Run the blocking function in a thread pool.
+
+        Parameters
+        ----------
+        func: callable, required
+            The function to run, which receives the request.
+        request: HttpRequest, required
+            The request object.
+        executor: ThreadPoolExecutor, optional
+            The thread pool.
+            Default is None, i.e. the default thread pool of the event loop.
+
+        Returns
+        -------
+        result: object
+            The result of the function.
+        """
+        run = sync_to_async(run_in_thread,
+                            thread_sensitive=False,
+                            executor=executor)
+        return await run(func, request)
@@ -0,0 +1,32 @@
+"""The cache statistics view."""
+from browser.caching import cache_statistics
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
+from django.utils.cache import add_never_cache_headers
+from django.utils.decorators import method_decorator
+from django.views import View
+import os
+
+
+@method_decorator(staff_member_required, name='get')
+class CacheStatsView(View):
+    """Implements the view which reports the hits and misses of the caches."""
+
+    def get(self, request):
+        """Handle the GET request.
+
+        The statistics are those of the process which handles the request.
+
+        Parameters
+        ----------
+        request: HttpRequest, required
+            The request object.
+        """
+        statistics = cache_statistics.snapshot()
+        for alias, counters in statistics.items():
+            options = settings.CACHES.get(alias, {}).get('OPTIONS', {})
+            counters['max_entries'] = options.get('MAX_ENTRIES')
+        response = JsonResponse({'pid': os.getpid(), 'caches': statistics})
+        add_never_cache_headers(response)
+        return response
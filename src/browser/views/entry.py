@@ -0,0 +1,74 @@
+"""The entry view."""
+from browser.instrumentation import phase
+from browser.models.entry import Entry
+from browser.search import SearchPage
+from browser.views.index import IndexView
+from browser.views.index import templates_version
+from django.http import Http404
+from django.shortcuts import render
+from django.urls import get_script_prefix
+from django.utils.cache import patch_cache_control
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.http import condition
+import hashlib
+
+
+def entry_etag(request, id: int) -> str | None:
+    """Compute the ETag of the page of an entry.
+
+    The page is a function of the entry, the templates and the script prefix
+    of its links, and the entry is identified by its id and version, so only
+    the version is read.
+
+    Parameters
+    ----------
+    request: HttpRequest, required
+        The request object.
+    id: int, required
+        The id of the entry.
+
+    Returns
+    -------
+    etag: str
+        The strong ETag of the page, or None if the entry does not exist.
+    """
+    version = Entry.objects.filter(id=id).values_list('version',
+                                                      flat=True).first()
+    if version is None:
+        return None
+    params = (id, version, templates_version(), get_script_prefix())
+    return hashlib.md5(repr(params).encode('utf-8')).hexdigest()
+
+
+@method_decorator(condition(etag_func=entry_etag), name='get')
+class EntryView(View):
+    """Implements the view which displays a single entry.
+
+    The entry is looked up by its id; its citations were linked to the
+    cited entries when it was imported. The responses must be revalidated
+    with their ETag, which answers with 304 until the entry changes.
+    """
+
+    template_name = IndexView.template_name
+
+    def get(self, request, id: int):
+        """Handle the GET request.
+
+        Parameters
+        ----------
+        request: HttpRequest, required
+            The request object.
+        id: int, required
+            The id of the entry.
+        """
+        with phase('entries'):
+            entries = SearchPage([id], has_more=False).entries()
+        if not entries:
+            raise Http404()
+        entry = entries[0]
+        context = {'search_term': entry.title_word, 'search_results': entries}
+        with phase('render'):
+            response = render(request, self.template_name, context=context)
+        patch_cache_control(response, public=True, no_cache=True)
+        return response
@@ -1,14 +1,93 @@
 """The index view."""
-from browser.models.entry import Entry
-from django.db.models import Q
+from browser.caching import PAGES_CACHE_ALIAS
+from browser.caching import cache_statistics
+from browser.caching import get_cache
+from browser.compression import GzipStreamWriter
+from browser.instrumentation import phase
+from browser.instrumentation import record_results
+from browser.search import FullTextSearch
+from browser.search import MatchType
+from browser.search import SearchPage
+from browser.search import get_search_backend
+from browser.search.generation import generation_monitor
+from django.conf import settings
+from django.http import HttpResponse
 from django.http import QueryDict
 from django.shortcuts import redirect
 from django.shortcuts import render
+from django.template.loader import render_to_string
+from django.urls import get_script_prefix
 from django.urls import reverse
+from django.utils.cache import patch_cache_control
+from django.utils.cache import patch_vary_headers
+from django.utils.decorators import method_decorator
 from django.views import View
-import unicodedata
+from django.views.decorators.http import condition
+from functools import cache
+from pathlib import Path
+import hashlib
+import re
+import secrets
 
+ACCEPTS_GZIP = re.compile(r'\bgzip\b')
 
+
+@cache
+def templates_version() -> int:
+    """Get the version of the templates, i.e. their last modification time.
+
+    Returns
+    -------
+    version: int
+        The last modification time of the templates, in nanoseconds.
+    """
+    templates_dir = Path(__file__).resolve().parent.parent / 'templates'
+    return max(path.stat().st_mtime_ns for path in templates_dir.rglob('*'))
+
+
+def index_etag(request) -> str:
+    """Compute the ETag of the index page.
+
+    The page is a function of the search parameters, the dictionary data,
+    the templates and the script prefix of its links, so the ETag is
+    computed without searching.
+
+    Parameters
+    ----------
+    request: HttpRequest, required
+        The request object.
+
+    Returns
+    -------
+    etag: str
+        The strong ETag of the page.
+    """
+    params = (generation_monitor.current(), templates_version(),
+              get_script_prefix(), settings.SEARCH_PAGE_SIZE,
+              request.GET.get('t'), request.GET.get('m'),
+              request.GET.get('after'), sends_compressed(request))
+    return hashlib.md5(repr(params).encode('utf-8')).hexdigest()
+
+
+def sends_compressed(request) -> bool:
+    """Check if the entries are sent with their precompressed HTML.
+
+    Parameters
+    ----------
+    request: HttpRequest, required
+        The request object.
+
+    Returns
+    -------
+    sends_compressed: bool
+        True if the HTML of the entries is stored compressed, and the client
+        accepts gzip-encoded responses.
+    """
+    return (settings.ENTRY_HTML_STORAGE == 'compressed' and bool(
+        ACCEPTS_GZIP.search(request.headers.get('Accept-Encoding', ''))))
+
+
+@method_decorator(condition(etag_func=index_etag), name='get')
 class IndexView(View):
     """Implements the index view."""
 
@@ -18,22 +97,18 @@ class IndexView(View):
     def get(self, request):
         """Handle the GET request.
 
+        The responses can be stored by caches, but must be revalidated with
+        their ETag, which answers with 304 until the data changes.
+
         Parameters
         ----------
         request: HttpRequest, required
             The request object.
         """
-        search_term = request.GET.get('t', None)
-        if search_term is None:
-            return render(request, self.template_name)
-        else:
-            search_results = self.__search(search_term)
-            return render(request,
-                          self.template_name,
-                          context={
-                              'search_term': search_term,
-                              'search_results': search_results
-                          })
+        response = self.get_cached_page(request)
+        if response is None:
+            response = self.render_page(request)
+        return self.add_cache_headers(response)
 
     def post(self, request):
         """Handle the POST request.
@@ -46,42 +121,286 @@ class IndexView(View):
         term = request.POST.get('term')
         if not term:
             return redirect(self.index_page)
+        return redirect(self.__search_url(term))
+
+    def get_cached_page(self, request) -> HttpResponse | None:
+        """Get the index page from the cache.
+
+        The search results pages of the anonymous users are cached by their
+        ETag, which changes with the data generation.
+
+        Parameters
+        ----------
+        request: HttpRequest, required
+            The request object.
+
+        Returns
+        -------
+        response: HttpResponse
+            The cached page, or None if the page is not cached.
+        """
+        key = self.__page_cache_key(request)
+        if key is None:
+            return None
+        with phase('cache'):
+            cached = get_cache(PAGES_CACHE_ALIAS).get(key)
+        if cached is None:
+            cache_statistics.record(PAGES_CACHE_ALIAS, misses=1)
+            return None
+        cache_statistics.record(PAGES_CACHE_ALIAS, hits=1)
+        content, headers = cached
+        return HttpResponse(content, headers=headers)
+
+    def render_page(self, request) -> HttpResponse:
+        """Render the index page, and store it into the cache if allowed.
+
+        Parameters
+        ----------
+        request: HttpRequest, required
+            The request object.
+
+        Returns
+        -------
+        response: HttpResponse
+            The index page.
+        """
+        response = self.__render(request)
+        key = self.__page_cache_key(request)
+        if key is not None and response.status_code == 200:
+            headers = {
+                name: response[name]
+                for name in ['Content-Type', 'Content-Encoding']
+                if response.has_header(name)
+            }
+            get_cache(PAGES_CACHE_ALIAS).set(key, (response.content, headers))
+        return response
+
+    def add_cache_headers(self, response: HttpResponse) -> HttpResponse:
+        """Add the headers which control the caching of the page.
+
+        Parameters
+        ----------
+        response: HttpResponse, required
+            The index page.
+
+        Returns
+        -------
+        response: HttpResponse
+            The index page.
+        """
+        patch_cache_control(response, public=True, no_cache=True)
+        if settings.ENTRY_HTML_STORAGE == 'compressed':
+            patch_vary_headers(response, ['Accept-Encoding'])
+        return response
+
+    def __page_cache_key(self, request) -> str | None:
+        """Build the key of the page in the page cache.
+
+        Parameters
+        ----------
+        request: HttpRequest, required
+            The request object.
+
+        Returns
+        -------
+        key: str
+            The cache key, or None if the page is not cached.
+        """
+        if (get_cache(PAGES_CACHE_ALIAS) is None or not request.GET.get('t')
+                or request.user.is_authenticated):
+            return None
+        return f'page:{index_etag(request)}'
+
+    def __render(self, request):
+        """Render the index page.
+
+        Parameters
+        ----------
+        request: HttpRequest, required
+            The request object.
+
+        Returns
+        -------
+        response: HttpResponse
+            The index page, with the search results if a term was specified.
+        """
+        search_term = request.GET.get('t', None)
+        if not search_term:
+            with phase('render'):
+                return render(request, self.template_name)
+        else:
+            match = request.GET.get('m')
+            after = self.__parse_cursor(request.GET.get('after'))
+            if match == MatchType.TEXT:
+                page = self.__search_text(search_term, after)
+            else:
+                page = self.__search(search_term, match, after)
+            next_page_url = None
+            if page.next_cursor is not None:
+                next_page_url = self.__search_url(search_term, match,
+                                                  page.next_cursor)
+            context = {
+                'search_term': search_term,
+                'search_text': match == MatchType.TEXT,
+                'next_page_url': next_page_url
+            }
+            if match == MatchType.TEXT:
+                context['search_truncated'] = page.truncated
+                with phase('entries'):
+                    context['text_matches'] = FullTextSearch().matches(
+                        search_term, page)
+            elif sends_compressed(request):
+                return self.__render_compressed(request, page, context)
+            else:
+                with phase('entries'):
+                    context['search_results'] = page.entries()
+            with phase('render'):
+                return render(request, self.template_name, context=context)
+
+    def __render_compressed(self, request, page: SearchPage,
+                            context: dict) -> HttpResponse:
+        """Render the search results as a gzip-encoded page.
+
+        The page is rendered with a placeholder for each entry stored
+        compressed; the placeholders are then replaced with the compressed
+        HTML of the entries, without decompressing it.
+
+        Parameters
+        ----------
+        request: HttpRequest, required
+            The request object.
+        page: SearchPage, required
+            The page of search results.
+        context: dict, required
+            The context of the template, without the search results.
+
+        Returns
+        -------
+        response: HttpResponse
+            The gzip-encoded page.
+        """
+        # The token keeps the search term from forging placeholders.
+        token = secrets.token_hex(8)
+        placeholder = re.compile(f'\x00{token}:(\\d+)\x00')
+        with phase('entries'):
+            entries, bodies = page.entries(decompress=False), {}
+        for entry in entries:
+            body = getattr(entry, 'compressed_html', None)
+            if body is not None and not entry.text_html:
+                bodies[entry.id] = body
+                entry.text_html = f'\x00{token}:{entry.id}\x00'
+        context['search_results'] = entries
+        with phase('render'):
+            html = render_to_string(self.template_name, context, request)
+        with phase('gzip'):
+            writer = GzipStreamWriter()
+            for idx, part in enumerate(placeholder.split(html)):
+                if idx % 2 == 0:
+                    writer.write(part)
+                else:
+                    body = bodies[int(part)]
+                    writer.write_compressed(bytes(body.data), body.crc32,
+                                            body.size)
+            content = writer.close()
+        return HttpResponse(content, headers={'Content-Encoding': 'gzip'})
+
+    def __search_url(self,
+                     term: str,
+                     match: str | None = None,
+                     after: int | None = None) -> str:
+        """Build the URL of the search results page.
+
+        Parameters
+        ----------
+        term: str, required
+            The search term.
+        match: str, optional
+            The match type.
+            Default is None.
+        after: int, optional
+            The id of the last entry on the previous page.
+            Default is None.
+
+        Returns
+        -------
+        url: str
+            The URL of the page.
+        """
         params = QueryDict(mutable=True)
         params['t'] = term
+        if match:
+            params['m'] = match
+        if after is not None:
+            params['after'] = after
         base_url = reverse(self.index_page)
-        return redirect(f'{base_url}?{params.urlencode()}')
+        return f'{base_url}?{params.urlencode()}'
+
+    def __parse_cursor(self, value: str | None) -> int | None:
+        """Parse the cursor of the requested page.
+
+        Parameters
+        ----------
+        value: str, required
+            The value of the cursor parameter.
+
+        Returns
+        -------
+        cursor: int
+            The id of the last entry on the previous page, or None.
+        """
+        try:
+            return int(value) if value else None
+        except ValueError:
+            return None
 
-    def __search(self, term: str) -> list[Entry]:
+    def __search(self,
+                 term: str,
+                 match: str | None = None,
+                 after: int | None = None) -> SearchPage:
         """Search entries matching the specified term.
 
         Parameters
         ----------
         term: str, required
             The search term.
+        match: str, optional
+            The match type: 'exact', 'prefix' or 'contains'. If missing, the
+            short terms are matched as prefixes, and the others as substrings.
+            Default is None.
+        after: int, optional
+            The id of the last entry on the previous page.
+            Default is None, i.e. the first page.
 
         Returns
         -------
-        results: list of Entry
-            The entries matching the search term.
+        page: SearchPage
+            The page of entries matching the search term.
         """
-        normalized_term = self.__to_normalized_form(term)
-        query = Q(title_word_normalized__icontains=normalized_term)
-        query.add(Q(title_word__icontains=term), Q.OR)
-        results = Entry.objects.filter(query).order_by('title_word')
-        return list(results)
+        backend = get_search_backend()
+        with phase('search'):
+            page = backend.search(term, match, after,
+                                  settings.SEARCH_PAGE_SIZE)
+        record_results(len(page))
+        return page
 
-    def __to_normalized_form(self, term: str) -> str:
-        """Convert the provided term to normalized form.
+    def __search_text(self, term: str, after: int | None = None) -> SearchPage:
+        """Search entries whose text matches the specified terms.
 
         Parameters
         ----------
         term: str, required
-            The term to convert.
+            The search terms.
+        after: int, optional
+            The id of the last entry on the previous page.
+            Default is None, i.e. the first page.
 
         Returns
         -------
-        normalized_term: str
-            The term in its canonical form.
+        page: SearchPage
+            The page of entries matching the search terms, by rank.
         """
-        nfkd_form = unicodedata.normalize('NFKD', term)
-        return ''.join([c for c in nfkd_form if not unicodedata.combining(c)])
+        with phase('search'):
+            page = FullTextSearch().search(term, after,
+                                           settings.SEARCH_PAGE_SIZE)
+        record_results(len(page))
+        return page
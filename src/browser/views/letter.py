@@ -0,0 +1,105 @@
+"""The letter index view."""
+from browser.instrumentation import phase
+from browser.models.entry import Entry
+from browser.search.generation import generation_monitor
+from browser.views.index import templates_version
+from django.db.models.functions import Substr
+from django.http import Http404
+from django.shortcuts import render
+from django.urls import get_script_prefix
+from django.utils.cache import patch_cache_control
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.http import condition
+import hashlib
+
+
+def index_letter(search_key: str) -> str:
+    """Get the letter under which an entry is indexed.
+
+    Parameters
+    ----------
+    search_key: str, required
+        The search key of the entry.
+
+    Returns
+    -------
+    letter: str
+        The first letter of the search key, in upper case, or '_' if the
+        search key does not start with a letter.
+    """
+    letter = search_key[:1].upper()
+    return letter if letter.isalpha() else '_'
+
+
+def index_letters() -> list[str]:
+    """Get the letters under which the entries are indexed.
+
+    Returns
+    -------
+    letters: list of str
+        The sorted letters.
+    """
+    initials = Entry.objects.annotate(
+        initial=Substr('search_key', 1, 1)).values_list('initial',
+                                                        flat=True).distinct()
+    return sorted({index_letter(initial) for initial in initials})
+
+
+def letter_etag(request, letter: str) -> str:
+    """Compute the ETag of the index page of a letter.
+
+    Parameters
+    ----------
+    request: HttpRequest, required
+        The request object.
+    letter: str, required
+        The letter of the page.
+
+    Returns
+    -------
+    etag: str
+        The strong ETag of the page.
+    """
+    params = (generation_monitor.current(), templates_version(),
+              get_script_prefix(), letter)
+    return hashlib.md5(repr(params).encode('utf-8')).hexdigest()
+
+
+@method_decorator(condition(etag_func=letter_etag), name='get')
+class LetterView(View):
+    """Implements the view which lists the entries starting with a letter.
+
+    The exportstatic command renders the same pages, which are served by
+    nginx; the view serves the letters which were not exported.
+    """
+
+    template_name = 'letter.html'
+
+    def get(self, request, letter: str):
+        """Handle the GET request.
+
+        Parameters
+        ----------
+        request: HttpRequest, required
+            The request object.
+        letter: str, required
+            The letter of the page.
+        """
+        with phase('entries'):
+            letters = index_letters()
+            if letter not in letters:
+                raise Http404()
+            rows = Entry.objects.order_by('search_key', 'id')
+            if letter != '_':
+                rows = rows.filter(search_key__startswith=letter.lower())
+            entries = []
+            for id, title_word, search_key in rows.values_list(
+                    'id', 'title_word', 'search_key'):
+                if index_letter(search_key) == letter:
+                    entries.append((id, title_word))
+        context = {'letter': letter, 'letters': letters, 'entries': entries}
+        with phase('render'):
+            response = render(request, self.template_name, context=context)
+        patch_cache_control(response, public=True, no_cache=True)
+        return response
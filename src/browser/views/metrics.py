@@ -0,0 +1,31 @@
+"""The metrics view."""
+from browser.instrumentation import metrics
+from django.conf import settings
+from django.http import Http404
+from django.http import HttpResponse
+from django.utils.cache import add_never_cache_headers
+from django.views import View
+
+
+class MetricsView(View):
+    """Implements the view which exports the metrics of the requests.
+
+    The view is meant to be scraped by Prometheus, so access to it is
+    restricted by the web server rather than by the application.
+    """
+
+    def get(self, request):
+        """Handle the GET request.
+
+        Parameters
+        ----------
+        request: HttpRequest, required
+            The request object.
+        """
+        if not settings.INSTRUMENTATION:
+            raise Http404()
+        response = HttpResponse(
+            metrics.export(),
+            content_type='text/plain; version=0.0.4; charset=utf-8')
+        add_never_cache_headers(response)
+        return response
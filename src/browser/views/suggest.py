@@ -0,0 +1,53 @@
+"""The suggestions view."""
+from browser.search import get_search_backend
+from django.conf import settings
+from django.http import JsonResponse
+from django.utils.cache import patch_cache_control
+from django.views import View
+
+
+class SuggestView(View):
+    """Implements the view which suggests title words while typing."""
+
+    def get(self, request):
+        """Handle the GET request.
+
+        The response contains the title words starting with the term from
+        the 't' parameter; the number of suggestions can be limited with
+        the 'n' parameter, up to SUGGEST_MAX_LIMIT.
+
+        Parameters
+        ----------
+        request: HttpRequest, required
+            The request object.
+        """
+        term = request.GET.get('t', '').strip()
+        limit = self.__parse_limit(request.GET.get('n'))
+        suggestions = []
+        if term:
+            backend = get_search_backend()
+            suggestions = backend.suggest(term, limit)
+        response = JsonResponse({'term': term, 'suggestions': suggestions})
+        patch_cache_control(response,
+                            public=True,
+                            max_age=settings.SUGGEST_CACHE_MAX_AGE)
+        return response
+
+    def __parse_limit(self, value: str | None) -> int:
+        """Parse the requested number of suggestions.
+
+        Parameters
+        ----------
+        value: str, required
+            The value of the limit parameter.
+
+        Returns
+        -------
+        limit: int
+            The number of suggestions, between 1 and SUGGEST_MAX_LIMIT.
+        """
+        try:
+            limit = int(value) if value else settings.SUGGEST_LIMIT
+        except ValueError:
+            limit = settings.SUGGEST_LIMIT
+        return min(max(limit, 1), settings.SUGGEST_MAX_LIMIT)
@@ -44,6 +44,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "browser.middleware.InstrumentationMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -56,12 +57,23 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = "config.urls"
 
+# The compiled templates are kept in memory by the cached loader, except in
+# development, where they are read again for each request.
+TEMPLATE_LOADERS = [
+    "django.template.loaders.filesystem.Loader",
+    "django.template.loaders.app_directories.Loader",
+]
+if not DEBUG:
+    TEMPLATE_LOADERS = [
+        ("django.template.loaders.cached.Loader", TEMPLATE_LOADERS),
+    ]
+
 TEMPLATES = [
     {
         "BACKEND": "django.template.backends.django.DjangoTemplates",
         "DIRS": [],
-        "APP_DIRS": True,
         "OPTIONS": {
+            "loaders": TEMPLATE_LOADERS,
             "context_processors": [
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
@@ -76,6 +88,22 @@ WSGI_APPLICATION = "config.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# The connections are kept open between requests: by each thread for
+# DATABASE_CONN_MAX_AGE seconds (0 closes them at the end of each request),
+# or, if DATABASE_POOL is 'true', by a connection pool of each process,
+# which needs psycopg 3. The connections are checked before being reused,
+# unless DATABASE_CONN_HEALTH_CHECKS is 'false'.
+DATABASE_POOL = os.getenv('DATABASE_POOL', 'false').lower() == 'true'
+DATABASE_OPTIONS = {}
+if DATABASE_POOL:
+    DATABASE_OPTIONS["pool"] = {
+        "min_size": int(os.getenv('DATABASE_POOL_MIN_SIZE', '2')),
+        "max_size": int(os.getenv('DATABASE_POOL_MAX_SIZE', '10')),
+        # The number of seconds to wait for a connection of the pool.
+        "timeout": float(os.getenv('DATABASE_POOL_TIMEOUT', '10')),
+    }
+DATABASE_CONN_MAX_AGE = int(os.getenv('DATABASE_CONN_MAX_AGE', '60'))
+
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.postgresql",
@@ -84,6 +112,11 @@ DATABASES = {
         "PASSWORD": os.getenv('DATABASE_PASSWORD'),
         "HOST": os.getenv('DATABASE_HOST'),
         "PORT": os.getenv('DATABASE_PORT'),
+        # The pooled connections are returned to the pool instead.
+        "CONN_MAX_AGE": 0 if DATABASE_POOL else DATABASE_CONN_MAX_AGE,
+        "CONN_HEALTH_CHECKS": os.getenv('DATABASE_CONN_HEALTH_CHECKS',
+                                        'true').lower() == 'true',
+        "OPTIONS": DATABASE_OPTIONS,
     }
 }
 
@@ -121,12 +154,144 @@ USE_TZ = True
 
 STATIC_URL = os.getenv('STATIC_URL').rstrip('/') + '/'
 STATIC_ROOT = os.getenv('STATIC_ROOT')
+# The storage of the collected static files: 'default' copies them as they
+# are, while 'manifest' copies them under content-hashed names, with their
+# precompressed variants, so they can be cached by the clients indefinitely;
+# 'manifest' needs 'manage.py collectstatic' to run before the application.
+STATIC_FILES_STORAGE = os.getenv('STATIC_FILES_STORAGE', 'default')
+STATIC_FILES_STORAGES = {
+    'default': "django.contrib.staticfiles.storage.StaticFilesStorage",
+    'manifest': "browser.storage.CompressedManifestStaticFilesStorage",
+}
+STORAGES = {
+    "default": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    },
+    "staticfiles": {
+        "BACKEND": STATIC_FILES_STORAGES[STATIC_FILES_STORAGE],
+    },
+}
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# Caches
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# The search results are cached in the 'search' cache, selected by the
+# SEARCH_CACHE variable: 'locmem' (default), 'file', 'db' or 'none'. The
+# 'db' cache needs the table created by 'manage.py createcachetable'.
+# The loaded entries and the rendered search pages are cached in the
+# 'entries' and 'pages' caches, selected by the ENTRY_CACHE and PAGE_CACHE
+# variables, which default to SEARCH_CACHE.
+
+SEARCH_CACHE = os.getenv('SEARCH_CACHE', 'locmem')
+ENTRY_CACHE = os.getenv('ENTRY_CACHE', SEARCH_CACHE)
+PAGE_CACHE = os.getenv('PAGE_CACHE', SEARCH_CACHE)
+CACHE_BACKENDS = {
+    'locmem': "django.core.cache.backends.locmem.LocMemCache",
+    'file': "django.core.cache.backends.filebased.FileBasedCache",
+    'db': "django.core.cache.backends.db.DatabaseCache",
+}
+SEARCH_CACHE_LOCATION = os.getenv('SEARCH_CACHE_LOCATION', 'search-cache')
+# The number of seconds for which the search results are cached.
+SEARCH_CACHE_TIMEOUT = int(os.getenv('SEARCH_CACHE_TIMEOUT', '86400'))
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+}
+# For each cache: the type, the location, the number of seconds for which
+# the values are cached and the maximum number of values; the cache is
+# culled beyond this number, and the local memory cache evicts the least
+# recently used values.
+APPLICATION_CACHES = {
+    "search": (SEARCH_CACHE, SEARCH_CACHE_LOCATION, SEARCH_CACHE_TIMEOUT,
+               int(os.getenv('SEARCH_CACHE_MAX_ENTRIES', '10000'))),
+    "entries": (ENTRY_CACHE, os.getenv('ENTRY_CACHE_LOCATION', 'entry-cache'),
+                int(os.getenv('ENTRY_CACHE_TIMEOUT', '86400')),
+                int(os.getenv('ENTRY_CACHE_MAX_ENTRIES', '10000'))),
+    "pages": (PAGE_CACHE, os.getenv('PAGE_CACHE_LOCATION', 'page-cache'),
+              int(os.getenv('PAGE_CACHE_TIMEOUT', '86400')),
+              int(os.getenv('PAGE_CACHE_MAX_ENTRIES', '1000'))),
+}
+for alias, (kind, location, timeout,
+            max_entries) in APPLICATION_CACHES.items():
+    if kind in CACHE_BACKENDS:
+        CACHES[alias] = {
+            "BACKEND": CACHE_BACKENDS[kind],
+            "LOCATION": location,
+            "TIMEOUT": timeout,
+            "OPTIONS": {
+                "MAX_ENTRIES": max_entries,
+            },
+        }
+
+# Search
+# The backend used for searching the entries: 'database' queries the
+# database for each search, 'memory' keeps an in-process index of the title
+# words, rebuilt when the data generation changes, while 'snapshot' maps the
+# snapshot written by 'manage.py importdata --snapshot' into memory, and
+# serves both the searches and the entries from it.
+SEARCH_BACKEND = os.getenv('SEARCH_BACKEND', 'database')
+# The path of the snapshot of the entries.
+SNAPSHOT_PATH = os.getenv('SNAPSHOT_PATH')
+# The maximum number of entries on a page of search results.
+SEARCH_PAGE_SIZE = int(os.getenv('SEARCH_PAGE_SIZE', '50'))
+# The default and maximum number of title words suggested while typing.
+SUGGEST_LIMIT = int(os.getenv('SUGGEST_LIMIT', '10'))
+SUGGEST_MAX_LIMIT = int(os.getenv('SUGGEST_MAX_LIMIT', '20'))
+# The number of seconds for which the suggestions can be cached by clients.
+SUGGEST_CACHE_MAX_AGE = int(os.getenv('SUGGEST_CACHE_MAX_AGE', '300'))
+# The number of seconds between two checks of the data generation.
+SEARCH_GENERATION_CHECK_INTERVAL = float(
+    os.getenv('SEARCH_GENERATION_CHECK_INTERVAL', '5'))
+# The text search configuration of the full-text search of the entry texts,
+# which is created by the migrations; it is not read from the environment,
+# since the migrations create only this configuration.
+FULL_TEXT_SEARCH_CONFIG = 'romanian_unaccent'
+
+# Asynchronous views
+# The ASGI application (config.asgi) serves the asynchronous views, which
+# render at most ASYNC_SEARCH_THREADS searches at the same time per process.
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', 'false').lower() == 'true'
+ASYNC_SEARCH_THREADS = int(os.getenv('ASYNC_SEARCH_THREADS', '8'))
+
+# Instrumentation
+# If enabled, the requests are measured: the durations of their phases and
+# of their database queries are sent in the Server-Timing header, logged as
+# JSON records and exported as metrics in the Prometheus text format. Each
+# process writes its metrics into METRICS_DIR, if set, at most once per
+# METRICS_FLUSH_INTERVAL seconds, so that the exported metrics are those of
+# all the processes.
+INSTRUMENTATION = os.getenv('INSTRUMENTATION', 'false').lower() == 'true'
+METRICS_DIR = os.getenv('METRICS_DIR')
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', '1'))
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {
+            "class": "logging.StreamHandler",
+        },
+    },
+    "loggers": {
+        "browser": {
+            "handlers": ["console"],
+            "level": os.getenv('LOG_LEVEL', 'INFO'),
+        },
+    },
+}
+
+# Entries
+# The storage of the entry HTML: 'text' (default) keeps it in the entry
+# table, while 'compressed' keeps it precompressed in a separate table and
+# sends it gzip-encoded to the clients which accept it.
+ENTRY_HTML_STORAGE = os.getenv('ENTRY_HTML_STORAGE', 'text')
+
 LOGIN_URL = os.getenv('LOGIN_URL')
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/'